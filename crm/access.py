@@ -0,0 +1,109 @@
+"""
+Контекст доступа текущего пользователя, собираемый один раз на запрос.
+
+Раньше каждая канбан-view заново проверяла роль и делала
+project.developers.filter(id=user.developer_profile.id).exists() — плюс запрос
+за профилем разработчика. AccessContext хранит роль, id профиля и множество
+проектов, где PM ответственный или куда назначен DEV;
+множества грузятся одним запросом при первой проверке и дальше только читаются.
+
+AccessContextMiddleware кладёт контекст в request.access (лениво);
+DRF Request проксирует атрибут к исходному HttpRequest.
+"""
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils.functional import SimpleLazyObject, cached_property
+
+from .models import Project
+
+
+class AccessContext:
+    def __init__(self, user):
+        self.user = user
+        authenticated = bool(user and user.is_authenticated)
+        self.user_id = user.pk if authenticated else None
+        self.is_admin = authenticated and (user.is_superuser or user.is_admin_role())
+        self.is_pm = authenticated and not self.is_admin and user.is_pm()
+        self.is_dev = authenticated and not self.is_admin and user.is_dev()
+
+    @cached_property
+    def developer_id(self):
+        """
+        id профиля Developer; без запроса, если профиль подгружен аутентификацией
+        (select_related в users.backends / users.authentication).
+        """
+        if not self.is_dev:
+            return None
+        try:
+            return self.user.developer_profile.pk
+        except ObjectDoesNotExist:
+            return None
+
+    @cached_property
+    def _project_ids(self):
+        # роли не смешиваются, как в ProjectQuerySet.visible_to: PM видит проекты, где он
+        # ответственный, DEV — только те, куда назначен, даже если указан ответственным
+        responsible, assigned = set(), set()
+        if self.is_pm:
+            responsible = set(Project.objects.filter(responsible_id=self.user_id).values_list("id", flat=True))
+        elif self.developer_id is not None:
+            assigned = set(Project.objects.filter(developers__id=self.developer_id).values_list("id", flat=True))
+        return responsible, assigned
+
+    @property
+    def responsible_project_ids(self):
+        """
+        Проекты PM, где он ответственный.
+        """
+        return self._project_ids[0]
+
+    @property
+    def assigned_project_ids(self):
+        """
+        Проекты, куда DEV назначен разработчиком.
+        """
+        return self._project_ids[1]
+
+    def can_view_project(self, project):
+        """
+        Admin — любой проект, PM — свой, DEV — где назначен. Как в ProjectQuerySet.visible_to.
+        """
+        if self.is_admin:
+            return True
+        if self.is_pm:
+            return project.responsible_id == self.user_id
+        if self.is_dev:
+            return project.pk in self.assigned_project_ids
+        return False
+
+    def can_manage_project(self, project):
+        """
+        Управление задачами/файлами проекта: Admin или ответственный PM.
+        """
+        if self.is_admin:
+            return True
+        return self.is_pm and project.responsible_id == self.user_id
+
+
+def get_access(request):
+    """
+    Контекст доступа запроса; создаётся на месте, если middleware не подключён.
+    """
+    access = getattr(request, "access", None)
+    if access is None or access.user is not request.user:
+        access = AccessContext(request.user)
+    return access
+
+
+class AccessContextMiddleware:
+    """
+    Ставить после AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # DRF подменяет request.user после своей аутентификации, поэтому
+        # контекст строится при первом обращении, а не здесь
+        request.access = SimpleLazyObject(lambda: AccessContext(request.user))
+        return self.get_response(request)
@@ -4,6 +4,7 @@ from django.utils.html import format_html
 
 from unfold.admin import ModelAdmin, TabularInline  # база из Unfold
 
+from .access import get_access
 from .models import Project, Developer
 
 
@@ -219,16 +220,12 @@ class ProjectAdmin(ModelAdmin):  # 👈 наследуемся от Unfold Model
             # Если объекта нет (список) — разрешаем, дальше отфильтрует get_queryset
             if obj is None:
                 return True
-            return obj.responsible == user
+            return get_access(request).can_manage_project(obj)
         if getattr(user, "is_dev", lambda: False)():
             # Список/массовые операции не нужны — только change form конкретного проекта
             if obj is None:
                 return False
-            try:
-                developer = user.developer_profile
-                return obj.developers.filter(id=developer.id).exists()
-            except Exception:
-                return False
+            return get_access(request).can_view_project(obj)
         return False
 
     def has_delete_permission(self, request, obj=None):
@@ -252,11 +249,10 @@ class ProjectAdmin(ModelAdmin):  # 👈 наследуемся от Unfold Model
         if user.is_pm():
             return qs.filter(responsible=user)
         if user.is_dev():
-            try:
-                developer = user.developer_profile
-                return qs.filter(developers=developer)
-            except Exception:
+            developer_id = get_access(request).developer_id
+            if developer_id is None:
                 return qs.none()
+            return qs.filter(developers__id=developer_id)
         return qs.none()
 
     def get_fields(self, request, obj=None):
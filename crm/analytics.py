@@ -0,0 +1,121 @@
+"""
+Сводная аналитика по портфелю проектов.
+
+Все показатели считаются агрегатами в SQL по проектам, видимым пользователю
+(ProjectQuerySet.visible_to — те же правила, что в ProjectViewSet),
+и кэшируются на короткое время отдельно для каждого пользователя.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from .models import Developer, KanbanColumn, KanbanTaskHistory, Project
+
+CACHE_KEY = "crm:analytics:{user_id}:{weeks}"
+
+DEFAULT_WEEKS = 12
+MAX_WEEKS = 104
+
+
+def _can_see_finance(user):
+    return user.is_superuser or user.is_admin_role() or user.is_pm()
+
+
+def _summary(projects, today):
+    """
+    Количество, средняя готовность и корзины по дедлайнам — одним запросом.
+    Завершённые проекты (100%) в корзины дедлайнов не попадают.
+    """
+    active = Q(completion_percent__lt=100)
+    week = today + datetime.timedelta(days=7)
+    month = today + datetime.timedelta(days=30)
+
+    data = projects.aggregate(
+        projects_total=Count("id"),
+        avg_completion=Avg("completion_percent"),
+        total_cost=Sum("total_cost"),
+        completed=Count("id", filter=~active),
+        overdue=Count("id", filter=active & Q(deadline__lt=today)),
+        next_7_days=Count("id", filter=active & Q(deadline__gte=today, deadline__lt=week)),
+        next_30_days=Count("id", filter=active & Q(deadline__gte=week, deadline__lt=month)),
+        later=Count("id", filter=active & Q(deadline__gte=month)),
+        no_deadline=Count("id", filter=active & Q(deadline__isnull=True)),
+    )
+    buckets = {
+        key: data.pop(key)
+        for key in ("overdue", "next_7_days", "next_30_days", "later", "no_deadline", "completed")
+    }
+    data["deadline_buckets"] = buckets
+    data["avg_completion"] = round(data["avg_completion"] or 0, 1)
+    return data
+
+
+def _cost_by_responsible(projects):
+    rows = (
+        projects.order_by()
+        .values("responsible", "responsible__full_name", "responsible__username")
+        .annotate(total_cost=Sum("total_cost"), projects=Count("id"))
+        .order_by("-total_cost", "responsible")
+    )
+    return [
+        {
+            "responsible": row["responsible"],
+            "responsible_name": (row["responsible__full_name"] or "").strip() or row["responsible__username"],
+            "total_cost": row["total_cost"],
+            "projects": row["projects"],
+        }
+        for row in rows
+    ]
+
+
+def _throughput(projects, since):
+    """
+    Сколько задач в неделю переехало в колонку «Готово» (по истории канбана).
+    """
+    rows = (
+        KanbanTaskHistory.objects.filter(
+            project__in=projects.values("id"),
+            action=KanbanTaskHistory.ACTION_MOVE,
+            to_column=KanbanColumn.DONE,
+            created_at__gte=since,
+        )
+        .order_by()
+        .annotate(week=TruncWeek("created_at"))
+        .values("week")
+        .annotate(done=Count("id"))
+        .order_by("week")
+    )
+    return [{"week": row["week"].date().isoformat(), "done": row["done"]} for row in rows]
+
+
+def compute_analytics(user, weeks=DEFAULT_WEEKS, today=None):
+    today = today or timezone.localdate()
+    projects = Project.objects.visible_to(user)
+
+    data = _summary(projects, today)
+    since = timezone.now() - datetime.timedelta(weeks=weeks)
+    data["throughput"] = _throughput(projects, since)
+
+    if _can_see_finance(user):
+        data["cost_by_responsible"] = _cost_by_responsible(projects)
+        data["developers_total"] = Developer.objects.count()
+    else:
+        data.pop("total_cost")
+        data["developers_total"] = Developer.objects.filter(user=user).count()
+
+    data["generated_at"] = timezone.now()
+    return data
+
+
+def get_analytics(user, weeks=DEFAULT_WEEKS):
+    weeks = max(1, min(int(weeks), MAX_WEEKS))
+    key = CACHE_KEY.format(user_id=user.pk, weeks=weeks)
+    data = cache.get(key)
+    if data is None:
+        data = compute_analytics(user, weeks=weeks)
+        cache.set(key, data, getattr(settings, "CRM_ANALYTICS_CACHE_TTL", 60))
+    return data
@@ -9,22 +9,36 @@ from .views import (
     kanban_assignees,
     kanban_state,
     kanban_task_create,
+    kanban_task_bulk,
     kanban_task_update,
     kanban_task_delete,
     kanban_reorder,
     kanban_task_history,
     kanban_project_activity,
+    kanban_project_flow,
+    global_search,
+    export_data,
+    import_data,
+    staffing_match,
+    portfolio_analytics,
 )
 
 urlpatterns = [
     path("kanban/<int:project_id>/", kanban_state),
     path("kanban/<int:project_id>/assignees/", kanban_assignees),
     path("kanban/task/", kanban_task_create),
+    path("kanban/task/bulk/", kanban_task_bulk),
     path("kanban/task/<int:task_id>/", kanban_task_update),
     path("kanban/task/<int:task_id>/delete/", kanban_task_delete),
     path("kanban/reorder/", kanban_reorder),
     path("kanban/task/<int:task_id>/history/", kanban_task_history),
     path("kanban/project/<int:project_id>/activity/", kanban_project_activity),
+    path("kanban/project/<int:project_id>/flow/", kanban_project_flow),
+    path("search/", global_search, name="api_search"),
+    path("export/<slug:kind>.<slug:fmt>", export_data, name="api_export"),
+    path("import/<slug:kind>/", import_data, name="api_import"),
+    path("staffing/match/", staffing_match, name="api_staffing_match"),
+    path("analytics/", portfolio_analytics, name="api_analytics"),
     path(
         "projects/<uuid:project_uuid>/files/upload/",
         upload_project_files,
@@ -0,0 +1,376 @@
+"""
+Бенчмарк REST API: число SQL-запросов и задержка (p50/p95) по каждому маршруту
+crm/urls.py, crm/api_urls.py и users/urls.py для каждой роли (ADMIN, PM, DEV).
+
+Данные генерируются детерминированно (seed), результаты сравниваются
+с закоммиченным baseline (crm/benchmark_baseline.json):
+рост числа запросов — регрессия, задержка — только предупреждение
+(она зависит от машины).
+
+Запуск: python manage.py bench_api [--update-baseline]
+"""
+import datetime
+import json
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users import tokens
+from users.authentication import token_cache
+
+from .models import (
+    Developer, KanbanColumn, KanbanTask, KanbanTaskHistory, Project, ProjectFile, ProjectFolder,
+)
+from .views import ensure_kanban_columns
+
+User = get_user_model()
+
+BASELINE_PATH = Path(__file__).resolve().parent / "benchmark_baseline.json"
+
+ROLES = ("ADMIN", "PM", "DEV")
+
+DEFAULT_PARAMS = {
+    "seed": 42,
+    "projects": 10,
+    "developers": 20,
+    "tasks_per_board": 20,
+    "folder_depth": 3,
+    "repeat": 5,
+}
+
+BENCH_PASSWORD = "bench-password"
+
+# пароли в бенчмарке не должны мерить PBKDF2
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+# пробный импорт (dry_run): проверка строк и логинов без записи
+IMPORT_CSV = "username,full_name,position,competencies\n" + "".join(
+    f"bench_import_{n},Import {n},Backend,\"Python, Django\"\n" for n in range(20)
+)
+
+COMPETENCIES = ["Python", "Django", "React", "PostgreSQL", "Docker", "Go", "Kotlin", "Swift", "QA", "DevOps"]
+
+
+class BenchmarkData:
+    """
+    Ссылки на сгенерированные объекты, которые подставляются в маршруты.
+    """
+
+    def __init__(self, users, devices, project, task, folder, empty_folder, file):
+        self.users = users
+        self.devices = devices
+        self.project = project
+        self.task = task
+        self.folder = folder
+        self.empty_folder = empty_folder
+        self.file = file
+
+
+def seed_benchmark_data(seed, projects, developers, tasks_per_board, folder_depth, **_):
+    """
+    Минимальный детерминированный набор: роли, разработчики, проекты с назначениями,
+    доски с задачами и историей, дерево папок с файлами у первого проекта.
+    """
+    rnd = random.Random(seed)
+    password = make_password(BENCH_PASSWORD)
+
+    users = {
+        role: User.objects.create(
+            username=f"bench_{role.lower()}", password=password, role=role, full_name=f"Bench {role}",
+        )
+        for role in ROLES
+    }
+    pms = [users["PM"]] + [
+        User.objects.create(username=f"bench_pm_{i}", password=password, role="PM", full_name=f"PM {i}")
+        for i in range(2)
+    ]
+
+    dev_users = User.objects.bulk_create([
+        User(username=f"bench_dev_{i}", password=password, role="DEV", full_name=f"Developer {i:04d}")
+        for i in range(developers - 1)
+    ])
+    Developer.objects.bulk_create([
+        Developer(
+            user=u, full_name=u.full_name, position=rnd.choice(["Backend", "Frontend", "QA", "Mobile"]),
+            competencies=", ".join(rnd.sample(COMPETENCIES, 3)),
+        )
+        for u in dev_users
+    ])
+    all_devs = [users["DEV"].developer_profile] + list(Developer.objects.filter(user__in=dev_users))
+
+    project_objs = []
+    for i in range(projects):
+        project = Project.objects.create(
+            name=f"Project {i:04d}", customer_name=f"Customer {i % 7}",
+            total_cost=rnd.randint(10, 500) * 1000, completion_percent=rnd.randint(0, 100),
+            responsible=pms[i % len(pms)], active_stage="Разработка",
+        )
+        team = rnd.sample(all_devs[1:], min(3, len(all_devs) - 1))
+        if i == 0:
+            team.append(all_devs[0])
+        project.developers.set(team)
+        project_objs.append(project)
+
+        ensure_kanban_columns(project)
+        columns = list(KanbanColumn.objects.filter(project=project))
+        tasks = KanbanTask.objects.bulk_create([
+            KanbanTask(
+                project=project, column=rnd.choice(columns), title=f"Task {i}-{n}", order=n,
+                assignee_kind=KanbanTask.AssigneeKind.DEVELOPER, assignee_developer=rnd.choice(team),
+            )
+            for n in range(tasks_per_board)
+        ])
+        KanbanTaskHistory.objects.bulk_create([
+            KanbanTaskHistory(
+                project=project, task=t, task_ref=t.pk, user=users["PM"], action=KanbanTaskHistory.ACTION_CREATE,
+                to_column="queue", new_data={"title": t.title},
+            )
+            for t in tasks
+        ])
+    # история старше SAFETY_LAG свёртки метрик — иначе число запросов /flow/ зависит от времени прогона
+    KanbanTaskHistory.objects.update(created_at=timezone.now() - datetime.timedelta(days=1))
+
+    target = project_objs[0]
+    parent = None
+    folders = []
+    for depth in range(folder_depth):
+        for n in range(2):
+            folder = ProjectFolder.objects.create(project=target, parent=parent, name=f"Folder {depth}-{n}")
+            folders.append(folder)
+        parent = folders[-1]
+    files = [
+        ProjectFile.objects.create(
+            project=target, folder=folder, file=f"project_files/bench_{n}.txt", uploaded_by=users["PM"],
+        )
+        for n, folder in enumerate([None] + folders)
+    ]
+    empty_folder = ProjectFolder.objects.create(project=target, parent=None, name="Empty")
+
+    # второе устройство каждой роли — его отзывает DELETE /api/auth/devices/{id}/
+    devices = {role: tokens.issue(user, "bench second device")[0] for role, user in users.items()}
+
+    return BenchmarkData(
+        users=users,
+        devices=devices,
+        project=target,
+        task=KanbanTask.objects.filter(project=target).order_by("id").first(),
+        folder=folders[0] if folders else None,
+        empty_folder=empty_folder,
+        file=files[0],
+    )
+
+
+def build_routes(data):
+    """
+    (ключ, метод, путь, тело, формат) для всех маршрутов.
+    Путь может быть функцией от роли — для объектов, своих у каждого пользователя.
+    Формат "session" — HTML-страница, запрос идёт с сессией, а не с токеном.
+    Пишущие запросы выполняются в откатываемой транзакции.
+    """
+    p = data.project
+    t = data.task
+    files = p.files_token
+    move_to = str(data.folder.uuid) if data.folder else ""
+
+    return [
+        # users/urls.py
+        ("POST /api/auth/login/", "post", "/api/auth/login/", "login", "json"),
+        ("GET /api/auth/me/", "get", "/api/auth/me/", None, None),
+        ("POST /api/auth/logout/", "post", "/api/auth/logout/", {}, "json"),
+        ("POST /api/auth/token/refresh/", "post", "/api/auth/token/refresh/", {}, "json"),
+        ("GET /api/auth/devices/", "get", "/api/auth/devices/", None, None),
+        ("DELETE /api/auth/devices/{id}/", "delete",
+         lambda role: f"/api/auth/devices/{data.devices[role].id}/", None, None),
+
+        # crm/urls.py — DRF router
+        ("GET /projects/", "get", "/projects/", None, None),
+        ("GET /projects/{id}/", "get", f"/projects/{p.id}/", None, None),
+        ("GET /projects/{id}/developers/", "get", f"/projects/{p.id}/developers/", None, None),
+        ("PATCH /projects/{id}/", "patch", f"/projects/{p.id}/", {"completion_percent": 50}, "json"),
+        ("GET /developers/", "get", "/developers/", None, None),
+        ("GET /developers/{id}/", "get", f"/developers/{data.users['DEV'].developer_profile.id}/", None, None),
+        ("GET /developers/{id}/projects/", "get",
+         f"/developers/{data.users['DEV'].developer_profile.id}/projects/", None, None),
+
+        # crm/urls.py — HTML и файлы
+        ("GET /projects/{id}/kanban/{token}/", "get", f"/projects/{p.id}/kanban/{p.kanban_token}/", None, "session"),
+        ("GET /projects/{uuid}/files/", "get", f"/projects/{files}/files/", None, "session"),
+        ("GET /projects/{uuid}/files/tree/", "get", f"/projects/{files}/files/tree/", None, None),
+
+        # crm/api_urls.py — канбан
+        ("GET /api/kanban/{id}/", "get", f"/api/kanban/{p.id}/", None, None),
+        ("GET /api/kanban/{id}/assignees/", "get", f"/api/kanban/{p.id}/assignees/", None, None),
+        ("POST /api/kanban/task/", "post", "/api/kanban/task/",
+         {"project": p.id, "title": "Bench", "status": "queue"}, "json"),
+        ("POST /api/kanban/task/bulk/", "post", "/api/kanban/task/bulk/", {
+            "project": p.id,
+            "tasks": [{"title": f"Bench {n}", "status": "queue", "order": n} for n in range(20)]
+            + [{"id": t.id, "status": "inprogress"}],
+        }, "json"),
+        ("PATCH /api/kanban/task/{id}/", "patch", f"/api/kanban/task/{t.id}/", {"title": "Bench edit"}, "json"),
+        ("DELETE /api/kanban/task/{id}/delete/", "delete", f"/api/kanban/task/{t.id}/delete/", None, None),
+        ("POST /api/kanban/reorder/", "post", "/api/kanban/reorder/", {
+            "project": p.id,
+            "updates": [
+                {"id": task_id, "status": "inprogress", "order": n}
+                for n, task_id in enumerate(KanbanTask.objects.filter(project=p).values_list("id", flat=True)[:10])
+            ],
+        }, "json"),
+        ("GET /api/kanban/task/{id}/history/", "get", f"/api/kanban/task/{t.id}/history/", None, None),
+        ("GET /api/kanban/project/{id}/activity/", "get", f"/api/kanban/project/{p.id}/activity/", None, None),
+        ("GET /api/kanban/project/{id}/flow/", "get", f"/api/kanban/project/{p.id}/flow/", None, None),
+
+        # crm/api_urls.py — выгрузки и импорт
+        *[
+            (f"GET /api/export/{kind}.{fmt}", "get", f"/api/export/{kind}.{fmt}", None, None)
+            for kind in ("projects", "developers", "tasks")
+            for fmt in ("csv", "xlsx")
+        ],
+        ("POST /api/import/{kind}/", "post", "/api/import/developers/", "import", "multipart"),
+
+        # crm/api_urls.py — поиск и аналитика
+        ("GET /api/search/", "get", "/api/search/?q=task", None, None),
+        ("GET /api/staffing/match/", "get", "/api/staffing/match/?skills=python,django", None, None),
+        ("GET /api/analytics/", "get", "/api/analytics/", None, None),
+
+        # crm/api_urls.py — файлы
+        ("POST /api/projects/{uuid}/files/upload/", "post", f"/api/projects/{files}/files/upload/", "upload", "multipart"),
+        ("POST /api/projects/{uuid}/folders/create/", "post", f"/api/projects/{files}/folders/create/",
+         {"name": "Bench folder"}, "json"),
+        ("GET /api/projects/{uuid}/files/tree/", "get", f"/api/projects/{files}/files/tree/", None, None),
+        ("DELETE /api/projects/{uuid}/files/{file}/delete/", "delete",
+         f"/api/projects/{files}/files/{data.file.uuid}/delete/", None, None),
+        ("DELETE /api/projects/{uuid}/folders/{folder}/delete/", "delete",
+         f"/api/projects/{files}/folders/{data.empty_folder.uuid}/delete/", None, None),
+        ("POST /api/projects/{uuid}/files/{file}/move/", "post",
+         f"/api/projects/{files}/files/{data.file.uuid}/move/", {"folder": move_to}, "json"),
+    ]
+
+
+def _clients(user):
+    """
+    API-маршруты ходят с токеном (как React-клиент), HTML-страницы — с сессией.
+    """
+    _, token = tokens.issue(user, "benchmark")
+    api = APIClient()
+    api.credentials(HTTP_AUTHORIZATION=f"Token {token}")
+    html = APIClient()
+    html.force_login(user)
+    return api, html
+
+
+def _call(client, method, path, body, fmt, user):
+    if body == "login":
+        return client.post(path, {"username": user.username, "password": BENCH_PASSWORD}, format="json")
+    if body == "upload":
+        upload = SimpleUploadedFile("bench.txt", b"benchmark", content_type="text/plain")
+        return client.post(path, {"files": [upload]}, format="multipart")
+    if body == "import":
+        upload = SimpleUploadedFile("import.csv", IMPORT_CSV.encode(), content_type="text/csv")
+        return client.post(path, {"file": upload, "dry_run": "true"}, format="multipart")
+    if body is None:
+        response = getattr(client, method)(path)
+    else:
+        response = getattr(client, method)(path, body, format=fmt)
+    # выгрузки читают БД по мере отдачи — запросы считаются только при чтении потока
+    if response.streaming:
+        b"".join(response.streaming_content)
+    return response
+
+
+def measure_route(client, method, path, body, fmt, user, repeat):
+    queries = []
+    timings = []
+    status_code = None
+    for _ in range(repeat):
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = _call(client, method, path, body, fmt, user)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(ctx.captured_queries))
+            status_code = response.status_code
+            transaction.set_rollback(True)
+
+    timings.sort()
+    p95_index = min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))
+    return {
+        "status": status_code,
+        # первый (холодный) вызов — максимум: кэши на старте бенчмарка очищены
+        "queries": max(queries),
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[p95_index], 2),
+    }
+
+
+def run_benchmark(**params):
+    """
+    Генерирует данные и прогоняет все маршруты под всеми ролями.
+    Предполагается пустая (тестовая) БД; данные остаются в ней после вызова.
+    """
+    params = {**DEFAULT_PARAMS, **params}
+    results = {}
+    with tempfile.TemporaryDirectory() as media_root, override_settings(
+        MEDIA_ROOT=media_root, PASSWORD_HASHERS=FAST_HASHERS
+    ):
+        data = seed_benchmark_data(**params)
+        routes = build_routes(data)
+        cache.clear()
+        token_cache.clear()
+        for role in ROLES:
+            user = data.users[role]
+            api, html = _clients(user)
+            for key, method, path, body, fmt in routes:
+                client = html if fmt == "session" else api
+                if callable(path):
+                    path = path(role)
+                results.setdefault(key, {})[role] = measure_route(
+                    client, method, path, body, fmt, user, params["repeat"]
+                )
+    return {"params": params, "results": results}
+
+
+def load_baseline(path=BASELINE_PATH):
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def save_baseline(report, path=BASELINE_PATH):
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, ensure_ascii=False, indent=2, sort_keys=True)
+        fh.write("\n")
+
+
+def compare(report, baseline, latency_factor=3.0):
+    """
+    Возвращает (регрессии по запросам, предупреждения по задержке, маршруты без baseline).
+    """
+    regressions, slow, missing = [], [], []
+    for key, roles in report["results"].items():
+        for role, current in roles.items():
+            expected = baseline["results"].get(key, {}).get(role)
+            if expected is None:
+                missing.append(f"{key} [{role}]")
+                continue
+            if current["queries"] > expected["queries"]:
+                regressions.append(
+                    f"{key} [{role}]: {expected['queries']} -> {current['queries']} queries"
+                )
+            if current["status"] != expected["status"]:
+                regressions.append(
+                    f"{key} [{role}]: status {expected['status']} -> {current['status']}"
+                )
+            if latency_factor and current["p95_ms"] > expected["p95_ms"] * latency_factor:
+                slow.append(f"{key} [{role}]: p95 {expected['p95_ms']} -> {current['p95_ms']} ms")
+    return regressions, slow, missing
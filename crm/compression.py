@@ -0,0 +1,174 @@
+"""
+Сжатие ответов: brotli, если пакет brotli (или brotlicffi) установлен и клиент его принимает, иначе gzip.
+
+CompressionMiddleware сжимает ответы с текстовыми типами (JSON API, HTML, CSV, JS/CSS)
+не короче CRM_COMPRESS_MIN_SIZE байт. StreamingHttpResponse сжимается по мере отдачи,
+без буферизации всего ответа. Уже сжатые ответы (Content-Encoding, zip/xlsx, картинки) не трогаются.
+
+Для gzip, как и в django.middleware.gzip.GZipMiddleware, в заголовок добавляется случайное
+имя файла (защита от BREACH); у brotli такого поля нет.
+"""
+import gzip
+import re
+import secrets
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+from django.utils.text import StreamingBuffer
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - зависит от окружения
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+MAX_RANDOM_BYTES = 100
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/problem+json",
+    "image/svg+xml",
+)
+
+_accept_re = re.compile(r"\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$")
+
+
+def available_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding):
+    """
+    Лучшая из доступных кодировок по заголовку Accept-Encoding (br важнее gzip при равном q).
+    """
+    weights = {}
+    for part in (accept_encoding or "").lower().split(","):
+        match = _accept_re.match(part)
+        if not match:
+            continue
+        try:
+            q = float(match.group(2)) if match.group(2) is not None else 1.0
+        except ValueError:
+            continue
+        weights[match.group(1)] = q
+
+    best, best_q = None, 0.0
+    for encoding in available_encodings():
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible(content_type):
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    # SSE нельзя буферизовать в компрессоре — события придут с задержкой
+    if content_type == "text/event-stream":
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.endswith("+json")
+
+
+class StreamCompressor:
+    """
+    Инкрементальный компрессор: compress(chunk) отдаёт готовые байты, finish() — хвост потока.
+    """
+
+    def __init__(self, encoding, max_random_bytes=None):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+            return
+        self._buffer = StreamingBuffer()
+        filename = b"a" * secrets.randbelow(max_random_bytes) if max_random_bytes else None
+        self._gzip = gzip.GzipFile(
+            filename=filename, mode="wb", compresslevel=GZIP_LEVEL, fileobj=self._buffer, mtime=0,
+        )
+
+    def compress(self, chunk):
+        if self.encoding == "br":
+            return self._brotli.process(chunk)
+        self._gzip.write(chunk)
+        return self._buffer.read()
+
+    def finish(self):
+        if self.encoding == "br":
+            return self._brotli.finish()
+        self._gzip.close()
+        return self._buffer.read()
+
+
+def compress_bytes(data, encoding, max_random_bytes=None):
+    compressor = StreamCompressor(encoding, max_random_bytes)
+    return compressor.compress(data) + compressor.finish()
+
+
+def compress_iterator(chunks, compressor):
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def compress_async_iterator(chunks, compressor):
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, "CRM_COMPRESS_ENABLED", True):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.min_size = getattr(settings, "CRM_COMPRESS_MIN_SIZE", 1024)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding") or not is_compressible(response.get("Content-Type")):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING"))
+        if encoding is None:
+            return response
+
+        max_random_bytes = MAX_RANDOM_BYTES if encoding == "gzip" else None
+        if response.streaming:
+            compressor = StreamCompressor(encoding, max_random_bytes)
+            # ссылка на исходный итератор фиксируется до подмены streaming_content
+            original = response.streaming_content
+            if response.is_async:
+                response.streaming_content = compress_async_iterator(original, compressor)
+            else:
+                response.streaming_content = compress_iterator(original, compressor)
+            # итоговый размер неизвестен до конца потока
+            del response.headers["Content-Length"]
+        else:
+            compressed = compress_bytes(response.content, encoding, max_random_bytes)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # сильный ETag относится к несжатому представлению (RFC 9110, 8.8.1)
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,70 @@
+"""
+Оптимистическая блокировка задач канбана и проектов.
+
+Клиент присылает version, которую видел при чтении; запись выполняется только если
+она не изменилась: UPDATE ... SET version = version + 1 WHERE id = ? AND version = ?.
+0 изменённых строк — запись уже сделал кто-то другой, API отвечает 409 с текущим
+состоянием, и клиенту не нужно часто опрашивать сервер, чтобы не затереть чужие правки.
+
+Без version в запросе сравнение идёт с версией, прочитанной в начале запроса.
+"""
+from django.db.models import F, Q
+
+
+class InvalidVersion(ValueError):
+    pass
+
+
+def parse_version(value, default):
+    """
+    version из запроса; None/"" — default (версия, прочитанная из БД).
+    """
+    if value in (None, ""):
+        return default
+    if isinstance(value, bool):
+        raise InvalidVersion(value)
+    try:
+        version = int(value)
+    except (TypeError, ValueError):
+        raise InvalidVersion(value)
+    if version < 1:
+        raise InvalidVersion(value)
+    return version
+
+
+def claim_version(instance, expected, **fields):
+    """
+    Условный UPDATE строки instance: version + 1 и fields, если версия в БД равна expected.
+    При успехе обновляет instance.version (и поля) в памяти и возвращает True.
+    Вызывать внутри transaction.atomic(), если за этим следует ещё запись.
+    """
+    updated = type(instance)._default_manager.filter(pk=instance.pk, version=expected).update(
+        version=F("version") + 1, **fields
+    )
+    if not updated:
+        return False
+    instance.version = expected + 1
+    for name, value in fields.items():
+        setattr(instance, name, value)
+    return True
+
+
+def claim_versions(model, expected):
+    """
+    Пакетный claim_version: expected — {pk: версия}. Возвращает множество pk, версия которых
+    в БД уже другая; при пустом множестве версии всех строк увеличены на 1.
+    Два запроса на пакет; вызывать внутри transaction.atomic() и откатывать при конфликте.
+    """
+    if not expected:
+        return set()
+    current = dict(model._default_manager.filter(pk__in=expected).values_list("pk", "version"))
+    conflicts = {pk for pk, version in expected.items() if current.get(pk) != version}
+    if conflicts:
+        return conflicts
+    condition = Q()
+    for pk, version in expected.items():
+        condition |= Q(pk=pk, version=version)
+    if model._default_manager.filter(condition).update(version=F("version") + 1) != len(expected):
+        # строку изменили между чтением и UPDATE — какую именно, не важно: транзакция откатывается
+        return set(expected)
+    return conflicts
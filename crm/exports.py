@@ -0,0 +1,304 @@
+"""
+Выгрузка проектов, разработчиков и задач канбана в CSV/XLSX потоком.
+
+Строки читаются values_list(...).iterator(chunk_size=CRM_EXPORT_CHUNK_SIZE) и сразу
+отдаются в StreamingHttpResponse, поэтому память не растёт с числом строк.
+XLSX собирается тем же потоком: zipfile пишет в буфер без seek (data descriptor),
+лист — inline-строки без sharedStrings, чтобы ничего не держать до конца выгрузки.
+
+Набор колонок зависит от роли так же, как в API: колонка попадает в выгрузку, только если
+её поле есть в сериализаторе роли (ProjectDeveloperSerializer без total_cost/customer_name,
+DeveloperPMSerializer без contacts ...). Паспортные данные не выгружаются никому.
+"""
+import csv
+import datetime
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+
+from .models import Developer, KanbanTask, Project
+from .serializers import (
+    DeveloperAdminSerializer, DeveloperDeveloperSerializer, DeveloperPMSerializer,
+    ProjectAdminSerializer, ProjectDeveloperSerializer, ProjectPMSerializer,
+)
+
+FORMATS = ("csv", "xlsx")
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# (заголовок, lookup для values_list, поле сериализатора роли, без которого колонка скрыта)
+EXPORTS = {
+    "projects": {
+        "columns": [
+            ("id", "id", "id"),
+            ("name", "name", "name"),
+            ("customer_name", "customer_name", "customer_name"),
+            ("total_cost", "total_cost", "total_cost"),
+            ("deadline", "deadline", "deadline"),
+            ("completion_percent", "completion_percent", "completion_percent"),
+            ("responsible", "responsible_id", "responsible"),
+            ("responsible_username", "responsible__username", "responsible"),
+            ("active_stage", "active_stage", "active_stage"),
+            ("created_at", "created_at", "created_at"),
+            ("updated_at", "updated_at", "updated_at"),
+        ],
+        "serializers": {
+            "admin": ProjectAdminSerializer,
+            "pm": ProjectPMSerializer,
+            "dev": ProjectDeveloperSerializer,
+        },
+    },
+    "developers": {
+        "columns": [
+            ("id", "id", "id"),
+            ("username", "user__username", "user_details"),
+            ("full_name", "full_name", "full_name"),
+            ("position", "position", "position"),
+            ("cooperation_format", "cooperation_format", "cooperation_format"),
+            ("workload", "workload", "workload"),
+            ("salary", "salary", "salary"),
+            ("contacts", "contacts", "contacts"),
+            ("competencies", "competencies", "competencies"),
+        ],
+        "serializers": {
+            "admin": DeveloperAdminSerializer,
+            "pm": DeveloperPMSerializer,
+            "dev": DeveloperDeveloperSerializer,
+        },
+    },
+    "tasks": {
+        "columns": [
+            ("id", "id", None),
+            ("project", "project_id", None),
+            ("project_name", "project__name", None),
+            ("status", "column__code", None),
+            ("title", "title", None),
+            ("description", "description", None),
+            ("order", "order", None),
+            ("assignee_kind", "assignee_kind", None),
+            ("assignee_developer", "assignee_developer_id", None),
+            ("assignee_developer_name", "assignee_developer__full_name", None),
+            ("assignee_user", "assignee_user_id", None),
+            ("deadline", "deadline", None),
+            ("updated_at", "updated_at", None),
+        ],
+        "serializers": {},
+    },
+}
+
+
+def _role(user):
+    if user.is_superuser or user.is_admin_role():
+        return "admin"
+    if user.is_pm():
+        return "pm"
+    if user.is_dev():
+        return "dev"
+    return None
+
+
+def export_columns(kind, user):
+    """
+    [(заголовок, lookup)] для роли пользователя.
+    """
+    spec = EXPORTS[kind]
+    if not spec["serializers"]:
+        return [(header, lookup) for header, lookup, _ in spec["columns"]]
+    serializer_class = spec["serializers"].get(_role(user))
+    if serializer_class is None:
+        return []
+    visible = set(serializer_class().fields)
+    return [(header, lookup) for header, lookup, field in spec["columns"] if field in visible]
+
+
+def export_queryset(kind, user, project_id=None):
+    if kind == "projects":
+        return Project.objects.visible_to(user).order_by("id")
+    if kind == "developers":
+        role = _role(user)
+        if role in ("admin", "pm"):
+            return Developer.objects.order_by("id")
+        if role == "dev":
+            return Developer.objects.filter(user=user).order_by("id")
+        return Developer.objects.none()
+
+    qs = KanbanTask.objects.filter(project__in=Project.objects.visible_to(user).values("id"))
+    if project_id is not None:
+        qs = qs.filter(project_id=project_id)
+    return qs.order_by("id")
+
+
+def export_rows(queryset, lookups):
+    chunk_size = getattr(settings, "CRM_EXPORT_CHUNK_SIZE", 2000)
+    return queryset.values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+def _text(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat().replace("+00:00", "Z")
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return str(value)
+
+
+# --- CSV ---
+
+class _Echo:
+    """
+    «Файл» для csv.writer: writerow возвращает готовую строку.
+    """
+
+    def write(self, value):
+        return value
+
+
+def _csv_cell(value):
+    if value is None:
+        return ""
+    text = _text(value)
+    # защита от выполнения формул при открытии в Excel (=, +, -, @ в начале текста)
+    if isinstance(value, str) and text[:1] in ("=", "+", "-", "@", "\t", "\r"):
+        return "'" + text
+    return text
+
+
+def stream_csv(header, rows, batch=500):
+    writer = csv.writer(_Echo())
+    # BOM — чтобы Excel открыл UTF-8 с кириллицей
+    yield "\ufeff" + writer.writerow(header)
+    buffer = []
+    for row in rows:
+        buffer.append(writer.writerow([_csv_cell(value) for value in row]))
+        if len(buffer) >= batch:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+
+
+# --- XLSX ---
+
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+XLSX_MAX_CELL = 32767
+
+XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+XLSX_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+XLSX_SHEET_TAIL = "</sheetData></worksheet>"
+
+
+class _ZipStream:
+    """
+    Буфер без tell/seek: zipfile пишет размеры в data descriptor после данных,
+    поэтому готовые байты можно отдавать клиенту сразу.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c t="n"><v>{value}</v></c>'
+    text = escape(_XML_ILLEGAL.sub("", _text(value))[:XLSX_MAX_CELL])
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return "<row>" + "".join(_xlsx_cell(value) for value in values) + "</row>"
+
+
+def stream_xlsx(sheet_name, header, rows, batch=500):
+    out = _ZipStream()
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+        archive.writestr("xl/workbook.xml", XLSX_WORKBOOK.format(name=escape(sheet_name)))
+        yield out.drain()
+
+        with archive.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write((XLSX_SHEET_HEAD + _xlsx_row(header)).encode())
+            buffer = []
+            for row in rows:
+                buffer.append(_xlsx_row(row))
+                if len(buffer) >= batch:
+                    sheet.write("".join(buffer).encode())
+                    buffer = []
+                    data = out.drain()
+                    if data:
+                        yield data
+            sheet.write(("".join(buffer) + XLSX_SHEET_TAIL).encode())
+    yield out.drain()
+
+
+def stream_export(kind, fmt, user, project_id=None):
+    """
+    Итератор байтов/строк для StreamingHttpResponse.
+    """
+    columns = export_columns(kind, user)
+    header = [name for name, _ in columns]
+    rows = export_rows(export_queryset(kind, user, project_id), [lookup for _, lookup in columns])
+    if fmt == "xlsx":
+        return stream_xlsx(kind, header, rows)
+    return stream_csv(header, rows)
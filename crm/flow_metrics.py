@@ -0,0 +1,309 @@
+"""
+Метрики потока канбана: cumulative flow diagram, lead/cycle time, время в колонках.
+
+История (KanbanTaskHistory) инкрементально сворачивается в предрасчитанные таблицы:
+- KanbanFlowSnapshot — число задач в колонках на конец дня по проекту
+- KanbanTaskFlow — моменты создания/старта/завершения и время задачи в каждой колонке
+Позиция свёртки хранится в KanbanMetricsWatermark по паре (created_at, id),
+поэтому графики никогда не сканируют всю историю. Записи связываются с задачей по task_ref:
+FK task обнуляется при удалении задачи, а её события свёртка может прочитать и позже.
+"""
+import datetime
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.utils import timezone
+
+from .models import (
+    KanbanColumn, KanbanFlowSnapshot, KanbanMetricsWatermark, KanbanTaskFlow, KanbanTaskHistory,
+)
+
+WATERMARK_NAME = "kanban_flow"
+
+# колонка, из которой задача «стартует» (cycle time считается с первого выхода из неё)
+QUEUE_COLUMN = "queue"
+
+FLOW_ACTIONS = (
+    KanbanTaskHistory.ACTION_CREATE,
+    KanbanTaskHistory.ACTION_MOVE,
+    KanbanTaskHistory.ACTION_DELETE,
+)
+
+# записи моложе этого не сворачиваем: created_at проставляется до коммита,
+# и параллельная транзакция может закоммитить более «раннюю» запись позже
+SAFETY_LAG = datetime.timedelta(seconds=5)
+
+BATCH_SIZE = 5000
+
+
+class WatermarkMoved(Exception):
+    """Параллельная свёртка уже продвинула watermark — текущую откатываем."""
+
+
+def _day(dt):
+    return timezone.localdate(dt)
+
+
+def _new_flow(row):
+    return KanbanTaskFlow(project_id=row["project_id"], task_id=row["task_ref"], column_seconds={})
+
+
+def _leave_column(flow, at):
+    if flow.current_column and flow.entered_at:
+        spent = max(0, int((at - flow.entered_at).total_seconds()))
+        seconds = dict(flow.column_seconds or {})
+        seconds[flow.current_column] = seconds.get(flow.current_column, 0) + spent
+        flow.column_seconds = seconds
+    flow.current_column = None
+    flow.entered_at = None
+
+
+def _enter_column(flow, column, at):
+    flow.current_column = column
+    flow.entered_at = at
+    if column != QUEUE_COLUMN and flow.started_at is None:
+        flow.started_at = at
+    # переезд из «Готово» обратно — задача снова открыта
+    flow.done_at = at if column == KanbanColumn.DONE else None
+
+
+def _apply(row, flow, deltas):
+    """
+    Применяет одно событие истории к состоянию задачи и к дельтам CFD.
+    """
+    at = row["created_at"]
+    day_deltas = deltas[(row["project_id"], _day(at))]
+    action = row["action"]
+
+    if action == KanbanTaskHistory.ACTION_CREATE:
+        flow.created_at = at
+        if row["to_column"]:
+            _enter_column(flow, row["to_column"], at)
+            day_deltas[row["to_column"]] += 1
+
+    elif action == KanbanTaskHistory.ACTION_MOVE:
+        from_column = flow.current_column or row["from_column"]
+        _leave_column(flow, at)
+        if from_column:
+            day_deltas[from_column] -= 1
+        if row["to_column"]:
+            _enter_column(flow, row["to_column"], at)
+            day_deltas[row["to_column"]] += 1
+
+    elif action == KanbanTaskHistory.ACTION_DELETE:
+        from_column = flow.current_column or row["from_column"]
+        _leave_column(flow, at)
+        if from_column:
+            day_deltas[from_column] -= 1
+        flow.deleted_at = at
+
+
+def _latest_counts(project_ids):
+    """
+    {project_id: (date, {column: count})} — последний снапшот каждого проекта.
+    """
+    latest_date = Subquery(
+        KanbanFlowSnapshot.objects.filter(project_id=OuterRef("project_id"))
+        .order_by("-date")
+        .values("date")[:1]
+    )
+    result = {}
+    rows = (
+        KanbanFlowSnapshot.objects.filter(project_id__in=project_ids)
+        .filter(date=latest_date)
+        .values_list("project_id", "date", "column", "count")
+    )
+    for project_id, date, column, count in rows:
+        result.setdefault(project_id, (date, {}))[1][column] = count
+    return result
+
+
+def _write_snapshots(deltas):
+    """
+    Накладывает дневные дельты на последний снапшот проекта и сохраняет снапшоты по дням.
+    События приходят в порядке created_at, поэтому дни в дельтах не раньше последнего снапшота.
+    """
+    by_project = defaultdict(dict)
+    for (project_id, day), columns in deltas.items():
+        by_project[project_id][day] = columns
+
+    latest = _latest_counts(list(by_project))
+    snapshots = []
+    for project_id, days in by_project.items():
+        counts = dict(latest.get(project_id, (None, {}))[1])
+        for day in sorted(days):
+            for column, delta in days[day].items():
+                counts[column] = counts.get(column, 0) + delta
+            snapshots.extend(
+                KanbanFlowSnapshot(project_id=project_id, date=day, column=column, count=max(0, count))
+                for column, count in counts.items()
+            )
+
+    if snapshots:
+        KanbanFlowSnapshot.objects.bulk_create(
+            snapshots,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["project", "date", "column"],
+            update_fields=["count"],
+        )
+
+
+def _fold_batch(watermark, until, batch_size):
+    qs = KanbanTaskHistory.objects.filter(action__in=FLOW_ACTIONS, created_at__lt=until)
+    if watermark.last_created_at is not None:
+        qs = qs.filter(
+            Q(created_at__gt=watermark.last_created_at)
+            | Q(created_at=watermark.last_created_at, id__gt=watermark.last_history_id)
+        )
+    rows = list(
+        qs.order_by("created_at", "id").values(
+            "id", "project_id", "task_ref", "action", "from_column", "to_column", "created_at"
+        )[:batch_size]
+    )
+    if not rows:
+        return 0
+
+    task_ids = {row["task_ref"] for row in rows if row["task_ref"]}
+    flows = {f.task_id: f for f in KanbanTaskFlow.objects.filter(task_id__in=task_ids)}
+    existing = set(flows)
+
+    deltas = defaultdict(lambda: defaultdict(int))
+    for row in rows:
+        if not row["task_ref"]:
+            # запись до появления task_ref об уже удалённой задаче — для CFD учитываем только перемещение
+            flow = KanbanTaskFlow(project_id=row["project_id"], task_id=0, column_seconds={})
+        else:
+            flow = flows.get(row["task_ref"])
+            if flow is None:
+                flow = flows[row["task_ref"]] = _new_flow(row)
+        _apply(row, flow, deltas)
+
+    fields = ["current_column", "entered_at", "created_at", "started_at", "done_at", "deleted_at", "column_seconds"]
+    KanbanTaskFlow.objects.bulk_create([f for tid, f in flows.items() if tid not in existing], batch_size=1000)
+    KanbanTaskFlow.objects.bulk_update([f for tid, f in flows.items() if tid in existing], fields, batch_size=1000)
+    _write_snapshots(deltas)
+
+    last = rows[-1]
+    moved = KanbanMetricsWatermark.objects.filter(
+        pk=watermark.pk,
+        last_created_at=watermark.last_created_at,
+        last_history_id=watermark.last_history_id,
+    ).update(last_created_at=last["created_at"], last_history_id=last["id"], updated_at=timezone.now())
+    if not moved:
+        raise WatermarkMoved()
+
+    watermark.last_created_at = last["created_at"]
+    watermark.last_history_id = last["id"]
+    return len(rows)
+
+
+def fold_history(batch_size=BATCH_SIZE, max_batches=None):
+    """
+    Сворачивает новые записи истории в таблицы метрик. Возвращает число обработанных записей.
+    Каждая пачка — отдельная транзакция; при гонке с другим процессом пачка откатывается
+    и свёртка просто завершается (её доделает победивший процесс).
+    """
+    watermark, _ = KanbanMetricsWatermark.objects.get_or_create(name=WATERMARK_NAME)
+    until = timezone.now() - SAFETY_LAG
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        try:
+            with transaction.atomic():
+                processed = _fold_batch(watermark, until, batch_size)
+        except WatermarkMoved:
+            break
+        total += processed
+        batches += 1
+        if processed < batch_size:
+            break
+    return total
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(q * (len(values) - 1)))))
+    return values[index]
+
+
+def _hours(seconds):
+    return None if seconds is None else round(seconds / 3600, 2)
+
+
+def cumulative_flow(project, start, end):
+    """
+    Ряд по дням [start, end]: {"date", "columns": {code: count}} с заполнением пропусков.
+    """
+    base = {}
+    previous = (
+        KanbanFlowSnapshot.objects.filter(project=project, date__lt=start)
+        .order_by("-date")
+        .values_list("date", flat=True)
+        .first()
+    )
+    if previous:
+        base = dict(
+            KanbanFlowSnapshot.objects.filter(project=project, date=previous).values_list("column", "count")
+        )
+
+    by_day = defaultdict(dict)
+    for date, column, count in KanbanFlowSnapshot.objects.filter(
+        project=project, date__gte=start, date__lte=end
+    ).values_list("date", "column", "count"):
+        by_day[date][column] = count
+
+    series = []
+    counts = base
+    day = start
+    while day <= end:
+        if day in by_day:
+            counts = by_day[day]
+        series.append({"date": day.isoformat(), "columns": dict(counts)})
+        day += datetime.timedelta(days=1)
+    return series
+
+
+def cycle_time_stats(project, start, end):
+    """
+    Lead time (создание → готово), cycle time (старт → готово) и среднее время в колонках
+    по задачам, завершённым в интервале.
+    """
+    start_dt = timezone.make_aware(datetime.datetime.combine(start, datetime.time.min))
+    end_dt = timezone.make_aware(datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min))
+
+    rows = KanbanTaskFlow.objects.filter(
+        project=project, done_at__gte=start_dt, done_at__lt=end_dt
+    ).values_list("created_at", "started_at", "done_at", "column_seconds")
+
+    lead, cycle = [], []
+    column_totals = defaultdict(int)
+    completed = 0
+    for created_at, started_at, done_at, column_seconds in rows:
+        completed += 1
+        if created_at:
+            lead.append((done_at - created_at).total_seconds())
+        if started_at:
+            cycle.append((done_at - started_at).total_seconds())
+        for column, seconds in (column_seconds or {}).items():
+            column_totals[column] += seconds
+
+    return {
+        "completed": completed,
+        "lead_time_hours": {
+            "avg": _hours(sum(lead) / len(lead)) if lead else None,
+            "p50": _hours(_percentile(lead, 0.5)),
+            "p85": _hours(_percentile(lead, 0.85)),
+        },
+        "cycle_time_hours": {
+            "avg": _hours(sum(cycle) / len(cycle)) if cycle else None,
+            "p50": _hours(_percentile(cycle, 0.5)),
+            "p85": _hours(_percentile(cycle, 0.85)),
+        },
+        "avg_hours_in_column": {
+            column: _hours(total / completed) for column, total in sorted(column_totals.items())
+        } if completed else {},
+    }
@@ -0,0 +1,198 @@
+"""
+Идемпотентные POST по заголовку Idempotency-Key (создание задач, reorder, загрузка файлов).
+
+Клиент генерирует ключ на операцию и при сетевом сбое повторяет запрос с тем же ключом.
+Первый запрос резервирует строку IdempotencyKey (уникальна по пользователю, эндпоинту и ключу),
+выполняется и сохраняет статус и тело ответа; повтор получает сохранённый ответ без повторной
+работы — без дублей задач, файлов и записей истории (заголовок Idempotent-Replayed: true).
+
+- тот же ключ, пока первый запрос ещё выполняется — 409;
+- тот же ключ с другим телом запроса — 422;
+- 5xx и исключения не сохраняются, работа откатывается: запрос можно повторить с тем же ключом.
+  Побочные эффекты вне БД (файлы в storage) view отменяет через on_rollback.
+
+Без заголовка (и для анонимных запросов) view работает как раньше.
+Незавершённый запрос держит ключ CRM_IDEMPOTENCY_LOCK_TIMEOUT секунд (больше таймаута воркера),
+после этого ключ считается брошенным (упал воркер) и повтор выполняется заново.
+Записи живут CRM_IDEMPOTENCY_TTL секунд; при вставке изредка (PURGE_PROBABILITY) удаляются
+просроченные и самые старые сверх CRM_IDEMPOTENCY_MAX_KEYS, полностью — purge_idempotency_keys.
+"""
+import contextvars
+import datetime
+import functools
+import hashlib
+import json
+import logging
+import random
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+HEADER = "Idempotency-Key"
+REPLAY_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+PURGE_PROBABILITY = 0.01
+
+_rollback_callbacks = contextvars.ContextVar("idempotency_rollback_callbacks", default=None)
+
+
+def _ttl():
+    return datetime.timedelta(seconds=getattr(settings, "CRM_IDEMPOTENCY_TTL", 24 * 3600))
+
+
+def _lock_timeout():
+    return datetime.timedelta(seconds=getattr(settings, "CRM_IDEMPOTENCY_LOCK_TIMEOUT", 600))
+
+
+def on_rollback(callback):
+    """
+    Отмена побочного эффекта вне БД (например, файла в storage): callback вызывается,
+    если работа идемпотентного запроса откатилась (исключение или 5xx).
+    Вне такого запроса ничего не делает.
+    """
+    callbacks = _rollback_callbacks.get()
+    if callbacks is not None:
+        callbacks.append(callback)
+
+
+def _run_rollback_callbacks(callbacks):
+    for callback in reversed(callbacks):
+        try:
+            callback()
+        except Exception:
+            logger.exception("Idempotency rollback callback failed")
+
+
+def _data_items(data):
+    # multipart: файлы участвуют в отпечатке именем и размером, содержимое не читается
+    if hasattr(data, "lists"):
+        return sorted(
+            (name, [f"{v.name}:{v.size}" if hasattr(v, "size") else v for v in values])
+            for name, values in data.lists()
+        )
+    return data
+
+
+def request_fingerprint(request):
+    payload = json.dumps(
+        [request.method, request.path, _data_items(request.data)],
+        sort_keys=True, default=str, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _error(detail, status_code):
+    return Response({"detail": detail}, status=status_code)
+
+
+def _reserve(user, endpoint, key, fingerprint):
+    """
+    (запись, None) — ключ занят этим запросом; (None, ответ) — повтор или ошибка.
+    """
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                user=user, endpoint=endpoint, key=key, fingerprint=fingerprint, created_at=now,
+            )
+    except IntegrityError:
+        record = IdempotencyKey.objects.filter(user=user, endpoint=endpoint, key=key).first()
+    else:
+        if random.random() < PURGE_PROBABILITY:
+            purge_expired()
+        return record, None
+
+    if record is None:
+        return None, _error("Запрос с этим ключом ещё выполняется", status.HTTP_409_CONFLICT)
+
+    abandoned = (
+        record.status_code is None
+        and record.created_at <= now - _lock_timeout()
+    )
+    if record.created_at <= now - _ttl() or abandoned:
+        # ключ просрочен — занимаем заново условным UPDATE, чтобы два повтора не заняли его оба
+        taken = IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at).update(
+            created_at=now, fingerprint=fingerprint, status_code=None, response=None,
+        )
+        if taken:
+            record.created_at, record.fingerprint, record.status_code, record.response = now, fingerprint, None, None
+            return record, None
+        return None, _error("Запрос с этим ключом ещё выполняется", status.HTTP_409_CONFLICT)
+
+    if record.fingerprint != fingerprint:
+        return None, _error(
+            "Idempotency-Key уже использован для другого запроса", status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if record.status_code is None:
+        return None, _error("Запрос с этим ключом ещё выполняется", status.HTTP_409_CONFLICT)
+    return None, Response(record.response, status=record.status_code, headers={REPLAY_HEADER: "true"})
+
+
+def idempotent(view):
+    """
+    Декоратор function-based view под @api_view: учитывает заголовок Idempotency-Key.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None or not request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return _error("Некорректный Idempotency-Key", status.HTTP_400_BAD_REQUEST)
+
+        record, replay = _reserve(request.user, view.__name__, key, request_fingerprint(request))
+        if replay is not None:
+            return replay
+
+        callbacks = []
+        context = _rollback_callbacks.set(callbacks)
+        try:
+            # работа и сохранённый ответ фиксируются вместе: нет ответа — нет и изменений
+            with transaction.atomic():
+                response = view(request, *args, **kwargs)
+                if response.status_code < 500:
+                    record.status_code = response.status_code
+                    record.response = response.data
+                    record.save(update_fields=["status_code", "response"])
+                else:
+                    transaction.set_rollback(True)
+        except BaseException:
+            _run_rollback_callbacks(callbacks)
+            record.delete()
+            raise
+        finally:
+            _rollback_callbacks.reset(context)
+
+        if response.status_code >= 500:
+            _run_rollback_callbacks(callbacks)
+            record.delete()
+        return response
+
+    return wrapper
+
+
+def purge_expired(max_keys=None):
+    """
+    Удаляет просроченные ключи и самые старые сверх max_keys; возвращает число удалённых.
+    """
+    if max_keys is None:
+        max_keys = getattr(settings, "CRM_IDEMPOTENCY_MAX_KEYS", 100000)
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lte=timezone.now() - _ttl()).delete()
+
+    boundary = list(
+        IdempotencyKey.objects.order_by("-created_at")
+        .values_list("created_at", flat=True)[max_keys:max_keys + 1]
+    )
+    if boundary:
+        overflow, _ = IdempotencyKey.objects.filter(created_at__lte=boundary[0]).delete()
+        deleted += overflow
+    return deleted
@@ -0,0 +1,328 @@
+"""
+Импорт пользователей, разработчиков и проектов из CSV (онбординг отдела).
+
+Файл читается построчно и обрабатывается пачками по batch_size строк: строки пачки
+проверяются сериализатором, ссылки (логины, ответственные, команда проекта) проверяются
+одним запросом на пачку, затем пачка пишется bulk_create. Сигналы post_save при этом
+не срабатывают — профили разработчиков создаются users.profiles.sync_developer_profiles
+или сразу со всеми полями, индексы поиска и компетенций обновляются для пачки целиком.
+
+Весь импорт идёт в одной транзакции: при atomic=True любая ошибка откатывает файл целиком,
+при atomic=False сохраняются корректные строки. dry_run — только проверка, с откатом.
+Разделитель (запятая или точка с запятой) определяется по заголовку.
+"""
+import csv
+import itertools
+import re
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.db import transaction
+from rest_framework import serializers
+
+from users.models import User
+from users.profiles import sync_developer_profiles
+
+from . import search
+from .models import Developer, Project
+from .staffing import sync_competencies_bulk
+from .workload import invalidate_workloads
+
+MAX_REPORTED_ERRORS = 100
+
+_LIST_SPLIT_RE = re.compile(r"[;|,]")
+
+
+class ImportFormatError(ValueError):
+    """
+    Файл нельзя разобрать целиком (нет нужных колонок, не CSV).
+    """
+
+
+class _Rollback(Exception):
+    pass
+
+
+def read_rows(stream):
+    """
+    (номер строки, dict) из текстового потока; пустые ячейки отбрасываются.
+    """
+    header = stream.readline()
+    if not header.strip():
+        raise ImportFormatError("Пустой файл")
+    delimiter = ";" if header.count(";") > header.count(",") else ","
+    reader = csv.DictReader(itertools.chain([header], stream), delimiter=delimiter)
+    fields = [name.strip() for name in reader.fieldnames or []]
+    reader.fieldnames = fields
+    yield fields
+    for row in reader:
+        cleaned = {
+            key: value.strip() for key, value in row.items()
+            if key and isinstance(value, str) and value.strip()
+        }
+        if cleaned:
+            yield reader.line_num, cleaned
+
+
+def _split_list(value):
+    return [item.strip() for item in _LIST_SPLIT_RE.split(value or "") if item.strip()]
+
+
+# --- сериализаторы строк ---
+
+class UserRowSerializer(serializers.Serializer):
+    username = serializers.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    email = serializers.EmailField(required=False, default="")
+    full_name = serializers.CharField(max_length=255, required=False, default="")
+    role = serializers.ChoiceField(choices=User.Roles.choices, required=False, default=User.Roles.DEV)
+    password = serializers.CharField(required=False, default=None)
+
+
+class DeveloperRowSerializer(UserRowSerializer):
+    role = None
+    full_name = serializers.CharField(max_length=255)
+    position = serializers.CharField(max_length=255, required=False, default="")
+    cooperation_format = serializers.ChoiceField(
+        choices=Developer.CooperationFormat.choices, required=False, default=Developer.CooperationFormat.FULL_TIME,
+    )
+    workload = serializers.CharField(max_length=255, required=False, default="")
+    salary = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal("0"), required=False, default=None)
+    competencies = serializers.CharField(required=False, default="")
+    contacts = serializers.CharField(required=False, default="")
+
+
+class ProjectRowSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=255)
+    customer_name = serializers.CharField(max_length=255, required=False, default="")
+    total_cost = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=Decimal("0"), required=False, default=None)
+    deadline = serializers.DateField(input_formats=["iso-8601", "%d.%m.%Y"], required=False, default=None)
+    completion_percent = serializers.IntegerField(min_value=0, max_value=100, required=False, default=0)
+    responsible = serializers.CharField(required=False, default="")
+    developers = serializers.CharField(required=False, default="")
+    stages = serializers.CharField(required=False, default="")
+    active_stage = serializers.CharField(required=False, default="")
+    comments = serializers.CharField(required=False, default="")
+
+
+# --- импортёры ---
+
+class BaseImporter:
+    row_serializer = None
+    required_columns = ()
+
+    def __init__(self, batch_size=500, atomic=True, dry_run=False):
+        self.batch_size = batch_size
+        self.atomic = atomic
+        self.dry_run = dry_run
+        self.report = {"rows": 0, "created": 0, "errors": [], "error_count": 0, "committed": False}
+
+    def error(self, line, errors):
+        self.report["error_count"] += 1
+        if len(self.report["errors"]) < MAX_REPORTED_ERRORS:
+            self.report["errors"].append({"line": line, "errors": errors})
+
+    def run(self, stream):
+        rows = read_rows(stream)
+        header = next(rows)
+        missing = [name for name in self.required_columns if name not in header]
+        if missing:
+            raise ImportFormatError(f"Нет колонок: {', '.join(missing)}")
+
+        try:
+            with transaction.atomic():
+                while True:
+                    batch = list(itertools.islice(rows, self.batch_size))
+                    if not batch:
+                        break
+                    self.report["rows"] += len(batch)
+                    self.process(self.validate(batch))
+                if self.dry_run or (self.atomic and self.report["error_count"]):
+                    raise _Rollback
+        except _Rollback:
+            pass
+        else:
+            self.report["committed"] = True
+            self.after_commit()
+        # ошибки сериализатора и ссылок собираются раздельно — в отчёте по порядку строк
+        self.report["errors"].sort(key=lambda item: item["line"])
+        return self.report
+
+    def validate(self, batch):
+        valid = []
+        for line, row in batch:
+            serializer = self.row_serializer(data=row)
+            if serializer.is_valid():
+                valid.append((line, serializer.validated_data))
+            else:
+                self.error(line, serializer.errors)
+        return valid
+
+    def process(self, rows):
+        raise NotImplementedError
+
+    def after_commit(self):
+        pass
+
+
+class UserImporter(BaseImporter):
+    row_serializer = UserRowSerializer
+    required_columns = ("username",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.seen = set()
+
+    def unique_rows(self, rows):
+        """
+        Отсекает логины, которые уже есть в БД (один запрос на пачку) или повторяются в файле.
+        """
+        existing = set(
+            User.objects.filter(username__in=[data["username"] for _, data in rows])
+            .values_list("username", flat=True)
+        )
+        unique = []
+        for line, data in rows:
+            username = data["username"]
+            if username in existing or username in self.seen:
+                self.error(line, {"username": "Пользователь с таким логином уже существует."})
+                continue
+            self.seen.add(username)
+            unique.append((line, data))
+        return unique
+
+    def build_user(self, data, role):
+        return User(
+            username=data["username"],
+            email=data["email"],
+            full_name=data["full_name"],
+            role=role,
+            # User.save() не вызывается — флаг ставим сами
+            is_superuser=role == User.Roles.ADMIN,
+            # без пароля в файле — непригодный пароль, пользователь задаёт свой через сброс
+            password=make_password(data["password"]),
+        )
+
+    def process(self, rows):
+        users = User.objects.bulk_create(
+            [self.build_user(data, data["role"]) for _, data in self.unique_rows(rows)]
+        )
+        self.report["created"] += len(users)
+        # профили разработчиков обычно создаёт сигнал post_save, здесь — пачкой
+        dev_ids = [user.pk for user in users if user.role == User.Roles.DEV]
+        if dev_ids:
+            sync_developer_profiles(user_ids=dev_ids, batch_size=self.batch_size)
+
+
+class DeveloperImporter(UserImporter):
+    row_serializer = DeveloperRowSerializer
+    required_columns = ("username", "full_name")
+
+    def process(self, rows):
+        rows = self.unique_rows(rows)
+        users = User.objects.bulk_create([self.build_user(data, User.Roles.DEV) for _, data in rows])
+        developers = Developer.objects.bulk_create([
+            Developer(
+                user=user,
+                full_name=data["full_name"],
+                position=data["position"],
+                cooperation_format=data["cooperation_format"],
+                workload=data["workload"],
+                salary=data["salary"],
+                competencies=data["competencies"],
+                contacts=data["contacts"],
+            )
+            for user, (_, data) in zip(users, rows)
+        ])
+        sync_competencies_bulk(developers, batch_size=self.batch_size)
+        search.index_objects(developers, batch_size=self.batch_size)
+        self.report["created"] += len(developers)
+
+    def after_commit(self):
+        invalidate_workloads()
+
+
+class ProjectImporter(BaseImporter):
+    row_serializer = ProjectRowSerializer
+    required_columns = ("name",)
+
+    def resolve_people(self, rows):
+        """
+        {логин: (id, роль)} и {логин: id профиля} для всех ссылок пачки — два запроса.
+        """
+        usernames = set()
+        for _, data in rows:
+            if data["responsible"]:
+                usernames.add(data["responsible"])
+            usernames.update(_split_list(data["developers"]))
+        if not usernames:
+            return {}, {}
+        users = {
+            username: (pk, role)
+            for pk, username, role in User.objects.filter(username__in=usernames).values_list("pk", "username", "role")
+        }
+        developers = dict(
+            Developer.objects.filter(user__username__in=usernames).values_list("user__username", "pk")
+        )
+        return users, developers
+
+    def process(self, rows):
+        users, developers = self.resolve_people(rows)
+        projects, teams = [], []
+        for line, data in rows:
+            errors = {}
+            responsible_id = None
+            if data["responsible"]:
+                pk, role = users.get(data["responsible"], (None, None))
+                if pk is None:
+                    errors["responsible"] = f"Пользователь {data['responsible']} не найден."
+                elif role not in (User.Roles.PM, User.Roles.ADMIN):
+                    errors["responsible"] = "Ответственным может быть только PM или Admin."
+                responsible_id = pk
+            team = _split_list(data["developers"])
+            unknown = [username for username in team if username not in developers]
+            if unknown:
+                errors["developers"] = f"Нет профилей разработчика: {', '.join(unknown)}"
+            if errors:
+                self.error(line, errors)
+                continue
+
+            projects.append(Project(
+                name=data["name"],
+                customer_name=data["customer_name"],
+                total_cost=data["total_cost"],
+                deadline=data["deadline"],
+                completion_percent=data["completion_percent"],
+                responsible_id=responsible_id,
+                stages=data["stages"],
+                active_stage=data["active_stage"],
+                comments=data["comments"],
+            ))
+            teams.append({developers[username] for username in team})
+
+        projects = Project.objects.bulk_create(projects)
+        Through = Project.developers.through
+        Through.objects.bulk_create([
+            Through(project_id=project.pk, developer_id=developer_id)
+            for project, team in zip(projects, teams)
+            for developer_id in team
+        ])
+        search.index_objects(projects, batch_size=self.batch_size)
+        self.report["created"] += len(projects)
+
+    def after_commit(self):
+        invalidate_workloads()
+
+
+IMPORTERS = {
+    "users": UserImporter,
+    "developers": DeveloperImporter,
+    "projects": ProjectImporter,
+}
+
+
+def import_csv(kind, stream, **options):
+    """
+    Импорт из текстового потока; возвращает отчёт {"rows", "created", "errors", "error_count", "committed"}.
+    """
+    return IMPORTERS[kind](**options).run(stream)
@@ -0,0 +1,93 @@
+"""
+Сравнение стандартного JSONRenderer/JSONParser DRF и crm.renderers на доске канбана.
+
+Данные — реальные ответы kanban_state и activity (задачи + история с old_data/new_data)
+для одной доски с `tasks` задачами; время меряется только на render/parse, без БД.
+"""
+import io
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from . import renderers
+from .models import KanbanColumn, KanbanTask, KanbanTaskHistory, Project
+from .serializers import KanbanColumnSerializer, KanbanTaskHistorySerializer, KanbanTaskSerializer
+from .views import ensure_kanban_columns
+
+
+def build_payloads(tasks=1000, history_per_task=3, seed=42):
+    rnd = random.Random(seed)
+    User = get_user_model()
+    user = User.objects.create_user("bench_json", password="bench", role=User.Roles.PM)
+    project = Project.objects.create(name="JSON bench", responsible=user, total_cost="1250000.50")
+    ensure_kanban_columns(project)
+    columns = list(KanbanColumn.objects.filter(project=project))
+
+    created = KanbanTask.objects.bulk_create(
+        KanbanTask(
+            project=project, column=rnd.choice(columns), order=n,
+            title=f"Задача {n}", description="Описание задачи " * rnd.randint(1, 20),
+        )
+        for n in range(tasks)
+    )
+    KanbanTaskHistory.objects.bulk_create(
+        KanbanTaskHistory(
+            project=project, task=task, task_ref=task.pk, user=user, action=KanbanTaskHistory.ACTION_UPDATE,
+            old_data={"title": task.title, "description": task.description[:100]},
+            new_data={"title": f"{task.title} (ред.)", "description": task.description[:120]},
+        )
+        for task in created
+        for _ in range(history_per_task)
+    )
+
+    state = {
+        "columns": KanbanColumnSerializer(columns, many=True).data,
+        "tasks": KanbanTaskSerializer(KanbanTask.objects.filter(project=project), many=True).data,
+    }
+    activity = KanbanTaskHistorySerializer(
+        KanbanTaskHistory.objects.filter(project=project).order_by("-created_at"), many=True,
+    ).data
+    # raw-значения, которые приходят во view мимо сериализаторов
+    project_row = {
+        "id": project.pk, "total_cost": project.total_cost, "kanban_token": project.kanban_token,
+        "files_token": project.files_token, "created_at": project.created_at,
+    }
+    return {"kanban_state": state, "activity": activity, "project": project_row}
+
+
+def _timeit(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 3)
+
+
+def run_json_benchmark(tasks=1000, repeat=20):
+    payloads = build_payloads(tasks=tasks)
+    stdlib_renderer, fast_renderer = JSONRenderer(), renderers.FastJSONRenderer()
+    stdlib_parser, fast_parser = JSONParser(), renderers.FastJSONParser()
+
+    results = []
+    for name, data in payloads.items():
+        body = stdlib_renderer.render(data)
+        render_std = _timeit(lambda: stdlib_renderer.render(data), repeat)
+        render_fast = _timeit(lambda: fast_renderer.render(data), repeat)
+        parse_std = _timeit(lambda: stdlib_parser.parse(io.BytesIO(body)), repeat)
+        parse_fast = _timeit(lambda: fast_parser.parse(io.BytesIO(body)), repeat)
+        results.append({
+            "payload": name,
+            "bytes": len(body),
+            "render_json_ms": render_std,
+            "render_fast_ms": render_fast,
+            "parse_json_ms": parse_std,
+            "parse_fast_ms": parse_fast,
+            "render_speedup": round(render_std / render_fast, 1) if render_fast else None,
+            "parse_speedup": round(parse_std / parse_fast, 1) if parse_fast else None,
+        })
+    return {"backend": renderers.get_backend(), "tasks": tasks, "repeat": repeat, "results": results}
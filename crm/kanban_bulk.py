@@ -0,0 +1,252 @@
+"""
+Массовое создание и изменение задач канбана (импорт бэклога, разбиение эпика).
+
+Колонки, разработчики проекта и изменяемые задачи загружаются один раз на запрос,
+все элементы проверяются в памяти, затем задачи пишутся bulk_create/bulk_update,
+а история — одним bulk_create. bulk_* не вызывают post_save, поэтому поисковый
+индекс и кэш загрузки разработчиков обновляются здесь явно (см. crm.signals).
+
+atomic=True (по умолчанию): любая ошибка — ничего не сохраняется;
+atomic=False: сохраняются корректные элементы, ошибки возвращаются по индексам.
+
+Изменения проверяются по version (переданной в элементе или прочитанной из БД), как в
+kanban_task_update: задачи, которые уже изменил кто-то другой, не перезаписываются —
+ошибка с текущим состоянием задачи в "current" по индексу элемента.
+"""
+import contextlib
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from . import search
+from .concurrency import claim_versions
+from .models import KanbanColumn, KanbanTask, KanbanTaskHistory
+from .serializers import KanbanTaskSerializer
+from .workload import invalidate_workloads
+
+MAX_BULK_TASKS = 500
+
+UPDATE_FIELDS = [
+    "title", "description", "deadline", "column", "order",
+    "assignee_kind", "assignee_user", "assignee_developer", "updated_at",
+]
+
+CONFLICT_MESSAGE = "Задача изменена другим пользователем."
+
+
+class KanbanTaskBulkItemSerializer(serializers.Serializer):
+    """
+    Один элемент tasks[]: без id — новая задача (title и status обязательны), с id — изменение.
+    """
+    id = serializers.IntegerField(required=False)
+    title = serializers.CharField(max_length=255, required=False)
+    description = serializers.CharField(required=False, allow_blank=True)
+    status = serializers.CharField(required=False)
+    order = serializers.IntegerField(required=False, min_value=0)
+    deadline = serializers.DateField(required=False, allow_null=True)
+    assignee = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    version = serializers.IntegerField(required=False, min_value=1)
+
+    def to_internal_value(self, data):
+        # пустой дедлайн из формы/CSV
+        if isinstance(data, dict) and data.get("deadline") == "":
+            data = {**data, "deadline": None}
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        if "id" not in attrs:
+            missing = {name: "Обязательное поле." for name in ("title", "status") if not attrs.get(name)}
+            if missing:
+                raise serializers.ValidationError(missing)
+        return attrs
+
+
+def _task_state(task):
+    return {
+        "title": task.title,
+        "description": task.description,
+        "status": task.column.code if task.column_id else None,
+        "assignee": task.get_assignee_display(),
+    }
+
+
+class BulkTaskWriter:
+    def __init__(self, project, user):
+        self.project = project
+        self.user = user if user.is_authenticated else None
+        self.columns = {c.code: c for c in KanbanColumn.objects.filter(project=project)}
+        self.developers = {d.id: d for d in project.developers.all()}
+        self.assignee_helper = KanbanTaskSerializer()
+
+    def _load_tasks(self, items):
+        ids = {item["id"] for item in items if isinstance(item, dict) and isinstance(item.get("id"), int)}
+        if not ids:
+            return {}
+        qs = (
+            KanbanTask.objects.filter(project=self.project, id__in=ids)
+            .select_related("column", "assignee_user", "assignee_developer")
+        )
+        return {task.id: task for task in qs}
+
+    def _apply(self, task, attrs):
+        for name in ("title", "description", "order", "deadline"):
+            if name in attrs:
+                setattr(task, name, attrs[name])
+        if "status" in attrs:
+            column = self.columns.get(attrs["status"])
+            if column is None:
+                raise serializers.ValidationError({"status": f"Unknown kanban status: {attrs['status']}"})
+            task.column = column
+        if attrs.get("assignee") is not None:
+            try:
+                self.assignee_helper._apply_assignee_token(task, attrs["assignee"], developers=self.developers)
+            except ValueError:
+                raise serializers.ValidationError({"assignee": "Некорректный исполнитель."})
+            if task.assignee_kind == KanbanTask.AssigneeKind.USER:
+                task.assignee_user = self.project.responsible
+
+    def prepare(self, items):
+        """
+        Проверяет элементы; возвращает [(index, task, old_state | None, version | None)]
+        и ошибки по индексам.
+        """
+        existing = self._load_tasks(items)
+        prepared, errors, seen = [], [], set()
+        for index, item in enumerate(items):
+            item_serializer = KanbanTaskBulkItemSerializer(data=item)
+            if not item_serializer.is_valid():
+                errors.append({"index": index, "errors": item_serializer.errors})
+                continue
+            attrs = item_serializer.validated_data
+            if "id" in attrs:
+                task = existing.get(attrs["id"])
+                if task is None:
+                    errors.append({"index": index, "errors": {"id": "Задача не найдена в проекте."}})
+                    continue
+                if task.id in seen:
+                    errors.append({"index": index, "errors": {"id": "Задача повторяется в запросе."}})
+                    continue
+                seen.add(task.id)
+                expected = attrs.get("version", task.version)
+                if expected != task.version:
+                    errors.append(conflict_error(index, task))
+                    continue
+                old_state = _task_state(task)
+            else:
+                task = KanbanTask(project=self.project, description="", order=0)
+                old_state = expected = None
+            try:
+                self._apply(task, attrs)
+            except serializers.ValidationError as exc:
+                errors.append({"index": index, "errors": exc.detail})
+                continue
+            prepared.append((index, task, old_state, expected))
+        return prepared, errors
+
+    def _history(self, task, old_state):
+        # bulk_create не вызывает KanbanTaskHistory.save — task_ref проставляем сами
+        entry = dict(project=self.project, task=task, task_ref=task.pk, user=self.user)
+        if old_state is None:
+            return [KanbanTaskHistory(
+                **entry, action=KanbanTaskHistory.ACTION_CREATE, to_column=task.column.code,
+                new_data={"title": task.title, "description": task.description},
+            )]
+
+        # те же записи, что пишет kanban_task_update
+        new_state = _task_state(task)
+        history = []
+        if old_state["status"] != new_state["status"]:
+            history.append(KanbanTaskHistory(
+                **entry, action=KanbanTaskHistory.ACTION_MOVE,
+                from_column=old_state["status"], to_column=new_state["status"],
+                new_data={"title": task.title},
+            ))
+        changed = {k for k in ("title", "description", "assignee") if old_state[k] != new_state[k]}
+        if changed:
+            history.append(KanbanTaskHistory(
+                **entry, action=KanbanTaskHistory.ACTION_UPDATE,
+                old_data={k: old_state[k] for k in changed},
+                new_data={**{k: new_state[k] for k in changed}, "title": task.title},
+            ))
+        return history
+
+    def save(self, prepared, atomic=True):
+        """
+        Пишет подготовленные элементы; возвращает (created, updated, conflicts), где
+        conflicts — элементы, чья задача изменилась после чтения. При atomic и конфликтах
+        ничего не сохраняется.
+        """
+        with transaction.atomic():
+            conflicts = []
+            expected = {task.pk: version for _, task, old_state, version in prepared if old_state is not None}
+            while expected:
+                # при atomic конфликт откатывает всё; иначе savepoint откатывает уже увеличенные версии
+                with contextlib.nullcontext() if atomic else transaction.atomic():
+                    stale = claim_versions(KanbanTask, expected)
+                    if stale:
+                        transaction.set_rollback(True)
+                if not stale:
+                    break
+                conflicts += [item for item in prepared if item[1].pk in stale]
+                prepared = [item for item in prepared if item[1].pk not in stale]
+                if atomic:
+                    transaction.set_rollback(True)
+                    return [], [], conflicts
+                expected = {pk: version for pk, version in expected.items() if pk not in stale}
+
+            created = [task for _, task, old_state, _ in prepared if old_state is None]
+            updated = [task for _, task, old_state, _ in prepared if old_state is not None]
+            now = timezone.now()
+            for _, task, old_state, version in prepared:
+                if old_state is not None:
+                    # bulk_update не проставляет auto_now; версию в БД уже увеличил claim_versions
+                    task.updated_at = now
+                    task.version = version + 1
+
+            KanbanTask.objects.bulk_create(created)
+            if updated:
+                KanbanTask.objects.bulk_update(updated, UPDATE_FIELDS)
+            KanbanTaskHistory.objects.bulk_create(
+                [entry for _, task, old_state, _ in prepared for entry in self._history(task, old_state)]
+            )
+            search.index_objects(created + updated)
+        if prepared:
+            invalidate_workloads()
+        return created, updated, conflicts
+
+
+def conflict_error(index, task):
+    return {"index": index, "errors": {"version": CONFLICT_MESSAGE}, "current": KanbanTaskSerializer(task).data}
+
+
+def is_conflict(error):
+    return "current" in error
+
+
+def bulk_write_tasks(project, user, items, atomic=True):
+    """
+    Возвращает (payload, has_errors); при atomic и ошибках в payload только errors.
+    """
+    writer = BulkTaskWriter(project, user)
+    prepared, errors = writer.prepare(items)
+    if errors and atomic:
+        return {"errors": errors}, True
+
+    created, updated, conflicts = writer.save(prepared, atomic=atomic)
+    if conflicts:
+        # текущее состояние — из БД, а не изменённая в памяти копия
+        fresh = KanbanTask.objects.select_related("column", "assignee_user", "assignee_developer").in_bulk(
+            [task.pk for _, task, _, _ in conflicts]
+        )
+        errors = sorted(
+            errors + [conflict_error(index, fresh.get(task.pk, task)) for index, task, _, _ in conflicts],
+            key=lambda error: error["index"],
+        )
+        if atomic:
+            return {"errors": errors}, True
+    return {
+        "created": KanbanTaskSerializer(created, many=True).data,
+        "updated": KanbanTaskSerializer(updated, many=True).data,
+        "errors": errors,
+    }, bool(errors)
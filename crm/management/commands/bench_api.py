@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from crm.benchmark import (
+    BASELINE_PATH, DEFAULT_PARAMS, compare, load_baseline, run_benchmark, save_baseline,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Прогоняет все маршруты API под ролями ADMIN/PM/DEV на синтетических данных "
+        "во временной тестовой БД и сравнивает число запросов и задержку с baseline"
+    )
+
+    def add_arguments(self, parser):
+        for name in ("seed", "projects", "developers", "tasks_per_board", "folder_depth", "repeat"):
+            parser.add_argument(f"--{name.replace('_', '-')}", dest=name, type=int, default=None)
+        parser.add_argument("--baseline", default=str(BASELINE_PATH))
+        parser.add_argument("--update-baseline", action="store_true")
+        parser.add_argument(
+            "--latency-factor", type=float, default=3.0,
+            help="Предупреждать, если p95 вырос больше чем в N раз (0 — не проверять)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            baseline = load_baseline(options["baseline"])
+        except FileNotFoundError:
+            baseline = None
+
+        params = dict(baseline["params"] if baseline else DEFAULT_PARAMS)
+        params.update({k: options[k] for k in DEFAULT_PARAMS if options.get(k) is not None})
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            report = run_benchmark(**params)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self._print(report)
+
+        if options["update_baseline"]:
+            save_baseline(report, options["baseline"])
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}"))
+            return
+
+        if baseline is None:
+            raise CommandError("Baseline not found, run with --update-baseline first")
+
+        if baseline["params"] != report["params"]:
+            self.stdout.write(self.style.WARNING("Params differ from baseline, comparison is approximate"))
+
+        regressions, slow, missing = compare(report, baseline, latency_factor=options["latency_factor"])
+        for line in missing:
+            self.stdout.write(self.style.WARNING(f"No baseline: {line}"))
+        for line in slow:
+            self.stdout.write(self.style.WARNING(f"Slower: {line}"))
+        if regressions:
+            for line in regressions:
+                self.stdout.write(self.style.ERROR(f"Regression: {line}"))
+            raise CommandError(f"{len(regressions)} regression(s) against baseline")
+        self.stdout.write(self.style.SUCCESS("No query-count regressions"))
+
+    def _print(self, report):
+        self.stdout.write(f"{'route':<58} {'role':<6} {'st':>4} {'q':>4} {'p50ms':>8} {'p95ms':>8}")
+        for key, roles in report["results"].items():
+            for role, r in roles.items():
+                self.stdout.write(
+                    f"{key:<58} {role:<6} {r['status']:>4} {r['queries']:>4} {r['p50_ms']:>8} {r['p95_ms']:>8}"
+                )
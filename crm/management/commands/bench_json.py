@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from crm.json_benchmark import run_json_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает стандартный JSONRenderer/JSONParser DRF с crm.renderers "
+        "на ответах kanban_state и activity доски с N задачами (временная тестовая БД)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            report = run_json_benchmark(tasks=options["tasks"], repeat=options["repeat"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(f"backend: {report['backend']}, tasks: {report['tasks']}, median of {report['repeat']}")
+        self.stdout.write(
+            f"{'payload':<14} {'bytes':>9} {'render json':>12} {'render fast':>12} {'x':>5} "
+            f"{'parse json':>11} {'parse fast':>11} {'x':>5}"
+        )
+        for r in report["results"]:
+            self.stdout.write(
+                f"{r['payload']:<14} {r['bytes']:>9} {r['render_json_ms']:>12} {r['render_fast_ms']:>12} "
+                f"{r['render_speedup']:>5} {r['parse_json_ms']:>11} {r['parse_fast_ms']:>11} {r['parse_speedup']:>5}"
+            )
@@ -0,0 +1,66 @@
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from crm.write_benchmark import DEFAULT_MODES, DEFAULT_WRITERS, run_write_benchmark, sustained_writers
+
+
+class Command(BaseCommand):
+    help = (
+        "Параллельные писатели канбана (POST /api/kanban/reorder/) на временной файловой SQLite-БД: "
+        "пропускная способность и ошибки 'database is locked' в режимах legacy, rollback и wal"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--writers", default=",".join(str(n) for n in DEFAULT_WRITERS),
+            help="Число параллельных писателей через запятую",
+        )
+        parser.add_argument("--modes", default=",".join(DEFAULT_MODES))
+        parser.add_argument("--readers", type=int, default=4, help="Параллельных вкладок, опрашивающих доски")
+        parser.add_argument("--duration", type=float, default=3.0, help="Секунд на каждый прогон")
+        parser.add_argument("--tasks-per-board", type=int, default=50)
+        parser.add_argument("--busy-timeout", type=int, default=5000, help="PRAGMA busy_timeout, мс")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("Benchmark is only meaningful for SQLite")
+        try:
+            writers = sorted({int(n) for n in options["writers"].split(",") if n.strip()})
+        except ValueError:
+            raise CommandError("--writers must be a comma-separated list of integers")
+        modes = [m.strip() for m in options["modes"].split(",") if m.strip()]
+
+        # WAL работает только с файлом, а тестовая SQLite-БД по умолчанию в памяти
+        path = os.path.join(tempfile.mkdtemp(prefix="crm-write-bench-"), "bench.sqlite3")
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = path
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            report = run_write_benchmark(
+                writers=writers, modes=modes, readers=options["readers"], duration=options["duration"],
+                tasks_per_board=options["tasks_per_board"], busy_timeout=options["busy_timeout"],
+                log=lambda message: self.stderr.write(message),
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(f"{'mode':<9} {'journal':<8} {'writers':>7} {'w/s':>7} {'w p95':>8} "
+                          f"{'r/s':>7} {'r p95':>8} {'locked':>7} {'failed':>7}")
+        for mode, data in report["modes"].items():
+            for r in data["rounds"]:
+                writes, reads = r["writes"], r["reads"]
+                self.stdout.write(
+                    f"{mode:<9} {data['journal_mode']:<8} {r['writers']:>7} {writes['per_s']:>7} "
+                    f"{writes['p95_ms'] or '-':>8} {reads['per_s']:>7} {reads['p95_ms'] or '-':>8} "
+                    f"{writes['locked'] + reads['locked']:>7} {writes['failed'] + reads['failed']:>7}"
+                )
+        for mode, data in report["modes"].items():
+            self.stdout.write(self.style.SUCCESS(
+                f"{mode}: sustained {sustained_writers(data['rounds'])} parallel writer(s) without lock errors"
+            ))
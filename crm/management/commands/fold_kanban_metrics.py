@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from crm.flow_metrics import fold_history, BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Сворачивает новые записи истории канбана в таблицы метрик потока (CFD, cycle time)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        total = fold_history(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Folded {total} history rows"))
@@ -0,0 +1,47 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.imports import IMPORTERS, ImportFormatError, import_csv
+
+
+class Command(BaseCommand):
+    help = (
+        "Импортирует пользователей, разработчиков или проекты из CSV пачками (bulk_create). "
+        "Пример: import_csv developers team.csv --batch-size 1000"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(IMPORTERS))
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--partial", action="store_true", help="Сохранить корректные строки при ошибках")
+        parser.add_argument("--dry-run", action="store_true", help="Только проверить файл")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            with open(options["path"], newline="", encoding="utf-8-sig") as stream:
+                report = import_csv(
+                    options["kind"], stream,
+                    batch_size=options["batch_size"],
+                    atomic=not options["partial"],
+                    dry_run=options["dry_run"],
+                )
+        except (OSError, ImportFormatError, UnicodeDecodeError, csv.Error) as e:
+            raise CommandError(str(e))
+
+        for item in report["errors"]:
+            self.stderr.write(f"  line {item['line']}: {item['errors']}")
+        if report["error_count"] > len(report["errors"]):
+            self.stderr.write(f"  ... and {report['error_count'] - len(report['errors'])} more")
+
+        elapsed = time.monotonic() - started
+        summary = f"rows={report['rows']}, created={report['created']}, errors={report['error_count']}"
+        if not report["committed"]:
+            if options["dry_run"] and not report["error_count"]:
+                self.stdout.write(self.style.SUCCESS(f"Dry run OK in {elapsed:.1f}s: {summary}"))
+                return
+            raise CommandError(f"Nothing imported (rolled back): {summary}")
+        self.stdout.write(self.style.SUCCESS(f"Imported in {elapsed:.1f}s: {summary}"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from crm.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Удаляет просроченные Idempotency-Key и самые старые сверх CRM_IDEMPOTENCY_MAX_KEYS"
+
+    def handle(self, *args, **options):
+        deleted = purge_expired()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} idempotency keys"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from crm.staffing import rebuild_competency_index
+
+
+class Command(BaseCommand):
+    help = "Пересобирает индекс компетенций разработчиков из поля competencies"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = rebuild_competency_index(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} developer competencies"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from crm.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Пересобирает полнотекстовый индекс проектов, разработчиков и задач канбана"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = rebuild_index(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} documents"))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.seeding import DEFAULTS, USERNAME_PREFIX, clear_seeded, seed_crm
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет БД синтетическими данными для нагрузочного тестирования: пользователи всех ролей, "
+        "разработчики, проекты, канбан с историей, папки и файлы. "
+        "Пример на ~1 млн строк истории: --tasks-per-project 1000 --history-per-task 20"
+    )
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULTS.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", dest=name, type=int, default=default)
+        parser.add_argument("--clear", action="store_true", help="Удалить ранее сгенерированные данные")
+        parser.add_argument("--no-reindex", action="store_true", help="Не пересобирать индексы поиска")
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            deleted = clear_seeded()
+            self.stdout.write(f"Deleted {deleted} seeded objects")
+        elif User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise CommandError("Seeded data already exists, run with --clear to regenerate")
+
+        started = time.monotonic()
+        counts = seed_crm(
+            log=lambda message: self.stdout.write(f"  {message}"),
+            reindex=not options["no_reindex"],
+            **{name: options[name] for name in DEFAULTS},
+        )
+        elapsed = time.monotonic() - started
+        summary = ", ".join(f"{key}={value}" for key, value in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Seeded in {elapsed:.1f}s: {summary}"))
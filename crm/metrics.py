@@ -0,0 +1,308 @@
+"""
+Метрики в формате Prometheus (text exposition 0.0.4) без внешних зависимостей.
+
+- MetricsMiddleware считает запросы и длительность по view
+  (kanban_reorder, kanban_state, upload_project_files, ProjectViewSet.list ...);
+- /metrics отдаёт счётчики, гистограммы и размеры таблиц KanbanTaskHistory / ProjectFile.
+
+Несколько воркеров gunicorn: если задан CRM_METRICS_DIR, каждый процесс периодически
+сбрасывает своё состояние в <dir>/metrics_<pid>.json, а /metrics суммирует все файлы.
+Файлы завершившихся воркеров не удаляются — счётчики остаются монотонными.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import KanbanTaskHistory, ProjectFile
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+TABLE_SIZE_CACHE_KEY = "crm:metrics:table-sizes"
+
+# таблицы, размер которых отдаётся gauge crm_table_rows
+TABLES = {
+    "kanban_task_history": KanbanTaskHistory,
+    "project_file": ProjectFile,
+}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def empty(self):
+        raise NotImplementedError
+
+    def merge(self, current, other):
+        raise NotImplementedError
+
+    def render(self, samples):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, value in sorted(samples.items()):
+            lines.extend(self.render_sample(values, value))
+        return lines
+
+    def render_sample(self, values, value):
+        return [f"{self.name}{_labels(self.labelnames, values)} {_number(value)}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def empty(self):
+        return 0
+
+    def merge(self, current, other):
+        return current + other
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def empty(self):
+        return 0
+
+    def merge(self, current, other):
+        # gauge процессов не суммируется — берём последнее значение
+        return other
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def empty(self):
+        # [счётчики по корзинам (не накопительные)..., +Inf, sum]
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def merge(self, current, other):
+        return [a + b for a, b in zip(current, other)]
+
+    def add(self, state, amount):
+        for i, bound in enumerate(self.buckets):
+            if amount <= bound:
+                state[i] += 1
+                break
+        else:
+            state[len(self.buckets)] += 1
+        state[-1] += amount
+
+    def render_sample(self, values, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+            cumulative += count
+            labels = _labels(self.labelnames, values, ("le", _number(float(bound))))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_number(round(state[-1], 6))}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self, directory=None, flush_interval=1.0):
+        self.directory = Path(directory) if directory else None
+        self.flush_interval = flush_interval
+        self.metrics = {}
+        self.samples = {}
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        self.samples[metric.name] = {}
+        return metric
+
+    def _state(self, metric, labels):
+        values = tuple(str(v) for v in labels)
+        samples = self.samples[metric.name]
+        if values not in samples:
+            samples[values] = metric.empty()
+        return samples, values
+
+    def inc(self, metric, labels=(), amount=1):
+        with self._lock:
+            samples, values = self._state(metric, labels)
+            samples[values] += amount
+        self._maybe_flush()
+
+    def set(self, metric, labels=(), value=0):
+        with self._lock:
+            samples, values = self._state(metric, labels)
+            samples[values] = value
+
+    def observe(self, metric, labels=(), amount=0.0):
+        with self._lock:
+            samples, values = self._state(metric, labels)
+            metric.add(samples[values], amount)
+        self._maybe_flush()
+
+    # --- несколько процессов ---
+
+    def _path(self, pid=None):
+        return self.directory / f"metrics_{pid or os.getpid()}.json"
+
+    def _snapshot(self):
+        with self._lock:
+            return {
+                name: [[list(values), value] for values, value in samples.items()]
+                for name, samples in self.samples.items()
+                if self.metrics[name].kind != "gauge"
+            }
+
+    def _maybe_flush(self):
+        if self.directory and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Атомарно перезаписывает файл текущего процесса.
+        """
+        if not self.directory:
+            return
+        self._last_flush = time.monotonic()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".metrics_", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(self._snapshot(), fh)
+        os.replace(tmp, self._path())
+
+    def collect(self):
+        """
+        {имя: {значения меток: значение}} — для директории сумма по файлам всех процессов.
+        """
+        if not self.directory:
+            with self._lock:
+                return {
+                    name: {values: (list(v) if isinstance(v, list) else v) for values, v in samples.items()}
+                    for name, samples in self.samples.items()
+                }
+
+        self.flush()
+        merged = {name: {} for name in self.metrics}
+        for path in self.directory.glob("metrics_*.json"):
+            try:
+                with open(path, encoding="utf-8") as fh:
+                    data = json.load(fh)
+            except (OSError, ValueError):
+                continue
+            for name, rows in data.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                for values, value in rows:
+                    key = tuple(values)
+                    current = merged[name].get(key)
+                    merged[name][key] = value if current is None else metric.merge(current, value)
+        with self._lock:
+            for name, metric in self.metrics.items():
+                if metric.kind == "gauge":
+                    merged[name] = dict(self.samples[name])
+        return merged
+
+    def render(self):
+        collected = self.collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.extend(metric.render(collected.get(name, {})))
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry(
+    directory=getattr(settings, "CRM_METRICS_DIR", None),
+    flush_interval=getattr(settings, "CRM_METRICS_FLUSH_INTERVAL", 1.0),
+)
+# последние наблюдения воркера не должны потеряться при его остановке
+atexit.register(registry.flush)
+
+REQUESTS = registry.register(Counter(
+    "crm_http_requests_total", "Число HTTP-запросов по view, методу и статусу",
+    ("view", "method", "status"),
+))
+REQUEST_DURATION = registry.register(Histogram(
+    "crm_http_request_duration_seconds", "Длительность обработки запроса по view",
+    ("view", "method"),
+))
+TABLE_ROWS = registry.register(Gauge(
+    "crm_table_rows", "Число строк в таблице (обновляется не чаще CRM_METRICS_TABLE_SIZE_TTL)",
+    ("table",),
+))
+
+
+def update_table_sizes():
+    sizes = cache.get(TABLE_SIZE_CACHE_KEY)
+    if sizes is None:
+        sizes = {table: model.objects.count() for table, model in TABLES.items()}
+        cache.set(TABLE_SIZE_CACHE_KEY, sizes, getattr(settings, "CRM_METRICS_TABLE_SIZE_TTL", 60))
+    for table, size in sizes.items():
+        registry.set(TABLE_ROWS, (table,), size)
+
+
+def view_label(match, method):
+    """
+    kanban_reorder, upload_project_files, ProjectViewSet.list, ProjectViewSet.developers ...
+    Нераспознанные URL собираются в "unmatched", чтобы случайные пути не раздували число рядов.
+    """
+    if match is None:
+        return "unmatched"
+    func = match.func
+    view = getattr(func, "cls", func)
+    actions = getattr(func, "actions", None)
+    if actions:
+        return f"{view.__name__}.{actions.get(method.lower(), method.lower())}"
+    return view.__name__
+
+
+class MetricsMiddleware:
+    """
+    Считает запросы и длительность по view.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        view = view_label(getattr(request, "resolver_match", None), request.method)
+        registry.inc(REQUESTS, (view, request.method, response.status_code))
+        registry.observe(REQUEST_DURATION, (view, request.method), elapsed)
+        return response
@@ -0,0 +1,123 @@
+"""
+Профилирование запросов: число SQL-запросов, время в БД, повторяющиеся запросы и время view.
+
+Включается переменной CRM_PROFILING_ENABLED; CRM_PROFILING_SAMPLE_RATE задаёт долю
+профилируемых запросов (0.0–1.0), поэтому middleware можно держать включённым в продакшене.
+Результат уходит в заголовок Server-Timing и одной JSON-строкой в лог "crm.profiling".
+"""
+import contextlib
+import json
+import logging
+import random
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger("crm.profiling")
+
+
+class QueryCollector:
+    """
+    execute_wrapper: засекает время каждого запроса и запоминает его шаблон и параметры.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.templates = Counter()
+        self.exact = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.templates[sql] += 1
+            if not many:
+                try:
+                    self.exact[(sql, repr(params))] += 1
+                except Exception:
+                    pass
+
+    def duplicates(self, threshold):
+        """
+        Шаблоны SQL, выполненные threshold и более раз (типичный N+1),
+        с числом полностью одинаковых повторов (тот же запрос с теми же параметрами).
+        """
+        exact_by_template = Counter()
+        for (sql, _), n in self.exact.items():
+            if n > 1:
+                exact_by_template[sql] += n - 1
+        return [
+            {"sql": sql[:300], "count": n, "identical": exact_by_template.get(sql, 0)}
+            for sql, n in self.templates.most_common()
+            if n >= threshold
+        ]
+
+
+class RequestProfilingMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, "CRM_PROFILING_ENABLED", False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "CRM_PROFILING_SAMPLE_RATE", 1.0)
+        self.duplicate_threshold = getattr(settings, "CRM_PROFILING_DUPLICATE_THRESHOLD", 3)
+
+    def __call__(self, request):
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        collector = QueryCollector()
+        started = time.perf_counter()
+        with _wrap_connections(collector):
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+
+        self._report(request, response, collector, total)
+        return response
+
+    def _report(self, request, response, collector, total):
+        db_ms = collector.duration * 1000
+        total_ms = total * 1000
+        app_ms = max(0.0, total_ms - db_ms)
+        duplicates = collector.duplicates(self.duplicate_threshold)
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={db_ms:.1f};desc="{collector.count} queries"',
+            f"app;dur={app_ms:.1f}",
+            f"total;dur={total_ms:.1f}",
+        ])
+
+        match = getattr(request, "resolver_match", None)
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "user_id": getattr(getattr(request, "user", None), "pk", None),
+            "queries": collector.count,
+            "db_ms": round(db_ms, 2),
+            "app_ms": round(app_ms, 2),
+            "total_ms": round(total_ms, 2),
+            "duplicate_queries": duplicates,
+        }
+        logger.log(
+            logging.WARNING if duplicates else logging.INFO,
+            json.dumps(record, ensure_ascii=False),
+            extra={"profile": record},
+        )
+
+
+def _wrap_connections(collector):
+    """
+    Вешает один collector на все алиасы БД.
+    """
+    stack = contextlib.ExitStack()
+    for conn in connections.all():
+        stack.enter_context(conn.execute_wrapper(collector))
+    return stack
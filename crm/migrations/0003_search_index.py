@@ -0,0 +1,156 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE crm_searchdocument_fts USING fts5(
+        title, body, private_body,
+        content='crm_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER crm_searchdocument_ai AFTER INSERT ON crm_searchdocument BEGIN
+        INSERT INTO crm_searchdocument_fts(rowid, title, body, private_body)
+        VALUES (new.id, new.title, new.body, new.private_body);
+    END
+    """,
+    """
+    CREATE TRIGGER crm_searchdocument_ad AFTER DELETE ON crm_searchdocument BEGIN
+        INSERT INTO crm_searchdocument_fts(crm_searchdocument_fts, rowid, title, body, private_body)
+        VALUES ('delete', old.id, old.title, old.body, old.private_body);
+    END
+    """,
+    """
+    CREATE TRIGGER crm_searchdocument_au AFTER UPDATE ON crm_searchdocument BEGIN
+        INSERT INTO crm_searchdocument_fts(crm_searchdocument_fts, rowid, title, body, private_body)
+        VALUES ('delete', old.id, old.title, old.body, old.private_body);
+        INSERT INTO crm_searchdocument_fts(rowid, title, body, private_body)
+        VALUES (new.id, new.title, new.body, new.private_body);
+    END
+    """,
+]
+
+FTS_DROP_SQL = [
+    "DROP TRIGGER IF EXISTS crm_searchdocument_au",
+    "DROP TRIGGER IF EXISTS crm_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS crm_searchdocument_ai",
+    "DROP TABLE IF EXISTS crm_searchdocument_fts",
+]
+
+# выражения совпадают с PG_PUBLIC_VECTOR / PG_FULL_VECTOR в crm/search.py
+PG_SQL = [
+    """
+    CREATE INDEX crm_searchdocument_public_gin ON crm_searchdocument USING GIN (
+        to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(body, ''))
+    )
+    """,
+    """
+    CREATE INDEX crm_searchdocument_full_gin ON crm_searchdocument USING GIN (
+        to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(body, '')
+                    || ' ' || coalesce(private_body, ''))
+    )
+    """,
+]
+
+PG_DROP_SQL = [
+    "DROP INDEX IF EXISTS crm_searchdocument_full_gin",
+    "DROP INDEX IF EXISTS crm_searchdocument_public_gin",
+]
+
+
+def _sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return any(row[0] == "ENABLE_FTS5" for row in cursor.fetchall())
+
+
+def create_fulltext_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "sqlite" and _sqlite_has_fts5(connection):
+        statements = FTS_SQL
+    elif connection.vendor == "postgresql":
+        statements = PG_SQL
+    else:
+        return
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "sqlite":
+        statements = FTS_DROP_SQL
+    elif connection.vendor == "postgresql":
+        statements = PG_DROP_SQL
+    else:
+        return
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def populate_documents(apps, schema_editor):
+    Project = apps.get_model("crm", "Project")
+    Developer = apps.get_model("crm", "Developer")
+    KanbanTask = apps.get_model("crm", "KanbanTask")
+    SearchDocument = apps.get_model("crm", "SearchDocument")
+
+    def join(*parts):
+        return "\n".join(p for p in parts if p)
+
+    docs = []
+    for p in Project.objects.iterator():
+        docs.append(SearchDocument(
+            kind="project", object_id=p.pk, project_id=p.pk, title=p.name[:255],
+            body=join(p.active_stage, p.stages, p.comments), private_body=p.customer_name,
+        ))
+    for d in Developer.objects.iterator():
+        docs.append(SearchDocument(
+            kind="developer", object_id=d.pk, owner_id=d.user_id, title=d.full_name[:255],
+            body=join(d.position, d.competencies),
+        ))
+    for t in KanbanTask.objects.iterator():
+        docs.append(SearchDocument(
+            kind="task", object_id=t.pk, project_id=t.project_id, title=t.title[:255],
+            body=t.description or "",
+        ))
+    SearchDocument.objects.bulk_create(docs, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0002_alter_projectfile_uploaded_by_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='attention_note',
+            field=models.TextField(blank=True, default='', help_text='Важные заметки и нюансы по проекту. Видно и редактируется всеми участниками.', verbose_name='⚠️ Обратите внимание'),
+        ),
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('project', 'Проект'), ('developer', 'Разработчик'), ('task', 'Задача канбана')], max_length=16)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True, default='')),
+                ('private_body', models.TextField(blank=True, default='')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='crm.project')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document')],
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(populate_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:05
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# копия crm.staffing.parse_competencies на момент миграции: историческая миграция
+# не должна зависеть от кода приложения, который может измениться
+_SPLIT_RE = re.compile(r"[,;/\n|•]+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def parse_competencies(text):
+    result = {}
+    for part in _SPLIT_RE.split(text or ""):
+        title = _SPACE_RE.sub(" ", part).strip()[:100]
+        name = _SPACE_RE.sub(" ", title).strip().lower()[:100]
+        if name and name not in result:
+            result[name] = title
+    return result
+
+
+def populate_competencies(apps, schema_editor):
+    Developer = apps.get_model("crm", "Developer")
+    Competency = apps.get_model("crm", "Competency")
+    DeveloperCompetency = apps.get_model("crm", "DeveloperCompetency")
+
+    parsed = {d.pk: parse_competencies(d.competencies) for d in Developer.objects.iterator()}
+    names = {}
+    for items in parsed.values():
+        for name, title in items.items():
+            names.setdefault(name, title)
+
+    Competency.objects.bulk_create([Competency(name=n, title=t) for n, t in names.items()], batch_size=1000)
+    ids = dict(Competency.objects.values_list("name", "id"))
+    DeveloperCompetency.objects.bulk_create(
+        [
+            DeveloperCompetency(developer_id=dev_id, competency_id=ids[name])
+            for dev_id, items in parsed.items()
+            for name in items
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0003_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Competency',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Ключ')),
+                ('title', models.CharField(max_length=100, verbose_name='Название')),
+            ],
+            options={
+                'verbose_name': 'Компетенция',
+                'verbose_name_plural': 'Компетенции',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DeveloperCompetency',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('competency', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='developer_links', to='crm.competency')),
+                ('developer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='competency_links', to='crm.developer')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('competency', 'developer'), name='unique_developer_competency')],
+            },
+        ),
+        migrations.RunPython(populate_competencies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0004_competency_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KanbanMetricsWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_created_at', models.DateTimeField(blank=True, null=True)),
+                ('last_history_id', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='KanbanFlowSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('column', models.CharField(max_length=50)),
+                ('count', models.IntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='flow_snapshots', to='crm.project')),
+            ],
+            options={
+                'ordering': ('date', 'column'),
+                'constraints': [models.UniqueConstraint(fields=('project', 'date', 'column'), name='unique_flow_snapshot')],
+            },
+        ),
+        migrations.CreateModel(
+            name='KanbanTaskFlow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.PositiveBigIntegerField(unique=True)),
+                ('current_column', models.CharField(blank=True, max_length=50, null=True)),
+                ('entered_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(blank=True, null=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('done_at', models.DateTimeField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('column_seconds', models.JSONField(blank=True, default=dict)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_flows', to='crm.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'done_at'], name='crm_kanbant_project_21c7bb_idx')],
+            },
+        ),
+    ]
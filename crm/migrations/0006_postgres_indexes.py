@@ -0,0 +1,92 @@
+from django.db import DatabaseError, migrations, transaction
+
+
+# Частичные индексы под горячие фильтры:
+# - аналитика и дедлайны считают только незавершённые проекты;
+# - дерево файлов каждый раз выбирает корневые файлы и папки проекта.
+# Триграммные GIN — под SearchFilter (?search=) ProjectViewSet и DeveloperViewSet:
+# icontains в PostgreSQL компилируется в UPPER(col::text) LIKE UPPER(%s).
+# CREATE EXTENSION требует права CREATE на базу (PostgreSQL 13+, pg_trgm — trusted) или суперпользователя;
+# если расширение уже установлено администратором, права у роли приложения не нужны.
+PG_SQL = [
+    """
+    CREATE INDEX IF NOT EXISTS crm_project_active_deadline
+        ON crm_project (deadline) WHERE completion_percent < 100
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS crm_projectfile_root
+        ON crm_projectfile (project_id) WHERE folder_id IS NULL
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS crm_projectfolder_root
+        ON crm_projectfolder (project_id) WHERE parent_id IS NULL
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS crm_project_name_trgm
+        ON crm_project USING GIN (UPPER(name::text) gin_trgm_ops)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS crm_project_customer_trgm
+        ON crm_project USING GIN (UPPER(customer_name::text) gin_trgm_ops)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS crm_developer_full_name_trgm
+        ON crm_developer USING GIN (UPPER(full_name::text) gin_trgm_ops)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS crm_developer_competencies_trgm
+        ON crm_developer USING GIN (UPPER(competencies::text) gin_trgm_ops)
+    """,
+]
+
+PG_DROP_SQL = [
+    "DROP INDEX IF EXISTS crm_developer_competencies_trgm",
+    "DROP INDEX IF EXISTS crm_developer_full_name_trgm",
+    "DROP INDEX IF EXISTS crm_project_customer_trgm",
+    "DROP INDEX IF EXISTS crm_project_name_trgm",
+    "DROP INDEX IF EXISTS crm_projectfolder_root",
+    "DROP INDEX IF EXISTS crm_projectfile_root",
+    "DROP INDEX IF EXISTS crm_project_active_deadline",
+]
+
+
+def ensure_pg_trgm(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone():
+            return
+        try:
+            with transaction.atomic(using=connection.alias):
+                cursor.execute("CREATE EXTENSION pg_trgm")
+        except DatabaseError as exc:
+            raise RuntimeError(
+                "Для триграммных индексов нужно расширение pg_trgm: выполните "
+                "CREATE EXTENSION pg_trgm; в этой базе от владельца базы или суперпользователя "
+                f"и повторите migrate ({exc})"
+            ) from exc
+
+
+def create_postgres_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    ensure_pg_trgm(schema_editor.connection)
+    for sql in PG_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_postgres_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for sql in PG_DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0005_kanban_flow_metrics'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_postgres_indexes, drop_postgres_indexes),
+    ]
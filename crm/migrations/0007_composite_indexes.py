@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0006_postgres_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='kanbantask',
+            index=models.Index(fields=['project', 'order'], name='crm_kanbant_project_bcadbd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['responsible', '-created_at'], name='crm_project_respons_f7fc9e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectfile',
+            index=models.Index(fields=['project', 'folder'], name='crm_project_project_f7d4b4_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:46
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_task_ref(apps, schema_editor):
+    # записи удалённых задач (task=NULL) восстановить нельзя — они остаются без task_ref
+    KanbanTaskHistory = apps.get_model("crm", "KanbanTaskHistory")
+    KanbanTaskHistory.objects.filter(task__isnull=False).update(task_ref=F("task_id"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0009_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kanbantaskhistory',
+            name='task_ref',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_task_ref, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, MaxValueValidator, FileExtensionValidator
 from django.utils import timezone
 
@@ -49,6 +50,69 @@ class Developer(models.Model):
         return self.full_name
 
 
+class Competency(models.Model):
+    """
+    Нормализованная компетенция (тег), разобранная из Developer.competencies.
+    """
+    name = models.CharField(max_length=100, unique=True, verbose_name="Ключ")
+    title = models.CharField(max_length=100, verbose_name="Название")
+
+    class Meta:
+        ordering = ["name"]
+        verbose_name = "Компетенция"
+        verbose_name_plural = "Компетенции"
+
+    def __str__(self):
+        return self.title
+
+
+class DeveloperCompetency(models.Model):
+    """
+    Связь разработчик — компетенция.
+    Уникальный индекс (competency, developer) работает как инвертированный индекс.
+    """
+    developer = models.ForeignKey(
+        Developer,
+        on_delete=models.CASCADE,
+        related_name="competency_links",
+    )
+    competency = models.ForeignKey(
+        Competency,
+        on_delete=models.CASCADE,
+        related_name="developer_links",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["competency", "developer"],
+                name="unique_developer_competency",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.developer_id}:{self.competency_id}"
+
+
+class ProjectQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """
+        Проекты, доступные пользователю по роли:
+        - Admin: все
+        - PM: где он ответственный
+        - DEV: где он назначен разработчиком
+        """
+        if not user or not user.is_authenticated:
+            return self.none()
+        if user.is_superuser or user.is_admin_role():
+            return self
+        if user.is_pm():
+            return self.filter(responsible=user)
+        if user.is_dev():
+            return self.filter(developers__user=user)
+        return self.none()
+
+
 class Project(models.Model):
     name = models.CharField(max_length=255, db_index=True, default='', verbose_name="Название проекта")
     customer_name = models.CharField(max_length=255, db_index=True, blank=True, default='', verbose_name="Заказчик")
@@ -86,6 +150,8 @@ class Project(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+    # оптимистическая блокировка: растёт при каждом изменении через API (crm.concurrency)
+    version = models.PositiveIntegerField(default=1, verbose_name="Версия")
 
     kanban_token = models.UUIDField(
         default=uuid.uuid4,
@@ -102,8 +168,14 @@ class Project(models.Model):
         db_index=True,
     )
 
+    objects = ProjectQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        # список проектов PM: filter(responsible=user) + ordering
+        indexes = [
+            models.Index(fields=["responsible", "-created_at"]),
+        ]
         verbose_name = 'Проект'
         verbose_name_plural = 'Проекты'
 
@@ -183,6 +255,12 @@ class ProjectFile(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # дерево файлов: filter(project=..., folder__isnull=True) и файлы папки
+        indexes = [
+            models.Index(fields=["project", "folder"]),
+        ]
+
     def filename(self):
         return self.file.name.split("/")[-1]
 
@@ -193,6 +271,9 @@ class ProjectFile(models.Model):
 
 # новые модели, для изоляции каждой доски для своего проекта
 class KanbanColumn(models.Model):
+    # код финальной колонки: задачи в ней считаются закрытыми
+    DONE = "done"
+
     project = models.ForeignKey(
         Project,
         on_delete=models.CASCADE,
@@ -271,6 +352,8 @@ class KanbanTask(models.Model):
     )
 
     updated_at = models.DateTimeField(auto_now=True)
+    # оптимистическая блокировка: растёт при каждом изменении через API (crm.concurrency)
+    version = models.PositiveIntegerField(default=1, verbose_name="Версия")
 
     deadline = models.DateField(
         null=True,
@@ -280,6 +363,10 @@ class KanbanTask(models.Model):
 
     class Meta:
         ordering = ["order"]
+        # задачи доски: filter(project=...) в порядке order, без сортировки во временном B-tree
+        indexes = [
+            models.Index(fields=["project", "order"]),
+        ]
         verbose_name = "Задача канбана"
         verbose_name_plural = "Задачи канбана"
 
@@ -330,6 +417,9 @@ class KanbanTaskHistory(models.Model):
         related_name="history",
         verbose_name="Задача канбана",
     )
+    # id задачи без FK: task обнуляется при удалении задачи, а свёртке метрик
+    # (crm.flow_metrics) нужно знать, чья это запись, и после удаления
+    task_ref = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
 
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -358,7 +448,179 @@ class KanbanTaskHistory(models.Model):
             models.Index(fields=["task", "-created_at"]),
         ]
 
+    def save(self, *args, **kwargs):
+        if self.task_ref is None:
+            self.task_ref = self.task_id
+        super().save(*args, **kwargs)
+
     def __str__(self):
         task_part = f"task={self.task_id}" if self.task_id else "task=deleted"
         return f"{self.project_id}:{task_part} {self.action} {self.created_at}"
 
+
+
+
+class SearchDocumentQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """
+        Документы поиска, которые пользователь может видеть.
+        Проекты и задачи — по видимости проекта, профили — как в DeveloperViewSet.
+        """
+        if not user or not user.is_authenticated:
+            return self.none()
+        if user.is_superuser or user.is_admin_role():
+            return self
+
+        by_project = models.Q(project__in=Project.objects.visible_to(user).values("id"))
+        if user.is_pm():
+            return self.filter(by_project | models.Q(kind=SearchDocument.Kind.DEVELOPER))
+        if user.is_dev():
+            return self.filter(by_project | models.Q(kind=SearchDocument.Kind.DEVELOPER, owner=user))
+        return self.none()
+
+
+class SearchDocument(models.Model):
+    """
+    Денормализованная запись полнотекстового индекса.
+    Обновляется сигналами crm.signals; сам индекс (FTS5 / GIN) строится миграцией.
+    """
+    class Kind(models.TextChoices):
+        PROJECT = "project", "Проект"
+        DEVELOPER = "developer", "Разработчик"
+        TASK = "task", "Задача канбана"
+
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    object_id = models.PositiveBigIntegerField()
+
+    # для проектов и задач — проект (по нему фильтруем видимость)
+    project = models.ForeignKey(
+        Project,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    # для профилей разработчиков — пользователь-владелец
+    owner = models.ForeignKey(
+        User,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True, default="")
+    # ищется только для ADMIN/PM (например, заказчик проекта)
+    private_body = models.TextField(blank=True, default="")
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = SearchDocumentQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_id"], name="unique_search_document"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id} {self.title}"
+
+
+class KanbanMetricsWatermark(models.Model):
+    """
+    До какой записи KanbanTaskHistory уже свёрнуты метрики (created_at, id).
+    """
+    name = models.CharField(max_length=50, unique=True)
+    last_created_at = models.DateTimeField(null=True, blank=True)
+    last_history_id = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.last_created_at} #{self.last_history_id}"
+
+
+class KanbanFlowSnapshot(models.Model):
+    """
+    Сколько задач было в колонке на конец дня (для cumulative flow diagram).
+    Строки пишутся только за дни, в которые что-то менялось; пропуски заполняются предыдущим днём.
+    """
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name="flow_snapshots",
+    )
+    date = models.DateField()
+    column = models.CharField(max_length=50)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ("date", "column")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["project", "date", "column"],
+                name="unique_flow_snapshot",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.project_id}:{self.date} {self.column}={self.count}"
+
+
+class KanbanTaskFlow(models.Model):
+    """
+    Накопленное время задачи по колонкам и ключевые моменты для lead/cycle time.
+    task_id — не FK: статистика переживает удаление задачи.
+    """
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name="task_flows",
+    )
+    task_id = models.PositiveBigIntegerField(unique=True)
+
+    current_column = models.CharField(max_length=50, null=True, blank=True)
+    entered_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    done_at = models.DateTimeField(null=True, blank=True)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    # {код колонки: секунды}, без учёта текущего незакрытого интервала
+    column_seconds = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["project", "done_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.project_id}:task={self.task_id} {self.current_column}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Ответ на POST с заголовком Idempotency-Key (crm.idempotency): повтор запроса
+    с тем же ключом получает сохранённый ответ. status_code=None — запрос ещё выполняется.
+    Записи старше CRM_IDEMPOTENCY_TTL удаляются, таблица ограничена CRM_IDEMPOTENCY_MAX_KEYS строками.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    endpoint = models.CharField(max_length=100)
+    key = models.CharField(max_length=255)
+    # sha256 метода, пути и тела запроса: тот же ключ с другим телом — ошибка клиента
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "endpoint", "key"],
+                name="unique_idempotency_key",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.endpoint} {self.key}"
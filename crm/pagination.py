@@ -0,0 +1,119 @@
+"""
+Пагинация списков проектов и разработчиков.
+
+По умолчанию — обычный PageNumberPagination (?page=N, с count).
+Параметр ?cursor= включает keyset-пагинацию: страница выбирается условием
+"после последней строки предыдущей страницы" по полям keyset (с id для
+однозначности при равных значениях), без OFFSET и без COUNT(*).
+Первая страница — ?cursor= (пустое значение), дальше — ссылка из "next".
+Общее число строк добавляется только по ?count=1.
+В keyset-режиме порядок фиксирован, ?ordering= не учитывается.
+"""
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    # поля сортировки, последнее должно быть уникальным (обычно id)
+    keyset = ("-id",)
+
+    keyset_mode = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset_mode = self.cursor_query_param in request.query_params
+        if not self.keyset_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        self.total = None
+        if request.query_params.get(self.count_query_param) in ("1", "true"):
+            self.total = queryset.count()
+
+        queryset = queryset.order_by(*self.keyset)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.last = rows[-1] if rows else None
+        return rows
+
+    def get_paginated_response(self, data):
+        if not self.keyset_mode:
+            return super().get_paginated_response(data)
+        payload = {"next": self.get_next_link(), "results": data}
+        if self.total is not None:
+            payload["count"] = self.total
+        return Response(payload)
+
+    def get_next_link(self):
+        if not self.keyset_mode:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.count_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last))
+
+    # --- курсор ---
+
+    def _fields(self):
+        return [(name.lstrip("-"), name.startswith("-")) for name in self.keyset]
+
+    def encode_cursor(self, obj):
+        values = []
+        for name, _ in self._fields():
+            value = getattr(obj, name)
+            values.append(value.isoformat() if hasattr(value, "isoformat") else value)
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+    def decode_cursor(self, request, model):
+        raw = request.query_params.get(self.cursor_query_param)
+        if not raw:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4)))
+            fields = self._fields()
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            return [
+                (name, descending, model._meta.get_field(name).to_python(value))
+                for (name, descending), value in zip(fields, values)
+            ]
+        except Exception:
+            raise NotFound("Invalid cursor")
+
+    @staticmethod
+    def after(position):
+        """
+        (a, b) > (x, y) с учётом направления каждого поля:
+        a > x OR (a = x AND b > y)
+        """
+        condition = Q()
+        equal = Q()
+        for name, descending, value in position:
+            lookup = "lt" if descending else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+
+class ProjectPagination(KeysetPagination):
+    keyset = ("-created_at", "-id")
+
+
+class DeveloperPagination(KeysetPagination):
+    keyset = ("full_name", "id")
@@ -1,6 +1,8 @@
 from rest_framework import permissions
 import logging
 
+from .access import get_access
+
 logger = logging.getLogger(__name__)
 
 
@@ -58,23 +60,9 @@ class IsProjectResponsibleOrAdmin(permissions.BasePermission):
     """
     def has_object_permission(self, request, view, obj):
         try:
-            # Admin can access everything
-            if request.user.is_superuser or request.user.is_admin_role():
-                return True
-
-            # PM can access their own projects
-            if request.user.is_pm():
-                return obj.responsible == request.user
-
-            # Developer can access projects they're assigned to
-            if request.user.is_dev():
-                try:
-                    developer = request.user.developer_profile
-                    return developer in obj.developers.all()
-                except Exception:
-                    return False
-
-            return False
+            # Admin - everything, PM - own projects, Developer - assigned projects
+            # (role and project ids are preloaded once per request, see crm.access)
+            return get_access(request).can_view_project(obj)
         except Exception as e:
             logger.error(f"Error checking project object permission: {str(e)}")
             return False
@@ -0,0 +1,100 @@
+"""
+Быстрый JSON для DRF: orjson, если установлен, иначе стандартный json.
+
+dumps/loads повторяют интерфейс orjson (dumps возвращает bytes), поэтому
+FastJSONRenderer/FastJSONParser не зависят от того, какой backend выбран.
+Backend задаётся CRM_JSON_BACKEND (orjson | json); без пакета orjson всегда json.
+
+Типы, которых orjson не знает (Decimal, ленивые строки, timedelta, QuerySet ...),
+кодируются тем же rest_framework.utils.encoders.JSONEncoder.default, что и в
+стандартном JSONRenderer, поэтому ответы совпадают по содержимому.
+"""
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+from rest_framework.utils.json import strict_constant
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - зависит от окружения
+    orjson = None
+
+_encoder = encoders.JSONEncoder()
+
+
+def _stdlib_dumps(data):
+    return json.dumps(
+        data, cls=encoders.JSONEncoder, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+    ).encode()
+
+
+def _stdlib_loads(raw):
+    # NaN/Infinity отклоняются, как в JSONParser со STRICT_JSON (orjson их тоже не принимает)
+    return json.loads(raw, parse_constant=strict_constant)
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+    def _orjson_dumps(data):
+        try:
+            return orjson.dumps(data, default=_encoder.default, option=_ORJSON_OPTIONS)
+        except TypeError:
+            # orjson.JSONEncodeError: например, int больше 64 бит — stdlib справится
+            return _stdlib_dumps(data)
+
+    BACKENDS = {
+        "orjson": (_orjson_dumps, orjson.loads),
+        "json": (_stdlib_dumps, _stdlib_loads),
+    }
+else:
+    BACKENDS = {"json": (_stdlib_dumps, _stdlib_loads)}
+
+
+def get_backend():
+    name = getattr(settings, "CRM_JSON_BACKEND", "orjson")
+    return name if name in BACKENDS else "json"
+
+
+def dumps(data):
+    return BACKENDS[get_backend()][0](data)
+
+
+def loads(raw):
+    return BACKENDS[get_backend()][1](raw)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in замена rest_framework.renderers.JSONRenderer.
+    Отступы (?indent=, browsable API) и COMPACT_JSON=False отдаются стандартному рендереру.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = dumps(data)
+        # как и JSONRenderer, экранируем U+2028/U+2029, чтобы ответ оставался подмножеством JS
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return loads(stream.read())
+        except ValueError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
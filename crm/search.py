@@ -0,0 +1,236 @@
+"""
+Полнотекстовый поиск по проектам, разработчикам и задачам канбана.
+
+Данные лежат в SearchDocument (обновляется сигналами из crm.signals),
+сам индекс зависит от СУБД:
+- SQLite: виртуальная таблица FTS5 + триггеры (см. миграцию 0003)
+- PostgreSQL: GIN-индексы по to_tsvector(...)
+- остальные: запасной вариант через icontains
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import SearchDocument, Project, Developer, KanbanTask
+
+FTS_TABLE = "crm_searchdocument_fts"
+PG_CONFIG = "simple"
+
+# выражения должны совпадать с GIN-индексами из миграции
+PG_PUBLIC_VECTOR = "to_tsvector('simple', coalesce(d.title, '') || ' ' || coalesce(d.body, ''))"
+PG_FULL_VECTOR = (
+    "to_tsvector('simple', coalesce(d.title, '') || ' ' || coalesce(d.body, '')"
+    " || ' ' || coalesce(d.private_body, ''))"
+)
+
+MAX_LIMIT = 100
+SNIPPET_LENGTH = 200
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_fts_available = None
+
+
+def _join(*parts):
+    return "\n".join(p for p in parts if p)
+
+
+def document_for(instance):
+    """
+    Возвращает поля SearchDocument для объекта или None, если тип не индексируется.
+    """
+    if isinstance(instance, Project):
+        return {
+            "kind": SearchDocument.Kind.PROJECT,
+            "object_id": instance.pk,
+            "project_id": instance.pk,
+            "owner_id": None,
+            "title": instance.name,
+            "body": _join(instance.active_stage, instance.stages, instance.comments),
+            "private_body": instance.customer_name,
+        }
+    if isinstance(instance, Developer):
+        return {
+            "kind": SearchDocument.Kind.DEVELOPER,
+            "object_id": instance.pk,
+            "project_id": None,
+            "owner_id": instance.user_id,
+            "title": instance.full_name,
+            "body": _join(instance.position, instance.competencies),
+            "private_body": "",
+        }
+    if isinstance(instance, KanbanTask):
+        return {
+            "kind": SearchDocument.Kind.TASK,
+            "object_id": instance.pk,
+            "project_id": instance.project_id,
+            "owner_id": None,
+            "title": instance.title,
+            "body": instance.description or "",
+            "private_body": "",
+        }
+    return None
+
+
+def index_object(instance):
+    doc = document_for(instance)
+    if doc is None:
+        return
+    kind = doc.pop("kind")
+    object_id = doc.pop("object_id")
+    doc["title"] = (doc["title"] or "")[:255]
+    SearchDocument.objects.update_or_create(kind=kind, object_id=object_id, defaults=doc)
+
+
+def remove_object(instance):
+    doc = document_for(instance)
+    if doc is None:
+        return
+    SearchDocument.objects.filter(kind=doc["kind"], object_id=doc["object_id"]).delete()
+
+
+def index_objects(instances, batch_size=1000):
+    """
+    Массовая (пере)индексация — для bulk_create/импорта, где сигналы не срабатывают.
+    """
+    docs = []
+    for instance in instances:
+        doc = document_for(instance)
+        if doc is None:
+            continue
+        doc["title"] = (doc["title"] or "")[:255]
+        docs.append(SearchDocument(**doc))
+    if docs:
+        SearchDocument.objects.bulk_create(
+            docs,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["kind", "object_id"],
+            update_fields=["project", "owner", "title", "body", "private_body", "updated_at"],
+        )
+    return len(docs)
+
+
+def rebuild_index(batch_size=1000):
+    """
+    Полная пересборка индекса из исходных таблиц.
+    """
+    SearchDocument.objects.all().delete()
+    total = 0
+    for queryset in (
+        Project.objects.order_by("pk"),
+        Developer.objects.order_by("pk"),
+        KanbanTask.objects.order_by("pk"),
+    ):
+        chunk = []
+        for obj in queryset.iterator(chunk_size=batch_size):
+            chunk.append(obj)
+            if len(chunk) >= batch_size:
+                total += index_objects(chunk, batch_size=batch_size)
+                chunk = []
+        total += index_objects(chunk, batch_size=batch_size)
+    return total
+
+
+def fts_available():
+    """
+    Есть ли FTS5-таблица (создаётся миграцией только если SQLite собран с FTS5).
+    """
+    global _fts_available
+    if _fts_available is None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+                [FTS_TABLE],
+            )
+            _fts_available = cursor.fetchone() is not None
+    return _fts_available
+
+
+def _tokens(query):
+    return _TOKEN_RE.findall(query or "")[:16]
+
+
+def _can_see_private(user):
+    return user.is_superuser or user.is_admin_role() or user.is_pm()
+
+
+def _ranked_ids_sqlite(tokens, visible_sql, visible_params, private, limit):
+    match = " ".join(f'"{t}"*' for t in tokens)
+    if not private:
+        match = "{title body} : (" + match + ")"
+    sql = (
+        f"SELECT d.id, bm25({FTS_TABLE}, 10.0, 1.0, 1.0) AS rank "
+        f"FROM {FTS_TABLE} JOIN crm_searchdocument d ON d.id = {FTS_TABLE}.rowid "
+        f"WHERE {FTS_TABLE} MATCH %s AND d.id IN ({visible_sql}) "
+        "ORDER BY rank LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, *visible_params, limit])
+        # bm25: чем меньше, тем релевантнее
+        return [(row[0], -row[1]) for row in cursor.fetchall()]
+
+
+def _ranked_ids_postgres(tokens, visible_sql, visible_params, private, limit):
+    vector = PG_FULL_VECTOR if private else PG_PUBLIC_VECTOR
+    tsquery = " & ".join(f"{t}:*" for t in tokens)
+    sql = (
+        f"SELECT d.id, ts_rank({vector}, q) AS rank "
+        f"FROM crm_searchdocument d, to_tsquery('{PG_CONFIG}', %s) q "
+        f"WHERE {vector} @@ q AND d.id IN ({visible_sql}) "
+        "ORDER BY rank DESC LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [tsquery, *visible_params, limit])
+        return [(row[0], row[1]) for row in cursor.fetchall()]
+
+
+def _ranked_ids_fallback(tokens, visible, private, limit):
+    qs = visible
+    for token in tokens:
+        cond = Q(title__icontains=token) | Q(body__icontains=token)
+        if private:
+            cond |= Q(private_body__icontains=token)
+        qs = qs.filter(cond)
+    return [(pk, 0.0) for pk in qs.order_by("-updated_at").values_list("id", flat=True)[:limit]]
+
+
+def search_documents(user, query, kinds=None, limit=20):
+    """
+    Ранжированный поиск с учётом роли пользователя.
+    Возвращает список словарей: kind, id, project, title, snippet, rank.
+    """
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    private = _can_see_private(user)
+
+    visible = SearchDocument.objects.visible_to(user)
+    if kinds:
+        visible = visible.filter(kind__in=kinds)
+    visible_sql, visible_params = visible.values("id").query.sql_with_params()
+
+    if connection.vendor == "sqlite" and fts_available():
+        ranked = _ranked_ids_sqlite(tokens, visible_sql, visible_params, private, limit)
+    elif connection.vendor == "postgresql":
+        ranked = _ranked_ids_postgres(tokens, visible_sql, visible_params, private, limit)
+    else:
+        ranked = _ranked_ids_fallback(tokens, visible, private, limit)
+
+    docs = SearchDocument.objects.in_bulk([pk for pk, _ in ranked])
+    hits = []
+    for pk, rank in ranked:
+        doc = docs.get(pk)
+        if doc is None:
+            continue
+        hits.append({
+            "kind": doc.kind,
+            "id": doc.object_id,
+            "project": doc.project_id,
+            "title": doc.title,
+            "snippet": doc.body[:SNIPPET_LENGTH],
+            "rank": round(rank, 4),
+        })
+    return hits
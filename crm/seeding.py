@@ -0,0 +1,394 @@
+"""
+Генератор синтетических данных для нагрузочного тестирования.
+
+Строит пользователей всех ролей, разработчиков, проекты с назначениями,
+колонки канбана, задачи с историей и деревья папок/файлов.
+Всё создаётся через bulk_create пачками, сигналы не срабатывают —
+поэтому в конце пересобираются индексы поиска и компетенций.
+Результат детерминирован: одинаковый seed и параметры дают одинаковые данные
+(метки времени отсчитываются от полуночи текущего дня).
+"""
+import contextlib
+import datetime
+import json
+import random
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import (
+    Developer, KanbanColumn, KanbanTask, KanbanTaskHistory, Project, ProjectFile, ProjectFolder,
+)
+from .search import rebuild_index
+from .staffing import rebuild_competency_index
+from .views import DEFAULT_KANBAN_COLUMNS
+from .workload import invalidate_workloads
+
+User = get_user_model()
+
+USERNAME_PREFIX = "seed_"
+PROJECT_PREFIX = "Seed project "
+SEED_PASSWORD = "seed-password"
+
+DEFAULTS = {
+    "seed": 42,
+    "admins": 2,
+    "pms": 10,
+    "developers": 200,
+    "projects": 50,
+    "team_size": 6,
+    "tasks_per_project": 400,
+    "history_per_task": 10,
+    "folder_depth": 3,
+    "folders_per_level": 2,
+    "files_per_folder": 3,
+    "days": 180,
+    "batch_size": 5000,
+}
+
+POSITIONS = ["Backend", "Frontend", "Fullstack", "QA", "Mobile", "DevOps", "Designer", "Analyst"]
+COMPETENCIES = [
+    "Python", "Django", "DRF", "PostgreSQL", "Redis", "Celery", "React", "TypeScript", "Vue",
+    "Docker", "Kubernetes", "Go", "Kotlin", "Swift", "Flutter", "QA", "Selenium", "Figma", "Linux",
+]
+STAGES = ["Аналитика", "Дизайн", "Разработка", "Тестирование", "Поддержка"]
+WORDS = [
+    "авторизация", "отчёт", "интеграция", "платёж", "поиск", "уведомления", "экспорт",
+    "фильтр", "дашборд", "профиль", "кэш", "миграция", "API", "мобильная версия", "рефакторинг",
+]
+
+# куда чаще всего двигается задача из каждой колонки
+NEXT_COLUMNS = {
+    "queue": ["inprogress", "inprogress", "inprogress", "blocked"],
+    "inprogress": ["done", "done", "help", "blocked", "queue"],
+    "help": ["inprogress", "inprogress", "blocked"],
+    "blocked": ["inprogress", "queue"],
+    "done": ["inprogress"],
+}
+
+HISTORY_FIELDS = (
+    "project", "task", "task_ref", "user", "action", "from_column", "to_column", "old_data", "new_data", "created_at",
+)
+
+
+@contextlib.contextmanager
+def _explicit_timestamps(*fields):
+    """
+    Временно отключает auto_now/auto_now_add, чтобы bulk_create сохранил
+    сгенерированные даты, а не «сейчас».
+    """
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f, _, _ in saved:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def _field(model, name):
+    return model._meta.get_field(name)
+
+
+def _adapter(field):
+    """
+    Приведение значения к виду БД без поздних проверок Field.get_db_prep_save —
+    на миллионе строк они занимают больше времени, чем сама вставка.
+    """
+    kind = field.get_internal_type()
+    if kind == "DateTimeField":
+        return connection.ops.adapt_datetimefield_value
+    if kind == "JSONField":
+        return lambda value: json.dumps(value)
+    return None
+
+
+def _insert_rows(model, names, rows, batch_size):
+    """
+    INSERT через executemany без построения экземпляров модели.
+    Для истории канбана это на порядок быстрее bulk_create.
+    """
+    fields = [_field(model, name) for name in names]
+    columns = ", ".join(connection.ops.quote_name(f.column) for f in fields)
+    sql = (
+        f"INSERT INTO {connection.ops.quote_name(model._meta.db_table)} ({columns}) "
+        f"VALUES ({', '.join(['%s'] * len(fields))})"
+    )
+    adapters = [(i, adapt) for i, adapt in enumerate(map(_adapter, fields)) if adapt]
+    with connection.cursor() as cursor:
+        for offset in range(0, len(rows), batch_size):
+            batch = [list(row) for row in rows[offset:offset + batch_size]]
+            for row in batch:
+                for i, adapt in adapters:
+                    if row[i] is not None:
+                        row[i] = adapt(row[i])
+            cursor.executemany(sql, batch)
+
+
+class Seeder:
+    def __init__(self, log=None, **options):
+        self.options = {**DEFAULTS, **{k: v for k, v in options.items() if v is not None}}
+        self.rnd = random.Random(self.options["seed"])
+        self.batch_size = self.options["batch_size"]
+        self.log = log or (lambda message: None)
+        self.now = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.start = self.now - datetime.timedelta(days=self.options["days"])
+        self.counts = {}
+        # готовые фразы: на миллионе событий sample() заметен в профиле
+        self.phrases = [self._phrase(2) for _ in range(500)]
+
+    # --- helpers ---
+
+    def _uuid(self):
+        return uuid.UUID(int=self.rnd.getrandbits(128), version=4)
+
+    def _moment(self, after=None):
+        low = after or self.start
+        span = max(1, int((self.now - low).total_seconds()))
+        return low + datetime.timedelta(seconds=self.rnd.randint(1, span))
+
+    def _phrase(self, words=3):
+        return " ".join(self.rnd.sample(WORDS, words)).capitalize()
+
+    def _count(self, key, value):
+        self.counts[key] = self.counts.get(key, 0) + value
+
+    # --- steps ---
+
+    def create_users(self):
+        o = self.options
+        password = make_password(SEED_PASSWORD)
+        users = []
+        for role, amount in (
+            (User.Roles.ADMIN, o["admins"]),
+            (User.Roles.PM, o["pms"]),
+            (User.Roles.DEV, o["developers"]),
+        ):
+            for i in range(amount):
+                users.append(User(
+                    username=f"{USERNAME_PREFIX}{role.lower()}_{i:05d}",
+                    password=password,
+                    full_name=f"{role.label} {i:05d}",
+                    email=f"{role.lower()}{i}@seed.local",
+                    role=role,
+                    # User.save() не вызывается — флаг ставим сами
+                    is_superuser=role == User.Roles.ADMIN,
+                ))
+        users = User.objects.bulk_create(users, batch_size=self.batch_size)
+        self.pms = [u for u in users if u.role == User.Roles.PM]
+        self._count("users", len(users))
+
+        # профили разработчиков обычно создаёт сигнал post_save, здесь — пачкой
+        developers = [
+            Developer(
+                user=u,
+                full_name=u.full_name,
+                position=self.rnd.choice(POSITIONS),
+                cooperation_format=self.rnd.choice(Developer.CooperationFormat.values),
+                competencies=", ".join(self.rnd.sample(COMPETENCIES, self.rnd.randint(2, 6))),
+                workload=self.rnd.choice(["", "40 ч/нед", "20 ч/нед", "по запросу"]),
+            )
+            for u in users if u.role == User.Roles.DEV
+        ]
+        self.developers = Developer.objects.bulk_create(developers, batch_size=self.batch_size)
+        self._count("developers", len(self.developers))
+        self.log(f"users: {len(users)}, developers: {len(self.developers)}")
+
+    def create_projects(self):
+        o = self.options
+        projects = []
+        for i in range(o["projects"]):
+            created = self._moment()
+            projects.append(Project(
+                name=f"{PROJECT_PREFIX}{i:05d}",
+                customer_name=f"Заказчик {self.rnd.randint(1, max(1, o['projects'] // 3)):04d}",
+                total_cost=self.rnd.randint(50, 5000) * 1000,
+                deadline=(created + datetime.timedelta(days=self.rnd.randint(30, 365))).date(),
+                completion_percent=self.rnd.choice([0, 10, 25, 50, 75, 90, 100]),
+                responsible=self.rnd.choice(self.pms) if self.pms else None,
+                stages="\n".join(STAGES),
+                active_stage=self.rnd.choice(STAGES),
+                comments=self._phrase(),
+                kanban_token=self._uuid(),
+                files_token=self._uuid(),
+                created_at=created,
+                updated_at=created,
+            ))
+        with _explicit_timestamps(_field(Project, "created_at"), _field(Project, "updated_at")):
+            self.projects = Project.objects.bulk_create(projects, batch_size=self.batch_size)
+
+        Through = Project.developers.through
+        self.teams = {}
+        links = []
+        for project in self.projects:
+            team = self.rnd.sample(self.developers, min(o["team_size"], len(self.developers)))
+            self.teams[project.pk] = [dev.pk for dev in team]
+            links.extend(Through(project_id=project.pk, developer_id=dev.pk) for dev in team)
+        Through.objects.bulk_create(links, batch_size=self.batch_size)
+
+        columns = [
+            KanbanColumn(project=project, code=code, title=title, order=order)
+            for project in self.projects
+            for order, (code, title) in enumerate(DEFAULT_KANBAN_COLUMNS)
+        ]
+        KanbanColumn.objects.bulk_create(columns, batch_size=self.batch_size)
+        self.columns = {
+            (project_id, code): pk
+            for pk, project_id, code in KanbanColumn.objects.filter(
+                project__in=self.projects
+            ).values_list("pk", "project_id", "code")
+        }
+        self._count("projects", len(self.projects))
+        self.log(f"projects: {len(self.projects)}, assignments: {len(links)}, columns: {len(columns)}")
+
+    def _simulate(self, project_id):
+        """
+        Путь задачи по доске: [(action, from, to, created_at, old, new)], первый шаг — create.
+        """
+        created = self._moment()
+        events = [(KanbanTaskHistory.ACTION_CREATE, None, "queue", created, None, None)]
+        column = "queue"
+        at = created
+        for _ in range(self.options["history_per_task"] - 1):
+            at = min(at + datetime.timedelta(minutes=self.rnd.randint(5, 60 * 48)), self.now)
+            if self.rnd.random() < 0.6:
+                target = self.rnd.choice(NEXT_COLUMNS[column])
+                events.append((KanbanTaskHistory.ACTION_MOVE, column, target, at, None, None))
+                column = target
+            else:
+                old = {"title": self.rnd.choice(self.phrases)}
+                new = {"title": self.rnd.choice(self.phrases)}
+                events.append((KanbanTaskHistory.ACTION_UPDATE, None, None, at, old, new))
+        return column, events
+
+    def _task_batch(self, specs):
+        """
+        Создаёт пачку задач и их историю. specs — [(project_id, order)].
+        """
+        tasks = []
+        paths = []
+        for project_id, order in specs:
+            column, events = self._simulate(project_id)
+            team = self.teams[project_id]
+            assignee = self.rnd.choice(team) if team and self.rnd.random() < 0.8 else None
+            deadline = None
+            if self.rnd.random() < 0.5:
+                deadline = (events[0][3] + datetime.timedelta(days=self.rnd.randint(1, 60))).date()
+            tasks.append(KanbanTask(
+                project_id=project_id,
+                column_id=self.columns[(project_id, column)],
+                title=self._phrase(),
+                description=self._phrase(6) if self.rnd.random() < 0.5 else "",
+                order=order,
+                assignee_kind=KanbanTask.AssigneeKind.DEVELOPER if assignee else KanbanTask.AssigneeKind.NONE,
+                assignee_developer_id=assignee,
+                deadline=deadline,
+                updated_at=events[-1][3],
+            ))
+            paths.append(events)
+
+        with _explicit_timestamps(_field(KanbanTask, "updated_at")):
+            tasks = KanbanTask.objects.bulk_create(tasks)
+
+        user_ids = [pm.pk for pm in self.pms] or [None]
+        history = [
+            (task.project_id, task.pk, task.pk, self.rnd.choice(user_ids), action, from_column, to_column, old, new, at)
+            for task, events in zip(tasks, paths)
+            for action, from_column, to_column, at, old, new in events
+        ]
+        _insert_rows(KanbanTaskHistory, HISTORY_FIELDS, history, self.batch_size)
+        self._count("tasks", len(tasks))
+        self._count("history", len(history))
+
+    def create_tasks(self):
+        o = self.options
+        # одна пачка задач ~ batch_size строк истории
+        per_batch = max(1, self.batch_size // max(1, o["history_per_task"]))
+        specs = [
+            (project.pk, order)
+            for project in self.projects
+            for order in range(o["tasks_per_project"])
+        ]
+        for offset in range(0, len(specs), per_batch):
+            with transaction.atomic():
+                self._task_batch(specs[offset:offset + per_batch])
+            if (offset // per_batch) % 20 == 0:
+                self.log(f"tasks: {self.counts['tasks']}, history: {self.counts['history']}")
+
+    def create_files(self):
+        o = self.options
+        uploader = self.pms[0] if self.pms else None
+        folders_by_level = []
+        parents = [(project.pk, None) for project in self.projects]
+        for depth in range(o["folder_depth"]):
+            level = [
+                ProjectFolder(
+                    uuid=self._uuid(), project_id=project_id, parent_id=parent_id,
+                    name=f"Папка {depth + 1}.{n + 1}", created_at=self._moment(),
+                )
+                for project_id, parent_id in parents
+                for n in range(o["folders_per_level"])
+            ]
+            with _explicit_timestamps(_field(ProjectFolder, "created_at")):
+                level = ProjectFolder.objects.bulk_create(level, batch_size=self.batch_size)
+            folders_by_level.append(level)
+            parents = [(f.project_id, f.pk) for f in level]
+
+        # файлы в корне и в каждой папке; сами файлы на диск не пишутся
+        places = [(project.pk, None) for project in self.projects] + [
+            (f.project_id, f.pk) for level in folders_by_level for f in level
+        ]
+        files = []
+        for project_id, folder_id in places:
+            for n in range(o["files_per_folder"]):
+                file_uuid = self._uuid()
+                files.append(ProjectFile(
+                    uuid=file_uuid, project_id=project_id, folder_id=folder_id,
+                    file=f"project_files/seed/{file_uuid.hex[:12]}_{n}.pdf",
+                    uploaded_by=uploader, created_at=self._moment(),
+                ))
+        with _explicit_timestamps(_field(ProjectFile, "created_at")):
+            ProjectFile.objects.bulk_create(files, batch_size=self.batch_size)
+
+        folders = sum(len(level) for level in folders_by_level)
+        self._count("folders", folders)
+        self._count("files", len(files))
+        self.log(f"folders: {folders}, files: {len(files)}")
+
+    def rebuild_indexes(self):
+        """
+        bulk_create обходит сигналы — пересобираем производные данные.
+        """
+        self._count("search_documents", rebuild_index(batch_size=self.batch_size))
+        rebuild_competency_index(batch_size=self.batch_size)
+        invalidate_workloads()
+        self.log(f"search documents: {self.counts['search_documents']}")
+
+    def run(self, reindex=True):
+        self.create_users()
+        self.create_projects()
+        self.create_tasks()
+        self.create_files()
+        if reindex:
+            self.rebuild_indexes()
+        return self.counts
+
+
+def seed_crm(log=None, reindex=True, **options):
+    """
+    Заполняет БД синтетическими данными. Возвращает {сущность: количество}.
+    """
+    return Seeder(log=log, **options).run(reindex=reindex)
+
+
+def clear_seeded():
+    """
+    Удаляет ранее сгенерированные данные (по префиксам имён).
+    """
+    projects, _ = Project.objects.filter(name__startswith=PROJECT_PREFIX).delete()
+    users, _ = User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+    return projects + users
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from .models import Project, Developer, KanbanTask, KanbanColumn, ProjectFolder, ProjectFile
 from .models import KanbanTaskHistory
+from .workload import get_workload, get_workloads
 
 import logging
 
@@ -19,6 +20,72 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 
+def _query_list(request, name):
+    if request is None or name not in request.query_params:
+        return None
+    return {item.strip() for item in request.query_params.get(name, "").split(",") if item.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    ?fields=a,b — отдаются только перечисленные поля (id всегда);
+    ?expand=x,y — вложенные связи из expandable_fields.
+    С любым из параметров вложенные связи отдаются только если запрошены явно;
+    без параметров ответ прежний. Параметры только сужают набор полей сериализатора роли,
+    поэтому запрещённые роли поля (salary, passport_data, total_cost) не появятся.
+
+    prefetch_map: поле -> lookups для prefetch_related, нужные только при его выводе.
+    """
+    expandable_fields = ()
+    prefetch_map = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        wanted = self.wanted_fields()
+        if wanted is not None:
+            for name in list(self.fields):
+                if name not in wanted:
+                    self.fields.pop(name)
+
+    def wanted_fields(self):
+        request = self.context.get("request")
+        # на запись набор полей не сужаем — иначе пропадёт валидация
+        if request is None or request.method not in ("GET", "HEAD"):
+            return None
+        fields = _query_list(request, "fields")
+        expand = _query_list(request, "expand")
+        if fields is None and expand is None:
+            return None
+
+        expandable = set(self.expandable_fields)
+        if fields is None:
+            fields = {name for name in self.fields if name not in expandable}
+        return fields | ((expand or set()) & expandable) | {"id"}
+
+    def get_prefetch_lookups(self):
+        lookups = []
+        for name in self.fields:
+            for lookup in self.prefetch_map.get(name, ()):
+                if lookup not in lookups:
+                    lookups.append(lookup)
+        return lookups
+
+
+class LiveWorkloadMixin(serializers.Serializer):
+    """
+    Фактическая загрузка из crm.workload.
+    Карта загрузки читается один раз на корневой сериализатор (а не на каждую строку списка).
+    """
+    live_workload = serializers.SerializerMethodField()
+
+    def get_live_workload(self, obj):
+        root = self.root
+        workloads = getattr(root, "_workloads", None)
+        if workloads is None:
+            workloads = root._workloads = get_workloads()
+        return get_workload(obj.pk, workloads)
+
+
 # ========== Developer Serializers (без изменений) ==========
 
 class DeveloperBaseSerializer(serializers.ModelSerializer):
@@ -34,10 +101,13 @@ class DeveloperBaseSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'user_details']
 
 
-class DeveloperAdminSerializer(serializers.ModelSerializer):
+class DeveloperAdminSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user_details = UserSerializer(source='user', read_only=True)
     projects_count = serializers.SerializerMethodField()
 
+    expandable_fields = ('user_details',)
+    prefetch_map = {'projects_count': ('projects',)}
+
     class Meta:
         model = Developer
         fields = '__all__'
@@ -47,10 +117,13 @@ class DeveloperAdminSerializer(serializers.ModelSerializer):
         return obj.projects.count()
 
 
-class DeveloperPMSerializer(serializers.ModelSerializer):
+class DeveloperPMSerializer(SparseFieldsMixin, LiveWorkloadMixin, serializers.ModelSerializer):
     user_details = UserSerializer(source='user', read_only=True)
     projects_count = serializers.SerializerMethodField()
 
+    expandable_fields = ('user_details',)
+    prefetch_map = {'projects_count': ('projects',)}
+
     class Meta:
         model = Developer
         exclude = ['passport_data', 'contacts']
@@ -60,9 +133,11 @@ class DeveloperPMSerializer(serializers.ModelSerializer):
         return obj.projects.count()
 
 
-class DeveloperDeveloperSerializer(serializers.ModelSerializer):
+class DeveloperDeveloperSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user_details = UserSerializer(source='user', read_only=True)
 
+    expandable_fields = ('user_details',)
+
     class Meta:
         model = Developer
         fields = [
@@ -75,9 +150,18 @@ class DeveloperDeveloperSerializer(serializers.ModelSerializer):
 
 # ========== Project Serializers ==========
 
-class ProjectBaseSerializer(serializers.ModelSerializer):
+class ProjectBaseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     responsible_details = UserSerializer(source='responsible', read_only=True)
     developers_count = serializers.SerializerMethodField()
+    # меняется только условным UPDATE в ProjectViewSet.update (crm.concurrency)
+    version = serializers.IntegerField(read_only=True)
+
+    expandable_fields = ('responsible_details', 'developers_details')
+    prefetch_map = {
+        'developers': ('developers',),
+        'developers_count': ('developers',),
+        'developers_details': ('developers__user',),
+    }
 
     class Meta:
         model = Project
@@ -85,7 +169,7 @@ class ProjectBaseSerializer(serializers.ModelSerializer):
             'id', 'name', 'deadline', 'completion_percent',
             'responsible', 'responsible_details', 'developers',
             'developers_count', 'stages', 'active_stage', 'comments',
-            'created_at', 'updated_at', 'documents'
+            'created_at', 'updated_at', 'documents', 'version'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
@@ -103,13 +187,25 @@ class ProjectAdminSerializer(ProjectBaseSerializer):
 class ProjectPMSerializer(ProjectBaseSerializer):
     developers_details = DeveloperPMSerializer(source='developers', many=True, read_only=True)
 
+    prefetch_map = {
+        **ProjectBaseSerializer.prefetch_map,
+        'developers_details': ('developers__user', 'developers__projects'),
+    }
+
     class Meta(ProjectBaseSerializer.Meta):
         fields = '__all__'
 
 
-class ProjectDeveloperSerializer(serializers.ModelSerializer):
+class ProjectDeveloperSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     responsible_details = UserSerializer(source='responsible', read_only=True)
     developers_count = serializers.SerializerMethodField()
+    version = serializers.IntegerField(read_only=True)
+
+    expandable_fields = ('responsible_details',)
+    prefetch_map = {
+        'developers': ('developers',),
+        'developers_count': ('developers',),
+    }
 
     class Meta:
         model = Project
@@ -122,16 +218,18 @@ class ProjectDeveloperSerializer(serializers.ModelSerializer):
 
 # ========== Lightweight List Serializers ==========
 
-class DeveloperListSerializer(serializers.ModelSerializer):
+class DeveloperListSerializer(SparseFieldsMixin, LiveWorkloadMixin, serializers.ModelSerializer):
     class Meta:
         model = Developer
-        fields = ['id', 'full_name', 'position', 'cooperation_format']
+        fields = ['id', 'full_name', 'position', 'cooperation_format', 'live_workload']
 
 
-class ProjectListSerializer(serializers.ModelSerializer):
+class ProjectListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     responsible_name = serializers.CharField(source='responsible.get_full_name', read_only=True)
     developers_count = serializers.SerializerMethodField()
 
+    prefetch_map = {'developers_count': ('developers',)}
+
     class Meta:
         model = Project
         fields = [
@@ -184,7 +282,9 @@ class KanbanTaskSerializer(serializers.ModelSerializer):
             "assignee_value",    # read-only token
             "assignee_display",  # read-only text
             "updated_at",
+            "version",           # read-only, для оптимистической блокировки
         )
+        read_only_fields = ("version",)
 
     def get_assignee_display(self, obj: KanbanTask) -> str:
         return obj.get_assignee_display()
@@ -198,9 +298,10 @@ class KanbanTaskSerializer(serializers.ModelSerializer):
             return f"dev:{obj.assignee_developer_id}"
         return ""
 
-    def _apply_assignee_token(self, task: KanbanTask, token: str):
+    def _apply_assignee_token(self, task: KanbanTask, token: str, developers=None):
         """
         Применяем token к задаче + валидируем, что исполнитель связан с проектом.
+        developers — заранее загруженные {id: Developer} проекта (массовые операции, без запроса на задачу).
         """
         token = (token or "").strip()
 
@@ -228,6 +329,12 @@ class KanbanTaskSerializer(serializers.ModelSerializer):
         # dev:<id>
         if token.startswith("dev:"):
             dev_id = int(token.split(":", 1)[1])
+            if developers is not None:
+                if dev_id not in developers:
+                    raise serializers.ValidationError({"assignee": "Нельзя назначить этого разработчика: он не связан с проектом."})
+                task.assignee_kind = KanbanTask.AssigneeKind.DEVELOPER
+                task.assignee_developer = developers[dev_id]
+                return
             if not task.project.developers.filter(id=dev_id).exists():
                 raise serializers.ValidationError({"assignee": "Нельзя назначить этого разработчика: он не связан с проектом."})
             task.assignee_kind = KanbanTask.AssigneeKind.DEVELOPER
@@ -0,0 +1,75 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import Project, Developer, KanbanTask
+from . import search
+from .staffing import sync_developer_competencies
+from .views import ensure_kanban_columns
+from .workload import invalidate_workloads
+
+
+SEARCH_FIELDS = {
+    Project: {"name", "customer_name", "active_stage", "stages", "comments"},
+    Developer: {"full_name", "position", "competencies", "user"},
+    KanbanTask: {"title", "description", "project"},
+}
+
+WORKLOAD_FIELDS = {"column", "assignee_developer", "assignee_kind", "deadline"}
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Developer)
+@receiver(post_save, sender=KanbanTask)
+def update_search_document(sender, instance, update_fields=None, **kwargs):
+    """
+    Обновляем поисковый индекс.
+    Сохранения без текстовых полей (например, reorder: column/order) пропускаем.
+    """
+    if update_fields and not SEARCH_FIELDS[sender] & set(update_fields):
+        return
+    search.index_object(instance)
+
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Developer)
+@receiver(post_delete, sender=KanbanTask)
+def delete_search_document(sender, instance, **kwargs):
+    search.remove_object(instance)
+
+
+@receiver(post_save, sender=Project)
+def create_kanban_columns(sender, instance, created, raw=False, **kwargs):
+    """
+    Колонки канбана создаются вместе с проектом, чтобы чтение доски не открывало транзакцию.
+    """
+    if created and not raw:
+        ensure_kanban_columns(instance)
+
+
+@receiver(post_save, sender=Developer)
+def update_developer_competencies(sender, instance, update_fields=None, **kwargs):
+    """
+    Пересобираем теги компетенций, только если менялось поле competencies.
+    """
+    if update_fields and "competencies" not in update_fields:
+        return
+    sync_developer_competencies(instance)
+
+
+@receiver(post_save, sender=KanbanTask)
+def invalidate_workload_on_task_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not WORKLOAD_FIELDS & set(update_fields):
+        return
+    invalidate_workloads()
+
+
+@receiver(post_delete, sender=KanbanTask)
+@receiver(post_delete, sender=Developer)
+def invalidate_workload_on_delete(sender, instance, **kwargs):
+    invalidate_workloads()
+
+
+@receiver(m2m_changed, sender=Project.developers.through)
+def invalidate_workload_on_assignment(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_workloads()
@@ -0,0 +1,196 @@
+"""
+Индекс компетенций и подбор разработчиков под набор навыков.
+
+Developer.competencies — свободный текст ("Python, Django; React").
+Он разбирается в нормализованные теги Competency, связи лежат в DeveloperCompetency.
+"""
+import re
+
+from django.db.models import Count, ExpressionWrapper, F, FloatField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Competency, Developer, DeveloperCompetency, KanbanColumn, KanbanTask, Project
+
+# вес совпавшего навыка и «штрафы» за текущую загрузку
+SKILL_WEIGHT = 10.0
+PROJECT_WEIGHT = 1.0
+OPEN_TASK_WEIGHT = 0.5
+
+MAX_LIMIT = 100
+
+_SPLIT_RE = re.compile(r"[,;/\n|•]+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_competency(value):
+    """
+    "  Django REST  " -> "django rest"
+    """
+    return _SPACE_RE.sub(" ", value or "").strip().lower()[:100]
+
+
+def parse_competencies(text):
+    """
+    Разбирает свободный текст в {ключ: отображаемое название}.
+    """
+    result = {}
+    for part in _SPLIT_RE.split(text or ""):
+        title = _SPACE_RE.sub(" ", part).strip()[:100]
+        name = normalize_competency(title)
+        if name and name not in result:
+            result[name] = title
+    return result
+
+
+def _competency_ids(parsed):
+    """
+    Возвращает {ключ: id}, создавая недостающие компетенции одним запросом.
+    """
+    if not parsed:
+        return {}
+    Competency.objects.bulk_create(
+        [Competency(name=name, title=title) for name, title in parsed.items()],
+        ignore_conflicts=True,
+    )
+    return dict(Competency.objects.filter(name__in=parsed).values_list("name", "id"))
+
+
+def sync_developer_competencies(developer):
+    """
+    Приводит связи разработчика в соответствие с полем competencies.
+    """
+    wanted = set(_competency_ids(parse_competencies(developer.competencies)).values())
+    current = set(
+        DeveloperCompetency.objects.filter(developer=developer).values_list("competency_id", flat=True)
+    )
+
+    if current - wanted:
+        DeveloperCompetency.objects.filter(
+            developer=developer, competency_id__in=current - wanted
+        ).delete()
+    if wanted - current:
+        DeveloperCompetency.objects.bulk_create(
+            [DeveloperCompetency(developer=developer, competency_id=cid) for cid in wanted - current],
+            ignore_conflicts=True,
+        )
+
+
+def sync_competencies_bulk(developers, batch_size=1000):
+    """
+    Полная (пере)сборка связей для набора разработчиков — для импорта и rebuild.
+    """
+    developers = list(developers)
+    if not developers:
+        return 0
+
+    parsed = {dev.pk: parse_competencies(dev.competencies) for dev in developers}
+    all_names = {}
+    for items in parsed.values():
+        for name, title in items.items():
+            all_names.setdefault(name, title)
+    ids = _competency_ids(all_names)
+
+    DeveloperCompetency.objects.filter(developer_id__in=parsed).delete()
+    links = [
+        DeveloperCompetency(developer_id=dev_id, competency_id=ids[name])
+        for dev_id, items in parsed.items()
+        for name in items
+    ]
+    DeveloperCompetency.objects.bulk_create(links, batch_size=batch_size, ignore_conflicts=True)
+    return len(links)
+
+
+def rebuild_competency_index(batch_size=1000):
+    total = 0
+    chunk = []
+    for dev in Developer.objects.only("id", "competencies").order_by("pk").iterator(chunk_size=batch_size):
+        chunk.append(dev)
+        if len(chunk) >= batch_size:
+            total += sync_competencies_bulk(chunk, batch_size=batch_size)
+            chunk = []
+    total += sync_competencies_bulk(chunk, batch_size=batch_size)
+    return total
+
+
+def _count_subquery(queryset, field):
+    """
+    COUNT(*) по связанной таблице в виде коррелированного подзапроса.
+    """
+    return Coalesce(
+        Subquery(
+            queryset.values(field).annotate(c=Count("*")).values("c")[:1],
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def rank_developers(skills, limit=20, require_all=False):
+    """
+    Ранжирует разработчиков по совпавшим навыкам с учётом загрузки:
+    score = совпадения * SKILL_WEIGHT - проекты * PROJECT_WEIGHT - открытые задачи * OPEN_TASK_WEIGHT
+
+    Подсчёт и сортировка выполняются в БД одним запросом (подзапросы без GROUP BY),
+    совпавшие навыки для выдачи — ещё одним.
+    """
+    names = sorted({normalize_competency(s) for s in skills} - {""})
+    if not names:
+        return []
+    limit = max(1, min(int(limit), MAX_LIMIT))
+
+    projects_count = _count_subquery(
+        Project.developers.through.objects.filter(developer_id=OuterRef("pk")),
+        "developer_id",
+    )
+    open_tasks = _count_subquery(
+        KanbanTask.objects.filter(assignee_developer_id=OuterRef("pk")).exclude(column__code=KanbanColumn.DONE),
+        "assignee_developer_id",
+    )
+
+    matched = _count_subquery(
+        DeveloperCompetency.objects.filter(developer_id=OuterRef("pk"), competency__name__in=names),
+        "developer_id",
+    )
+
+    # кандидаты берутся из инвертированного индекса (competency -> developer)
+    candidates = DeveloperCompetency.objects.filter(competency__name__in=names).values("developer_id")
+
+    qs = (
+        Developer.objects.filter(pk__in=candidates)
+        .annotate(
+            matched=matched,
+            active_projects=projects_count,
+            open_tasks=open_tasks,
+        )
+        .annotate(
+            score=ExpressionWrapper(
+                F("matched") * Value(SKILL_WEIGHT)
+                - F("active_projects") * Value(PROJECT_WEIGHT)
+                - F("open_tasks") * Value(OPEN_TASK_WEIGHT),
+                output_field=FloatField(),
+            )
+        )
+    )
+    if require_all:
+        qs = qs.filter(matched=len(names))
+
+    rows = list(
+        qs.order_by("-score", "full_name", "pk").values(
+            "id", "full_name", "position", "matched", "active_projects", "open_tasks", "score"
+        )[:limit]
+    )
+
+    matched_skills = {}
+    for dev_id, title in (
+        DeveloperCompetency.objects.filter(
+            developer_id__in=[row["id"] for row in rows], competency__name__in=names
+        )
+        .order_by("competency__name")
+        .values_list("developer_id", "competency__title")
+    ):
+        matched_skills.setdefault(dev_id, []).append(title)
+
+    for row in rows:
+        row["matched_skills"] = matched_skills.get(row["id"], [])
+        row["score"] = round(float(row["score"]), 2)
+    return rows
@@ -391,12 +391,19 @@ function renderHistory(items, mode = 'task') {
       }
 
       if (modalCtx.mode === 'edit' && modalCtx.cardId) {
-        await apiPatchTask(modalCtx.cardId, { title, description, status, assignee, deadline });
+        const version = state.cards[modalCtx.cardId]?.version;
+        await apiPatchTask(modalCtx.cardId, { title, description, status, assignee, deadline, version });
         closeModal();
         await loadKanbanFromServer();
       }
     } catch (err) {
       console.error(err);
+      if (err.status === 409 && modalCtx.mode === 'edit') {
+        // задачу уже изменил кто-то другой — показываем актуальную доску
+        errorEl.textContent = 'Задачу изменил другой пользователь. Данные обновлены, проверьте и сохраните ещё раз.';
+        await loadKanbanFromServer();
+        return;
+      }
       errorEl.textContent = 'Ошибка сохранения. Попробуйте ещё раз.';
     }
   }
@@ -685,6 +692,7 @@ function closeActivity() {
           deadline: t.deadline || null,
           assignee_value: t.assignee_value || "",
           assignee_display: t.assignee_display || "",
+          version: t.version || 1,
           createdAt: Date.now(),
           updatedAt: Date.now(),
       };
@@ -702,6 +710,7 @@ function closeActivity() {
   async function apiCreateTask({ title, description, status, assignee, deadline }) {
       return fetchJson(API_TASK_CREATE_URL, {
         method: 'POST',
+        idempotencyKey: newIdempotencyKey(),
         body: JSON.stringify({
           project: Number(projectId),
           title,
@@ -741,30 +750,57 @@ function closeActivity() {
     STATUSES.forEach(({ id: st }) => {
       const ids = state.order[st] || [];
       ids.forEach((taskId, idx) => {
-        updates.push({ id: Number(taskId), status: st, order: idx });
+        updates.push({ id: Number(taskId), status: st, order: idx, version: state.cards[taskId]?.version });
       });
     });
 
-    return fetchJson(API_REORDER_URL, {
+    const data = await fetchJson(API_REORDER_URL, {
       method: 'POST',
+      idempotencyKey: newIdempotencyKey(),
       body: JSON.stringify({ project: Number(projectId), updates }),
     });
+    // новые версии перемещённых задач — для следующего перетаскивания/редактирования
+    Object.entries(data.versions || {}).forEach(([taskId, version]) => {
+      if (state.cards[taskId]) state.cards[taskId].version = version;
+    });
+    return data;
   }
 
-  async function fetchJson(url, { method, body }) {
-    const resp = await fetch(url, {
-      method,
-      headers: {
-        'Content-Type': 'application/json',
-        'X-CSRFToken': getCookie('csrftoken'),
-      },
-      credentials: 'same-origin',
-      body,
-    });
-    if (!resp.ok) throw new Error(`${method} ${url} failed`);
+  async function fetchJson(url, { method, body, idempotencyKey }) {
+    const headers = {
+      'Content-Type': 'application/json',
+      'X-CSRFToken': getCookie('csrftoken'),
+    };
+    if (idempotencyKey) headers['Idempotency-Key'] = idempotencyKey;
+
+    const options = { method, headers, credentials: 'same-origin', body };
+    // с ключом запрос безопасно повторить при сетевом сбое: сервер не выполнит его дважды
+    const resp = idempotencyKey ? await fetchWithRetry(url, options) : await fetch(url, options);
+    if (!resp.ok) {
+      const err = new Error(`${method} ${url} failed`);
+      err.status = resp.status;
+      err.data = await resp.json().catch(() => ({}));
+      throw err;
+    }
     return resp.json().catch(() => ({}));
   }
 
+  async function fetchWithRetry(url, options, retries = 2) {
+    for (let attempt = 0; ; attempt++) {
+      try {
+        return await fetch(url, options);
+      } catch (err) {
+        if (attempt >= retries) throw err;
+        await new Promise(resolve => setTimeout(resolve, 500 * (attempt + 1)));
+      }
+    }
+  }
+
+  function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+  }
+
   /* -------------------- Storage-free default state -------------------- */
 
   function defaultState() {
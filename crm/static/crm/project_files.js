@@ -11,6 +11,11 @@ document.addEventListener("DOMContentLoaded", () => {
 
   const CSRF_TOKEN = getCookie("csrftoken");
 
+  function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+  }
+
   /* ================= ELEMENTS ================= */
 
   const dropzone = document.getElementById("dropzone");
@@ -269,14 +274,29 @@ document.addEventListener("DOMContentLoaded", () => {
       form.append("folder", currentFolder);
     }
 
-    const r = await fetch(`/api/projects/${PROJECT_UUID}/files/upload/`, {
-      method: "POST",
-      credentials: "same-origin",
-      headers: {
-        "X-CSRFToken": CSRF_TOKEN
-      },
-      body: form
-    });
+    // один ключ на загрузку: повтор после сетевого сбоя не создаст файлы второй раз
+    const idempotencyKey = newIdempotencyKey();
+    let r;
+    for (let attempt = 0; ; attempt++) {
+      try {
+        r = await fetch(`/api/projects/${PROJECT_UUID}/files/upload/`, {
+          method: "POST",
+          credentials: "same-origin",
+          headers: {
+            "X-CSRFToken": CSRF_TOKEN,
+            "Idempotency-Key": idempotencyKey
+          },
+          body: form
+        });
+        break;
+      } catch (err) {
+        if (attempt >= 2) {
+          alert("Не удалось загрузить файлы. Проверьте соединение.");
+          return;
+        }
+        await new Promise(resolve => setTimeout(resolve, 500 * (attempt + 1)));
+      }
+    }
 
     if (!r.ok) {
       alert("Нет прав на загрузку файлов");
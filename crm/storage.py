@@ -0,0 +1,47 @@
+"""
+Хранилище статики для продакшена: ManifestStaticFilesStorage + заранее сжатые копии.
+
+После collectstatic рядом с каждым хешированным файлом (kanban.3f2a9c1b7e4d.js ...) лежат
+.gz и (при установленном brotli) .br. nginx отдаёт их через gzip_static/brotli_static
+без сжатия на лету, а по хешу в имени файлы можно кэшировать навсегда (см. README).
+Включается переменной COMPRESS_STATIC.
+"""
+import gzip
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+from .compression import brotli
+
+STATIC_COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".mjs", ".map", ".svg", ".json", ".txt", ".html", ".xml")
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        min_size = getattr(settings, "CRM_COMPRESS_MIN_SIZE", 1024)
+        for name in sorted(set(self.hashed_files.values())):
+            if name.lower().endswith(STATIC_COMPRESSIBLE_EXTENSIONS):
+                self.write_compressed(name, min_size)
+
+    def write_compressed(self, name, min_size):
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < min_size:
+            return []
+        written = []
+        # статика сжимается один раз, поэтому уровень максимальный; mtime=0 — одинаковый результат
+        variants = [(".gz", gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append((".br", brotli.compress(content, quality=11)))
+        for suffix, data in variants:
+            target = name + suffix
+            if self.exists(target):
+                self.delete(target)
+            if len(data) < len(content):
+                self._save(target, ContentFile(data))
+                written.append(target)
+        return written
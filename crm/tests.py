@@ -1,3 +1,1190 @@
-from django.test import TestCase
+import csv
+import datetime
+import gzip
+import importlib
+import io
+import json
+import tempfile
+import uuid
+import zipfile
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
+from xml.etree import ElementTree
 
-# Create your tests here.
+from decouple import Config
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from crm_system.db import database_config
+from users.backends import ModelBackendWithProfile
+
+from . import metrics
+from .access import AccessContext
+from .compression import CompressionMiddleware, available_encodings, choose_encoding
+from .idempotency import purge_expired
+from .kanban_bulk import BulkTaskWriter
+from .renderers import FastJSONParser, FastJSONRenderer
+from .models import (
+    Project, ProjectFile, Developer, KanbanColumn, KanbanTask, KanbanTaskHistory, SearchDocument,
+    IdempotencyKey, KanbanFlowSnapshot, KanbanTaskFlow,
+)
+from .views import DEFAULT_KANBAN_COLUMNS, ensure_kanban_columns
+from .workload import get_workloads
+from .flow_metrics import fold_history
+from .benchmark import compare, load_baseline, run_benchmark
+from .seeding import seed_crm
+
+
+User = get_user_model()
+
+
+class CrmTestCase(TestCase):
+    """
+    Базовые данные: admin, два PM, два разработчика и два проекта.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="pass", role=User.Roles.ADMIN, full_name="Админ")
+        cls.pm = User.objects.create_user("pm", password="pass", role=User.Roles.PM, full_name="Пётр Менеджер")
+        cls.other_pm = User.objects.create_user("pm2", password="pass", role=User.Roles.PM, full_name="Другой PM")
+        cls.dev_user = User.objects.create_user("dev", password="pass", role=User.Roles.DEV, full_name="Дмитрий Разработчик")
+        cls.other_dev_user = User.objects.create_user("dev2", password="pass", role=User.Roles.DEV, full_name="Ольга Бэкенд")
+        cls.dev = cls.dev_user.developer_profile
+        cls.other_dev = cls.other_dev_user.developer_profile
+
+        cls.project = Project.objects.create(
+            name="Платформа логистики", customer_name="ООО Ромашка",
+            total_cost="150000.00", responsible=cls.pm, active_stage="Проектирование",
+        )
+        cls.project.developers.add(cls.dev)
+        cls.other_project = Project.objects.create(
+            name="Мобильный банк", customer_name="Банк Север", responsible=cls.other_pm,
+        )
+        cls.other_project.developers.add(cls.other_dev)
+
+        ensure_kanban_columns(cls.project)
+        ensure_kanban_columns(cls.other_project)
+        cls.queue = KanbanColumn.objects.get(project=cls.project, code="queue")
+        cls.done = KanbanColumn.objects.get(project=cls.project, code="done")
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+
+class SearchTests(CrmTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        KanbanTask.objects.create(
+            project=cls.project, column=cls.queue,
+            title="Интеграция складского API", description="Синхронизация остатков",
+        )
+        KanbanTask.objects.create(
+            project=cls.other_project,
+            column=KanbanColumn.objects.get(project=cls.other_project, code="queue"),
+            title="Интеграция платёжного шлюза",
+        )
+
+    def search(self, user, q, **params):
+        return self.client_for(user).get("/api/search/", {"q": q, **params})
+
+    def test_admin_finds_tasks_of_all_projects(self):
+        resp = self.search(self.admin, "интеграц")
+        self.assertEqual(resp.status_code, 200)
+        titles = {hit["title"] for hit in resp.data["results"]}
+        self.assertEqual(titles, {"Интеграция складского API", "Интеграция платёжного шлюза"})
+
+    def test_results_are_filtered_by_role(self):
+        for user in (self.pm, self.dev_user):
+            resp = self.search(user, "интеграц")
+            self.assertEqual([hit["title"] for hit in resp.data["results"]], ["Интеграция складского API"])
+
+    def test_customer_name_is_not_searchable_by_developer(self):
+        self.assertEqual(len(self.search(self.pm, "Ромашка").data["results"]), 1)
+        self.assertEqual(self.search(self.dev_user, "Ромашка").data["results"], [])
+
+    def test_index_follows_model_saves(self):
+        task = KanbanTask.objects.get(title="Интеграция складского API")
+        task.title = "Выгрузка отчётов"
+        task.save()
+        self.assertEqual(self.search(self.pm, "склад", kind="task").data["results"], [])
+        self.assertEqual(len(self.search(self.pm, "выгрузка", kind="task").data["results"]), 1)
+
+        task.delete()
+        self.assertEqual(self.search(self.pm, "выгрузка").data["results"], [])
+
+    def test_developer_profiles(self):
+        self.dev.competencies = "Python, Django"
+        self.dev.save()
+        self.assertEqual(len(self.search(self.pm, "django", kind="developer").data["results"]), 1)
+        self.assertEqual(len(self.search(self.dev_user, "django").data["results"]), 1)
+        self.assertEqual(self.search(self.other_dev_user, "django").data["results"], [])
+
+
+class StaffingTests(CrmTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.dev.competencies = "Python, Django; PostgreSQL"
+        cls.dev.save()
+        cls.other_dev.competencies = "python / django"
+        cls.other_dev.save()
+        # разработчик dev занят: открытая задача в его проекте
+        KanbanTask.objects.create(
+            project=cls.project, column=cls.queue, title="Задача",
+            assignee_kind=KanbanTask.AssigneeKind.DEVELOPER, assignee_developer=cls.dev,
+        )
+
+    def test_competencies_are_normalised(self):
+        names = set(self.other_dev.competency_links.values_list("competency__name", flat=True))
+        self.assertEqual(names, {"python", "django"})
+
+    def test_ranking_accounts_for_skills_and_load(self):
+        resp = self.client_for(self.pm).get("/api/staffing/match/", {"skills": "Python,django"})
+        self.assertEqual(resp.status_code, 200)
+        ids = [row["id"] for row in resp.data["results"]]
+        # одинаковые навыки, но у dev есть открытая задача
+        self.assertEqual(ids, [self.other_dev.id, self.dev.id])
+        self.assertEqual(resp.data["results"][1]["open_tasks"], 1)
+
+        resp = self.client_for(self.pm).get(
+            "/api/staffing/match/", {"skills": "python,postgresql", "require_all": "1"}
+        )
+        self.assertEqual([row["id"] for row in resp.data["results"]], [self.dev.id])
+        self.assertEqual(resp.data["results"][0]["matched_skills"], ["PostgreSQL", "Python"])
+
+    def test_developers_cannot_use_staffing(self):
+        resp = self.client_for(self.dev_user).get("/api/staffing/match/", {"skills": "python"})
+        self.assertEqual(resp.status_code, 403)
+
+
+class WorkloadTests(CrmTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_workload_counts_and_invalidation(self):
+        today = timezone.localdate()
+        KanbanTask.objects.create(
+            project=self.project, column=self.queue, title="Просрочено",
+            deadline=today - datetime.timedelta(days=1),
+            assignee_kind=KanbanTask.AssigneeKind.DEVELOPER, assignee_developer=self.dev,
+        )
+        KanbanTask.objects.create(
+            project=self.project, column=self.done, title="Закрыто",
+            assignee_kind=KanbanTask.AssigneeKind.DEVELOPER, assignee_developer=self.dev,
+        )
+        task = KanbanTask.objects.create(
+            project=self.project, column=self.queue, title="Скоро",
+            deadline=today + datetime.timedelta(days=2),
+            assignee_kind=KanbanTask.AssigneeKind.DEVELOPER, assignee_developer=self.dev,
+        )
+
+        workload = get_workloads()[self.dev.id]
+        self.assertEqual(workload["active_projects"], 1)
+        self.assertEqual(workload["open_tasks"], 2)
+        self.assertEqual(workload["overdue_tasks"], 1)
+        self.assertEqual(workload["due_soon"], 1)
+
+        task.column = self.done
+        task.save(update_fields=["column", "order"])
+        self.assertEqual(get_workloads()[self.dev.id]["open_tasks"], 1)
+
+    def test_workload_in_developer_list(self):
+        resp = self.client_for(self.pm).get("/developers/")
+        self.assertEqual(resp.status_code, 200)
+        rows = {row["id"]: row for row in resp.data["results"]}
+        self.assertEqual(rows[self.dev.id]["live_workload"]["active_projects"], 1)
+
+
+class AnalyticsTests(CrmTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_analytics_respects_role_visibility(self):
+        task = KanbanTask.objects.create(project=self.project, column=self.done, title="Готово")
+        KanbanTaskHistory.objects.create(
+            project=self.project, task=task, action=KanbanTaskHistory.ACTION_MOVE,
+            from_column="queue", to_column="done",
+        )
+
+        data = self.client_for(self.admin).get("/api/analytics/").data
+        self.assertEqual(data["projects_total"], 2)
+        self.assertEqual(len(data["cost_by_responsible"]), 2)
+
+        data = self.client_for(self.pm).get("/api/analytics/").data
+        self.assertEqual(data["projects_total"], 1)
+        self.assertEqual(data["total_cost"], Decimal("150000"))
+        self.assertEqual(data["deadline_buckets"]["no_deadline"], 1)
+        self.assertEqual(sum(week["done"] for week in data["throughput"]), 1)
+
+        data = self.client_for(self.other_dev_user).get("/api/analytics/").data
+        self.assertEqual(data["projects_total"], 1)
+        self.assertEqual(data["throughput"], [])
+        self.assertNotIn("total_cost", data)
+        self.assertNotIn("cost_by_responsible", data)
+
+
+class FlowMetricsTests(CrmTestCase):
+
+    def log(self, task, action, at, from_column=None, to_column=None):
+        row = KanbanTaskHistory.objects.create(
+            project=self.project, task=task, action=action,
+            from_column=from_column, to_column=to_column,
+        )
+        KanbanTaskHistory.objects.filter(pk=row.pk).update(created_at=at)
+
+    def test_history_is_folded_incrementally(self):
+        now = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        day = datetime.timedelta(days=1)
+        task = KanbanTask.objects.create(project=self.project, column=self.done, title="Фича")
+
+        self.log(task, KanbanTaskHistory.ACTION_CREATE, now - 3 * day, to_column="queue")
+        self.log(task, KanbanTaskHistory.ACTION_MOVE, now - 2 * day, "queue", "inprogress")
+        self.assertEqual(fold_history(), 2)
+        self.assertEqual(fold_history(), 0)
+
+        self.log(task, KanbanTaskHistory.ACTION_MOVE, now - day, "inprogress", "done")
+        self.assertEqual(fold_history(), 1)
+
+        resp = self.client_for(self.pm).get(f"/api/kanban/project/{self.project.id}/flow/", {"days": 4})
+        self.assertEqual(resp.status_code, 200)
+        series = {point["date"]: point["columns"] for point in resp.data["cumulative_flow"]}
+        today = timezone.localdate()
+        self.assertEqual(series[(today - 3 * day).isoformat()], {"queue": 1})
+        self.assertEqual(series[(today - 2 * day).isoformat()], {"queue": 0, "inprogress": 1})
+        self.assertEqual(series[today.isoformat()], {"queue": 0, "inprogress": 0, "done": 1})
+
+        cycle = resp.data["cycle_time"]
+        self.assertEqual(cycle["completed"], 1)
+        self.assertEqual(cycle["lead_time_hours"]["avg"], 48.0)
+        self.assertEqual(cycle["cycle_time_hours"]["avg"], 24.0)
+        self.assertEqual(cycle["avg_hours_in_column"], {"queue": 24.0, "inprogress": 24.0})
+
+    def test_deleted_task_closes_its_flow(self):
+        task = KanbanTask.objects.create(project=self.project, column=self.queue, title="Фича")
+        task_id = task.id
+        self.log(task, KanbanTaskHistory.ACTION_CREATE, timezone.now() - datetime.timedelta(days=2), to_column="queue")
+        self.log(task, KanbanTaskHistory.ACTION_MOVE, timezone.now() - datetime.timedelta(days=1), "queue", "inprogress")
+
+        # create и move свёрнуты ещё не были: task в истории уже NULL, свёртка идёт по task_ref
+        resp = self.client_for(self.pm).delete(f"/api/kanban/task/{task_id}/delete/")
+        self.assertEqual(resp.status_code, 204)
+        self.assertFalse(KanbanTaskHistory.objects.filter(task_id=task_id).exists())
+        deleted_at = timezone.now() - datetime.timedelta(hours=1)
+        KanbanTaskHistory.objects.filter(action=KanbanTaskHistory.ACTION_DELETE).update(created_at=deleted_at)
+        self.assertEqual(fold_history(), 3)
+
+        flow = KanbanTaskFlow.objects.get(task_id=task_id)
+        self.assertEqual(flow.deleted_at, deleted_at)
+        self.assertIsNone(flow.current_column)
+        self.assertEqual(set(flow.column_seconds), {"queue", "inprogress"})
+        self.assertEqual(KanbanTaskFlow.objects.filter(task_id=0).count(), 0)
+        counts = dict(
+            KanbanFlowSnapshot.objects.filter(project=self.project, date=timezone.localdate(deleted_at))
+            .values_list("column", "count")
+        )
+        self.assertEqual(counts, {"queue": 0, "inprogress": 0})
+
+    def test_flow_view_only_reads_folded_tables(self):
+        task = KanbanTask.objects.create(project=self.project, column=self.queue, title="Фича")
+        self.log(task, KanbanTaskHistory.ACTION_CREATE, timezone.now() - datetime.timedelta(days=1), to_column="queue")
+
+        resp = self.client_for(self.dev_user).get(f"/api/kanban/project/{self.project.id}/flow/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["cycle_time"]["completed"], 0)
+        # свёртку делает только fold_kanban_metrics
+        self.assertEqual(fold_history(), 1)
+
+    def test_flow_requires_project_access(self):
+        resp = self.client_for(self.other_pm).get(f"/api/kanban/project/{self.project.id}/flow/")
+        self.assertEqual(resp.status_code, 403)
+
+
+class BenchmarkTests(TestCase):
+    """
+    Число SQL-запросов по маршрутам не должно расти относительно crm/benchmark_baseline.json.
+    Задержка здесь не проверяется — она зависит от машины (см. manage.py bench_api).
+    """
+
+    def test_query_counts_match_baseline(self):
+        baseline = load_baseline()
+        report = run_benchmark(**{**baseline["params"], "repeat": 1})
+        regressions, _, missing = compare(report, baseline, latency_factor=None)
+        self.assertEqual(regressions, [])
+        self.assertEqual(missing, [])
+
+
+class SeedingTests(TestCase):
+    def test_seed_builds_consistent_boards(self):
+        counts = seed_crm(
+            admins=1, pms=2, developers=5, projects=3, team_size=2, tasks_per_project=10,
+            history_per_task=6, folder_depth=2, folders_per_level=2, files_per_folder=1,
+        )
+        self.assertEqual(counts["tasks"], 30)
+        self.assertEqual(counts["history"], 180)
+        self.assertEqual(KanbanTaskHistory.objects.count(), 180)
+        self.assertEqual(counts["folders"], 3 * (2 + 4))
+
+        self.assertTrue(User.objects.get(username="seed_admin_00000").is_superuser)
+        self.assertEqual(Developer.objects.filter(user__username__startswith="seed_dev_").count(), 5)
+
+        # колонка задачи совпадает с последним перемещением в истории
+        for task in KanbanTask.objects.select_related("column"):
+            last_move = (
+                task.history.filter(action__in=["create", "move"]).order_by("-created_at", "-id").first()
+            )
+            self.assertEqual(task.column.code, last_move.to_column)
+
+
+@override_settings(CRM_PROFILING_ENABLED=True, CRM_PROFILING_DUPLICATE_THRESHOLD=2)
+class ProfilingMiddlewareTests(CrmTestCase):
+    def test_server_timing_and_duplicate_queries_are_reported(self):
+        for n in range(3):
+            KanbanTask.objects.create(
+                project=self.project, column=self.queue, title=f"Задача {n}", order=n,
+                assignee_kind=KanbanTask.AssigneeKind.DEVELOPER, assignee_developer=self.dev,
+            )
+        client = APIClient()
+        client.force_login(self.pm)
+        with self.assertLogs("crm.profiling", level="INFO") as logs:
+            resp = client.get(f"/api/kanban/{self.project.id}/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('db;dur=', resp["Server-Timing"])
+        self.assertIn("total;dur=", resp["Server-Timing"])
+
+        record = logs.records[-1].profile
+        self.assertEqual(record["view"], "crm.views.kanban_state")
+        self.assertGreater(record["queries"], 0)
+        self.assertTrue(record["duplicate_queries"])
+        self.assertTrue(all(d["count"] >= 2 for d in record["duplicate_queries"]))
+
+    @override_settings(CRM_PROFILING_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_not_profiled(self):
+        resp = self.client_for(self.pm).get("/api/analytics/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn("Server-Timing", resp)
+
+
+class MetricsTests(CrmTestCase):
+    def test_endpoint_reports_views_and_table_sizes(self):
+        cache.clear()
+        self.client_for(self.pm).get(f"/api/kanban/{self.project.id}/")
+        self.client_for(self.pm).get("/projects/")
+
+        resp = self.client.get("/metrics")
+        self.assertEqual(resp.status_code, 200)
+        body = resp.content.decode()
+        self.assertIn('crm_http_requests_total{view="kanban_state",method="GET",status="200"}', body)
+        self.assertIn('crm_http_request_duration_seconds_bucket{view="ProjectViewSet.list",method="GET",le="+Inf"}', body)
+        self.assertIn('crm_table_rows{table="kanban_task_history"} 0', body)
+
+    @override_settings(CRM_METRICS_TOKEN="secret")
+    def test_endpoint_requires_token_when_configured(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        resp = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(resp.status_code, 200)
+
+    def test_worker_files_are_merged(self):
+        with tempfile.TemporaryDirectory() as directory:
+            workers = []
+            for _ in range(2):
+                registry = metrics.Registry(directory=directory)
+                requests = registry.register(metrics.Counter("t_requests_total", "t", ("view",)))
+                duration = registry.register(metrics.Histogram("t_seconds", "t", (), buckets=(0.1, 1.0)))
+                workers.append((registry, requests, duration))
+
+            for n, (registry, requests, duration) in enumerate(workers):
+                # в одном процессе pid общий — подменяем имя файла «воркера»
+                registry._path = lambda pid=None, n=n: Path(directory) / f"metrics_{n}.json"
+                registry.inc(requests, ("kanban_reorder",), 2)
+                registry.observe(duration, (), 0.05 + n)
+                registry.flush()
+
+            body = workers[0][0].render()
+            self.assertIn('t_requests_total{view="kanban_reorder"} 4', body)
+            self.assertIn('t_seconds_bucket{le="0.1"} 1', body)
+            self.assertIn('t_seconds_bucket{le="+Inf"} 2', body)
+            self.assertIn("t_seconds_count 2", body)
+
+
+class AccessContextTests(CrmTestCase):
+    def test_project_ids_are_loaded_once(self):
+        user = ModelBackendWithProfile().get_user(self.dev_user.pk)
+        access = AccessContext(user)
+        with self.assertNumQueries(1):
+            self.assertTrue(access.can_view_project(self.project))
+            self.assertFalse(access.can_view_project(self.other_project))
+            self.assertFalse(access.can_manage_project(self.project))
+        self.assertEqual(access.developer_id, self.dev.id)
+
+        pm_access = AccessContext(self.pm)
+        with self.assertNumQueries(0):
+            self.assertTrue(pm_access.can_manage_project(self.project))
+            self.assertFalse(pm_access.can_view_project(self.other_project))
+
+    def test_dev_sees_only_assigned_projects(self):
+        # DEV, указанный ответственным, но не назначенный, проект не видит — ни в списке, ни по id
+        Project.objects.filter(pk=self.other_project.pk).update(responsible=self.dev_user)
+        self.other_project.refresh_from_db()
+        access = AccessContext(ModelBackendWithProfile().get_user(self.dev_user.pk))
+        self.assertFalse(access.can_view_project(self.other_project))
+        self.assertTrue(access.can_view_project(self.project))
+        self.assertNotIn(self.other_project, Project.objects.visible_to(self.dev_user))
+        self.assertEqual(self.client_for(self.dev_user).get(f"/api/kanban/{self.other_project.id}/").status_code, 403)
+
+        # назначенный и ответственный одновременно — видит
+        self.other_project.developers.add(self.dev)
+        access = AccessContext(ModelBackendWithProfile().get_user(self.dev_user.pk))
+        self.assertTrue(access.can_view_project(self.other_project))
+        self.assertIn(self.other_project, Project.objects.visible_to(self.dev_user))
+
+    def test_kanban_views_use_request_access(self):
+        client = self.client_for(self.dev_user)
+        self.assertEqual(client.get(f"/api/kanban/{self.project.id}/").status_code, 200)
+        self.assertEqual(client.get(f"/api/kanban/{self.other_project.id}/").status_code, 403)
+        self.assertEqual(client.get(f"/projects/{self.other_project.pk}/").status_code, 404)
+
+
+class DatabaseConfigTests(TestCase):
+    def build(self, **env):
+        return database_config(Config(env), Path("/srv/crm"))
+
+    def test_sqlite_is_default(self):
+        db = self.build()
+        self.assertEqual(db["ENGINE"], "django.db.backends.sqlite3")
+        self.assertEqual(db["NAME"], "/srv/crm/db.sqlite3")
+
+    def test_postgres_with_persistent_connections(self):
+        db = self.build(DB_ENGINE="postgres", DB_NAME="crm", DB_CONN_MAX_AGE="120", DB_STATEMENT_TIMEOUT="5000")
+        self.assertEqual(db["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(db["CONN_MAX_AGE"], 120)
+        self.assertTrue(db["CONN_HEALTH_CHECKS"])
+        self.assertEqual(db["OPTIONS"]["options"], "-c statement_timeout=5000")
+        self.assertNotIn("pool", db["OPTIONS"])
+
+    def test_pool_modes(self):
+        db = self.build(DB_ENGINE="postgres", DB_POOL="psycopg", DB_POOL_MAX_SIZE="20")
+        self.assertEqual(db["CONN_MAX_AGE"], 0)
+        self.assertEqual(db["OPTIONS"]["pool"]["max_size"], 20)
+
+        db = self.build(DB_ENGINE="postgres", DB_POOL="pgbouncer")
+        self.assertTrue(db["DISABLE_SERVER_SIDE_CURSORS"])
+
+        with self.assertRaises(ImproperlyConfigured):
+            self.build(DB_ENGINE="mysql")
+
+    def test_sqlite_wal_mode(self):
+        options = self.build()["OPTIONS"]
+        self.assertIn("PRAGMA journal_mode=WAL", options["init_command"])
+        self.assertEqual(options["transaction_mode"], "IMMEDIATE")
+        self.assertNotIn("transaction_mode", self.build(DB_SQLITE_MODE="rollback")["OPTIONS"])
+
+    @skipUnless(connection.vendor == "sqlite", "SQLite PRAGMA")
+    def test_pragmas_are_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+
+@skipUnless(connection.vendor == "postgresql", "PostgreSQL-only indexes")
+class PostgresIndexTests(TestCase):
+    def test_partial_and_trigram_indexes_exist(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename IN ('crm_project', 'crm_developer')")
+            names = {row[0] for row in cursor.fetchall()}
+        self.assertIn("crm_project_active_deadline", names)
+        self.assertIn("crm_project_name_trgm", names)
+        self.assertIn("crm_developer_competencies_trgm", names)
+
+    def test_installed_pg_trgm_is_not_created_again(self):
+        migration = importlib.import_module("crm.migrations.0006_postgres_indexes")
+        # роли приложения без права CREATE хватает расширения, установленного администратором
+        with CaptureQueriesContext(connection) as ctx:
+            migration.ensure_pg_trgm(connection)
+        self.assertFalse([q for q in ctx.captured_queries if "CREATE" in q["sql"].upper()])
+
+
+class QueryPlanTests(CrmTestCase):
+    """
+    Горячие запросы канбана, дерева файлов и списка проектов PM идут по составным индексам.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        other_queue = KanbanColumn.objects.get(project=cls.other_project, code="queue")
+        KanbanTask.objects.bulk_create(
+            KanbanTask(project=project, column=column, title=f"T{n}", order=n)
+            for project, column in ((cls.project, cls.queue), (cls.other_project, other_queue))
+            for n in range(200)
+        )
+        for n in range(30):
+            Project.objects.create(name=f"Проект {n}", responsible=cls.pm if n % 2 else cls.other_pm)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertUsesIndex(self, queryset, model, fields):
+        index = next(i for i in model._meta.indexes if i.fields == fields)
+        plan = queryset.explain()
+        self.assertIn(index.name, plan)
+        # сортировка берётся из индекса, а не из временного B-tree
+        self.assertNotIn("TEMP B-TREE", plan.upper())
+
+    @skipUnless(connection.vendor == "sqlite", "план запроса SQLite")
+    def test_board_tasks_use_project_order_index(self):
+        self.assertUsesIndex(KanbanTask.objects.filter(project=self.project), KanbanTask, ["project", "order"])
+
+    @skipUnless(connection.vendor == "sqlite", "план запроса SQLite")
+    def test_pm_projects_use_responsible_created_index(self):
+        self.assertUsesIndex(Project.objects.visible_to(self.pm), Project, ["responsible", "-created_at"])
+
+    @skipUnless(connection.vendor == "sqlite", "план запроса SQLite")
+    def test_root_files_use_project_folder_index(self):
+        index = ProjectFile._meta.indexes[0].name
+        plan = ProjectFile.objects.filter(project=self.project, folder__isnull=True).explain()
+        self.assertIn(index, plan)
+
+
+class CursorPaginationTests(CrmTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        same_moment = timezone.now()
+        projects = Project.objects.bulk_create(
+            Project(name=f"Проект {n:02d}", responsible=cls.pm) for n in range(45)
+        )
+        # одинаковое created_at — порядок страниц держится на id
+        Project.objects.filter(pk__in=[p.pk for p in projects]).update(created_at=same_moment)
+
+    def walk(self, client, url):
+        ids, pages = [], 0
+        while url:
+            resp = client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            ids += [item["id"] for item in resp.data["results"]]
+            url = resp.data["next"]
+            pages += 1
+        return ids, pages
+
+    def test_keyset_pages_are_stable_and_complete(self):
+        client = self.client_for(self.pm)
+        ids, pages = self.walk(client, "/projects/?cursor=")
+        expected = list(
+            Project.objects.visible_to(self.pm).order_by("-created_at", "-id").values_list("id", flat=True)
+        )
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_count_is_opt_in(self):
+        client = self.client_for(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.get("/developers/?cursor=")
+        self.assertNotIn("count", resp.data)
+        self.assertFalse(any("COUNT(" in q["sql"].upper() for q in queries.captured_queries))
+
+        resp = client.get("/developers/?cursor=&count=1")
+        self.assertEqual(resp.data["count"], Developer.objects.count())
+        self.assertEqual(client.get("/developers/?cursor=garbage").status_code, 404)
+
+    def test_page_number_mode_is_default(self):
+        resp = self.client_for(self.pm).get("/projects/")
+        self.assertEqual(resp.data["count"], 46)
+
+
+class SparseFieldsTests(CrmTestCase):
+    def test_fields_narrow_output_and_skip_prefetch(self):
+        client = self.client_for(self.pm)
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.get(f"/projects/{self.project.pk}/?fields=name,deadline")
+        self.assertEqual(set(resp.data), {"id", "name", "deadline"})
+        self.assertFalse(any("crm_project_developers" in q["sql"] for q in queries.captured_queries))
+
+    def test_expand_includes_only_requested_relations(self):
+        resp = self.client_for(self.pm).get(f"/projects/{self.project.pk}/?expand=developers_details")
+        self.assertIn("developers_details", resp.data)
+        self.assertNotIn("responsible_details", resp.data)
+        self.assertIn("customer_name", resp.data)
+        self.assertEqual(resp.data["developers_details"][0]["full_name"], self.dev.full_name)
+
+        # без параметров ответ прежний
+        resp = self.client_for(self.pm).get(f"/projects/{self.project.pk}/")
+        self.assertIn("developers_details", resp.data)
+        self.assertIn("responsible_details", resp.data)
+
+    def test_forbidden_fields_stay_excluded(self):
+        resp = self.client_for(self.dev_user).get(f"/projects/{self.project.pk}/?fields=name,total_cost,customer_name")
+        self.assertEqual(set(resp.data), {"id", "name"})
+
+        resp = self.client_for(self.pm).get(f"/developers/{self.dev.pk}/?fields=full_name,passport_data,contacts")
+        self.assertEqual(set(resp.data), {"id", "full_name"})
+
+
+class FastJSONTests(TestCase):
+    payload = {
+        "total_cost": Decimal("150000.50"),
+        "kanban_token": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "created_at": datetime.datetime(2026, 1, 2, 3, 4, 5, 678000, tzinfo=datetime.timezone.utc),
+        "deadline": datetime.date(2026, 3, 1),
+        "title": gettext_lazy("Задача\u2028с разделителем"),
+        "columns": {1: "queue"},
+    }
+
+    def test_matches_stdlib_renderer(self):
+        expected = json.loads(JSONRenderer().render(self.payload))
+        for backend in ("orjson", "json"):
+            with self.subTest(backend=backend), override_settings(CRM_JSON_BACKEND=backend):
+                body = FastJSONRenderer().render(self.payload)
+                self.assertEqual(json.loads(body), expected)
+                self.assertIn(b"\\u2028", body)
+        self.assertEqual(expected["created_at"], "2026-01-02T03:04:05.678000Z")
+        self.assertEqual(expected["kanban_token"], "12345678-1234-5678-1234-567812345678")
+
+    def test_parser_and_api_round_trip(self):
+        for backend in ("orjson", "json"):
+            with self.subTest(backend=backend), override_settings(CRM_JSON_BACKEND=backend):
+                parsed = FastJSONParser().parse(io.BytesIO('{"title": "Привет", "n": 1}'.encode()))
+                self.assertEqual(parsed, {"title": "Привет", "n": 1})
+                with self.assertRaises(ParseError):
+                    FastJSONParser().parse(io.BytesIO(b'{"n": NaN}'))
+
+        user = User.objects.create_user("json_pm", password="pass", role=User.Roles.PM)
+        client = APIClient()
+        client.force_authenticate(user)
+        resp = client.post("/projects/", {"name": "JSON", "total_cost": "10.50"}, format="json")
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual(resp["Content-Type"], "application/json")
+        self.assertEqual(resp.json()["total_cost"], "10.50")
+
+
+class CompressionTests(CrmTestCase):
+    def test_large_api_response_is_compressed(self):
+        KanbanTask.objects.bulk_create(
+            KanbanTask(project=self.project, column=self.queue, title=f"Задача {n}", order=n)
+            for n in range(30)
+        )
+        client = self.client_for(self.pm)
+        url = f"/api/kanban/{self.project.id}/"
+        plain = client.get(url)
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertIn("Accept-Encoding", plain["Vary"])
+
+        resp = client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(resp["Content-Encoding"], "gzip")
+        self.assertEqual(int(resp["Content-Length"]), len(resp.content))
+        self.assertLess(len(resp.content), len(plain.content))
+        self.assertEqual(json.loads(gzip.decompress(resp.content)), plain.json())
+
+    def test_small_and_refused_responses_are_untouched(self):
+        client = self.client_for(self.pm)
+        resp = client.get("/api/auth/me/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertLess(len(resp.content), 1024)
+        self.assertNotIn("Content-Encoding", resp)
+        self.assertIsNone(choose_encoding("gzip;q=0, identity"))
+        self.assertIsNone(choose_encoding(""))
+        self.assertEqual(choose_encoding("br, gzip"), "br" if "br" in available_encodings() else "gzip")
+
+    def test_streaming_response_is_compressed_incrementally(self):
+        rows = [f"{n};Задача {n}\n".encode() for n in range(2000)]
+        middleware = CompressionMiddleware(
+            lambda request: StreamingHttpResponse(iter(rows), content_type="text/csv"),
+        )
+        request = RequestFactory().get("/export.csv", HTTP_ACCEPT_ENCODING="gzip")
+        resp = middleware(request)
+        self.assertEqual(resp["Content-Encoding"], "gzip")
+        self.assertNotIn("Content-Length", resp)
+        chunks = list(resp.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(gzip.decompress(b"".join(chunks)), b"".join(rows))
+
+    def test_collectstatic_writes_hashed_compressed_files(self):
+        with tempfile.TemporaryDirectory() as root, override_settings(
+            STATIC_ROOT=root,
+            STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+            STORAGES={
+                "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+                "staticfiles": {"BACKEND": "crm.storage.CompressedManifestStaticFilesStorage"},
+            },
+        ):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            manifest = json.loads((Path(root) / "staticfiles.json").read_text())["paths"]
+            hashed = Path(root) / manifest["crm/kanban.js"]
+            self.assertNotEqual(hashed.name, "kanban.js")
+            self.assertEqual(gzip.decompress((Path(root) / f"{manifest['crm/kanban.js']}.gz").read_bytes()),
+                             hashed.read_bytes())
+            # маленькие файлы не сжимаются
+            self.assertFalse((Path(root) / f"{manifest['crm/admin_project.css']}.gz").exists())
+
+
+class KanbanBoardTests(CrmTestCase):
+    def test_new_project_gets_columns(self):
+        project = Project.objects.create(name="Новый", responsible=self.pm)
+        codes = list(KanbanColumn.objects.filter(project=project).order_by("order").values_list("code", flat=True))
+        self.assertEqual(codes, [code for code, _ in DEFAULT_KANBAN_COLUMNS])
+
+    def test_board_poll_does_not_open_transaction(self):
+        # при DB_SQLITE_MODE=wal любой atomic() — BEGIN IMMEDIATE, т. е. блокировка записи
+        client = self.client_for(self.pm)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(client.get(f"/api/kanban/{self.project.id}/").status_code, 200)
+        self.assertFalse([q["sql"] for q in ctx.captured_queries if "SAVEPOINT" in q["sql"].upper()])
+
+    def test_missing_columns_are_restored(self):
+        KanbanColumn.objects.filter(project=self.project, code="help").delete()
+        self.assertEqual(self.client_for(self.pm).get(f"/api/kanban/{self.project.id}/").status_code, 200)
+        self.assertTrue(KanbanColumn.objects.filter(project=self.project, code="help").exists())
+
+
+class KanbanBulkTests(CrmTestCase):
+    url = "/api/kanban/task/bulk/"
+
+    def _post(self, tasks, user=None, **extra):
+        return self.client_for(user or self.pm).post(
+            self.url, {"project": self.project.id, "tasks": tasks, **extra}, format="json",
+        )
+
+    def test_creates_and_updates_in_one_request(self):
+        existing = KanbanTask.objects.create(project=self.project, column=self.queue, title="Старая", order=0)
+        resp = self._post([
+            {"title": "Импорт 1", "status": "queue", "assignee": f"dev:{self.dev.id}", "deadline": "2026-11-01"},
+            {"title": "Импорт 2", "status": "done", "order": 2, "assignee": f"user:{self.pm.id}"},
+            {"id": existing.id, "title": "Новая", "status": "done"},
+        ])
+        self.assertEqual(resp.status_code, 201, resp.content)
+        body = resp.json()
+        self.assertEqual([t["title"] for t in body["created"]], ["Импорт 1", "Импорт 2"])
+        self.assertEqual(body["created"][0]["assignee_display"], self.dev.full_name)
+        self.assertEqual(body["created"][1]["status"], "done")
+        self.assertEqual(body["updated"][0]["status"], "done")
+        self.assertEqual(body["errors"], [])
+
+        existing.refresh_from_db()
+        self.assertEqual((existing.title, existing.column_id), ("Новая", self.done.id))
+        actions = sorted(KanbanTaskHistory.objects.filter(project=self.project).values_list("action", flat=True))
+        self.assertEqual(actions, ["create", "create", "move", "update"])
+        # bulk_create обходит сигналы — индекс и загрузка обновляются явно
+        self.assertEqual(
+            SearchDocument.objects.filter(kind=SearchDocument.Kind.TASK, project=self.project).count(), 3,
+        )
+        self.assertEqual(get_workloads()[self.dev.id]["open_tasks"], 1)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def run(n):
+            tasks = [{"title": f"T{i}", "status": "queue", "assignee": f"dev:{self.dev.id}"} for i in range(n)]
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self._post(tasks).status_code, 201)
+            return len(ctx)
+
+        # до лимита параметров SQLite (999) вставка идёт одним батчем
+        self.assertEqual(run(5), run(60))
+
+    def test_atomic_and_partial_error_reporting(self):
+        tasks = [
+            {"title": "Ок", "status": "queue"},
+            {"title": "Чужой разработчик", "status": "queue", "assignee": f"dev:{self.other_dev.id}"},
+            {"status": "nope", "title": "Нет колонки"},
+            {"description": "без заголовка"},
+        ]
+        resp = self._post(tasks)
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual([e["index"] for e in resp.json()["errors"]], [1, 2, 3])
+        self.assertFalse(KanbanTask.objects.filter(project=self.project).exists())
+
+        resp = self._post(tasks, atomic=False)
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual([t["title"] for t in resp.json()["created"]], ["Ок"])
+        self.assertEqual(len(resp.json()["errors"]), 3)
+
+        self.assertEqual(self._post(tasks[:1], user=self.other_pm).status_code, 403)
+
+
+class OptimisticLockingTests(CrmTestCase):
+    def test_task_update_with_stale_version_returns_conflict(self):
+        task = KanbanTask.objects.create(project=self.project, column=self.queue, title="Задача", order=0)
+        client = self.client_for(self.pm)
+        url = f"/api/kanban/task/{task.id}/"
+
+        resp = client.patch(url, {"title": "Первая правка", "version": 1}, format="json")
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(resp.json()["version"], 2)
+
+        # второй клиент всё ещё видит версию 1
+        resp = client.patch(url, {"title": "Вторая правка", "version": 1}, format="json")
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(resp.json()["current"]["title"], "Первая правка")
+        self.assertEqual(resp.json()["current"]["version"], 2)
+        task.refresh_from_db()
+        self.assertEqual((task.title, task.version), ("Первая правка", 2))
+        self.assertEqual(KanbanTaskHistory.objects.filter(task=task).count(), 1)
+
+        self.assertEqual(client.patch(url, {"title": "x", "version": "abc"}, format="json").status_code, 400)
+
+    def test_reorder_writes_only_changed_tasks_and_is_atomic(self):
+        first = KanbanTask.objects.create(project=self.project, column=self.queue, title="A", order=0)
+        second = KanbanTask.objects.create(project=self.project, column=self.queue, title="B", order=1)
+        client = self.client_for(self.pm)
+        url = "/api/kanban/reorder/"
+
+        resp = client.post(url, {"project": self.project.id, "updates": [
+            {"id": first.id, "status": "done", "order": 0, "version": 1},
+            {"id": second.id, "status": "queue", "order": 1, "version": 1},
+        ]}, format="json")
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(resp.json()["versions"], {str(first.id): 2, str(second.id): 1})
+
+        second.title = "B2"
+        second.version = 2
+        second.save()
+        resp = client.post(url, {"project": self.project.id, "updates": [
+            {"id": first.id, "status": "queue", "order": 0, "version": 2},
+            {"id": second.id, "status": "done", "order": 1, "version": 1},
+        ]}, format="json")
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(resp.json()["conflicts"], [second.id])
+        self.assertEqual(len(resp.json()["current"]["tasks"]), 2)
+        first.refresh_from_db()
+        # первая задача тоже не сохранена
+        self.assertEqual((first.column_id, first.version), (self.done.id, 2))
+        self.assertEqual(KanbanTaskHistory.objects.filter(project=self.project).count(), 1)
+
+    def test_reorder_rejects_non_numeric_id_and_order(self):
+        task = KanbanTask.objects.create(project=self.project, column=self.queue, title="A", order=0)
+        client = self.client_for(self.pm)
+        for update in (
+            {"id": "abc", "status": "done", "order": 0},
+            {"id": task.id, "status": "done", "order": "x"},
+            {"id": task.id, "status": "done", "order": -1},
+        ):
+            resp = client.post(
+                "/api/kanban/reorder/", {"project": self.project.id, "updates": [update]}, format="json",
+            )
+            self.assertEqual(resp.status_code, 400, update)
+        task.refresh_from_db()
+        self.assertEqual((task.column_id, task.version), (self.queue.id, 1))
+
+    def test_bulk_update_with_stale_version_reports_conflict_per_index(self):
+        first = KanbanTask.objects.create(project=self.project, column=self.queue, title="A", order=0)
+        second = KanbanTask.objects.create(project=self.project, column=self.queue, title="B", order=1)
+        KanbanTask.objects.filter(pk=second.pk).update(title="B2", version=2)
+        client = self.client_for(self.pm)
+        tasks = [
+            {"id": first.id, "title": "A1", "version": 1},
+            {"id": second.id, "title": "B1", "version": 1},
+        ]
+
+        resp = client.post("/api/kanban/task/bulk/", {"project": self.project.id, "tasks": tasks}, format="json")
+        self.assertEqual(resp.status_code, 409, resp.content)
+        errors = resp.json()["errors"]
+        self.assertEqual([e["index"] for e in errors], [1])
+        self.assertEqual(errors[0]["current"]["title"], "B2")
+        first.refresh_from_db()
+        self.assertEqual((first.title, first.version), ("A", 1))
+
+        resp = client.post(
+            "/api/kanban/task/bulk/", {"project": self.project.id, "tasks": tasks, "atomic": False}, format="json",
+        )
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual([t["version"] for t in resp.json()["updated"]], [2])
+        self.assertEqual([e["index"] for e in resp.json()["errors"]], [1])
+        second.refresh_from_db()
+        self.assertEqual((second.title, second.version), ("B2", 2))
+
+    def test_bulk_update_detects_change_after_read(self):
+        task = KanbanTask.objects.create(project=self.project, column=self.queue, title="A", order=0)
+        prepare = BulkTaskWriter.prepare
+
+        def prepare_then_concurrent_edit(writer, items):
+            result = prepare(writer, items)
+            KanbanTask.objects.filter(pk=task.pk).update(title="Чужая правка", version=2)
+            return result
+
+        with mock.patch.object(BulkTaskWriter, "prepare", prepare_then_concurrent_edit):
+            resp = self.client_for(self.pm).post(
+                "/api/kanban/task/bulk/",
+                {"project": self.project.id, "tasks": [{"id": task.id, "title": "Моя правка"}]},
+                format="json",
+            )
+        self.assertEqual(resp.status_code, 409, resp.content)
+        self.assertEqual(resp.json()["errors"][0]["current"]["title"], "Чужая правка")
+        task.refresh_from_db()
+        self.assertEqual((task.title, task.version), ("Чужая правка", 2))
+        self.assertFalse(KanbanTaskHistory.objects.filter(task=task).exists())
+
+    def test_project_update_with_stale_version_returns_conflict(self):
+        client = self.client_for(self.pm)
+        url = f"/projects/{self.project.id}/"
+
+        resp = client.patch(url, {"active_stage": "Разработка", "version": 1}, format="json")
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(resp.json()["version"], 2)
+
+        resp = client.patch(url, {"active_stage": "Тестирование", "version": 1}, format="json")
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(resp.json()["current"]["active_stage"], "Разработка")
+
+        resp = client.patch(url, {"active_stage": "Тестирование", "version": 99}, format="json")
+        self.assertEqual(resp.status_code, 409)
+        # без version — сравнение с только что прочитанной версией
+        resp = client.patch(url, {"active_stage": "Тестирование"}, format="json")
+        self.assertEqual(resp.json()["version"], 3)
+
+
+class IdempotencyTests(CrmTestCase):
+    def test_retried_task_create_is_replayed(self):
+        client = self.client_for(self.pm)
+        payload = {"project": self.project.id, "title": "Одна задача", "status": "queue"}
+
+        first = client.post("/api/kanban/task/", payload, format="json", HTTP_IDEMPOTENCY_KEY="k-1")
+        retry = client.post("/api/kanban/task/", payload, format="json", HTTP_IDEMPOTENCY_KEY="k-1")
+        self.assertEqual(first.status_code, 201, first.content)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(KanbanTask.objects.filter(project=self.project).count(), 1)
+        self.assertEqual(KanbanTaskHistory.objects.filter(project=self.project).count(), 1)
+
+        # тот же ключ с другим телом — ошибка клиента; ключи разных пользователей не пересекаются
+        other = client.post("/api/kanban/task/", {**payload, "title": "Другая"}, format="json", HTTP_IDEMPOTENCY_KEY="k-1")
+        self.assertEqual(other.status_code, 422)
+        admin = self.client_for(self.admin).post("/api/kanban/task/", payload, format="json", HTTP_IDEMPOTENCY_KEY="k-1")
+        self.assertEqual(admin.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", admin)
+
+        # без заголовка — как раньше
+        client.post("/api/kanban/task/", payload, format="json")
+        self.assertEqual(KanbanTask.objects.filter(project=self.project).count(), 3)
+
+    def test_retried_upload_creates_files_once(self):
+        client = self.client_for(self.pm)
+        url = f"/api/projects/{self.project.files_token}/files/upload/"
+        with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media):
+            for _ in range(2):
+                upload = SimpleUploadedFile("spec.txt", b"content", content_type="text/plain")
+                resp = client.post(url, {"files": [upload]}, format="multipart", HTTP_IDEMPOTENCY_KEY="upload-1")
+                self.assertEqual(resp.status_code, 200, resp.content)
+            self.assertEqual(ProjectFile.objects.filter(project=self.project).count(), 1)
+
+    def test_slow_request_keeps_key_until_lock_timeout(self):
+        client = self.client_for(self.pm)
+        payload = {"project": self.project.id, "title": "Задача", "status": "queue"}
+        self.assertEqual(client.post("/api/kanban/task/", payload, format="json", HTTP_IDEMPOTENCY_KEY="slow").status_code, 201)
+        # первый запрос всё ещё выполняется пятую минуту
+        IdempotencyKey.objects.filter(key="slow").update(
+            status_code=None, response=None, created_at=timezone.now() - datetime.timedelta(minutes=5),
+        )
+        with self.settings(CRM_IDEMPOTENCY_LOCK_TIMEOUT=600):
+            resp = client.post("/api/kanban/task/", payload, format="json", HTTP_IDEMPOTENCY_KEY="slow")
+            self.assertEqual(resp.status_code, 409)
+        with self.settings(CRM_IDEMPOTENCY_LOCK_TIMEOUT=60):
+            resp = client.post("/api/kanban/task/", payload, format="json", HTTP_IDEMPOTENCY_KEY="slow")
+            self.assertEqual(resp.status_code, 201)
+
+    def test_failed_upload_removes_stored_files(self):
+        client = self.client_for(self.pm)
+        url = f"/api/projects/{self.project.files_token}/files/upload/"
+        create = ProjectFile.objects.create
+        calls = []
+
+        def flaky_create(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 2:
+                raise RuntimeError("storage is gone")
+            return create(**kwargs)
+
+        with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media):
+            uploads = [SimpleUploadedFile(f"f{n}.txt", b"content", content_type="text/plain") for n in range(2)]
+            with mock.patch.object(ProjectFile.objects, "create", side_effect=flaky_create):
+                with self.assertRaises(RuntimeError):
+                    client.post(url, {"files": uploads}, format="multipart", HTTP_IDEMPOTENCY_KEY="upload-2")
+            self.assertEqual([p for p in Path(media).rglob("*") if p.is_file()], [])
+        self.assertFalse(ProjectFile.objects.filter(project=self.project).exists())
+        self.assertFalse(IdempotencyKey.objects.filter(key="upload-2").exists())
+
+    def test_purge_drops_expired_and_overflow_keys(self):
+        old = timezone.now() - datetime.timedelta(days=2)
+        for i in range(5):
+            IdempotencyKey.objects.create(
+                user=self.pm, endpoint="kanban_reorder", key=f"k{i}", fingerprint="x", status_code=200,
+                created_at=old if i == 0 else timezone.now() - datetime.timedelta(seconds=i),
+            )
+        self.assertEqual(purge_expired(max_keys=2), 3)
+        self.assertEqual(sorted(IdempotencyKey.objects.values_list("key", flat=True)), ["k1", "k2"])
+
+
+class ExportTests(CrmTestCase):
+    def _csv(self, user, path):
+        resp = self.client_for(user).get(path)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        text = b"".join(resp.streaming_content).decode("utf-8-sig")
+        return list(csv.reader(io.StringIO(text)))
+
+    def test_project_columns_follow_role(self):
+        rows = self._csv(self.pm, "/api/export/projects.csv")
+        header = rows[0]
+        self.assertIn("total_cost", header)
+        self.assertEqual([r[header.index("name")] for r in rows[1:]], ["Платформа логистики"])
+        self.assertEqual(rows[1][header.index("total_cost")], "150000.00")
+
+        rows = self._csv(self.dev_user, "/api/export/projects.csv")
+        self.assertNotIn("total_cost", rows[0])
+        self.assertNotIn("customer_name", rows[0])
+        self.assertEqual(len(rows), 2)
+
+    def test_developer_columns_follow_role(self):
+        admin_header = self._csv(self.admin, "/api/export/developers.csv")[0]
+        self.assertIn("salary", admin_header)
+        self.assertIn("contacts", admin_header)
+        self.assertNotIn("passport_data", admin_header)
+
+        pm_rows = self._csv(self.pm, "/api/export/developers.csv")
+        self.assertIn("salary", pm_rows[0])
+        self.assertNotIn("contacts", pm_rows[0])
+        self.assertEqual(len(pm_rows), 3)
+
+        dev_rows = self._csv(self.dev_user, "/api/export/developers.csv")
+        self.assertNotIn("salary", dev_rows[0])
+        self.assertEqual([r[0] for r in dev_rows[1:]], [str(self.dev.id)])
+
+    def test_tasks_csv_escapes_formulas(self):
+        KanbanTask.objects.create(project=self.project, column=self.queue, title="=HYPERLINK(1)", order=0)
+        KanbanTask.objects.create(
+            project=self.other_project, column=KanbanColumn.objects.filter(project=self.other_project).first(),
+            title="Чужая", order=0,
+        )
+        rows = self._csv(self.pm, "/api/export/tasks.csv")
+        header = rows[0]
+        self.assertEqual([r[header.index("title")] for r in rows[1:]], ["'=HYPERLINK(1)"])
+        self.assertEqual(rows[1][header.index("status")], "queue")
+
+    def test_xlsx_is_streamed_zip(self):
+        resp = self.client_for(self.admin).get("/api/export/projects.xlsx", {"format": "ignored"})
+        self.assertEqual(resp.status_code, 404)  # ?format= перехватывает DRF
+
+        resp = self.client_for(self.admin).get("/api/export/projects.xlsx")
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("attachment;", resp["Content-Disposition"])
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(resp.streaming_content)))
+        self.assertIn("xl/workbook.xml", archive.namelist())
+        ns = {"s": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+        sheet = ElementTree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+        rows = [[
+            cell.findtext("s:v", namespaces=ns) or cell.findtext("s:is/s:t", namespaces=ns)
+            for cell in row
+        ] for row in sheet.iterfind("s:sheetData/s:row", ns)]
+        self.assertEqual(rows[0][:2], ["id", "name"])
+        self.assertEqual(sorted(r[1] for r in rows[1:]), ["Мобильный банк", "Платформа логистики"])
+
+        self.assertEqual(self.client_for(self.admin).get("/api/export/users.csv").status_code, 404)
+
+
+class ImportTests(CrmTestCase):
+    def _upload(self, kind, text, user=None, **data):
+        upload = SimpleUploadedFile(f"{kind}.csv", text.encode("utf-8-sig"), content_type="text/csv")
+        return self.client_for(user or self.admin).post(
+            f"/api/import/{kind}/", {"file": upload, **data}, format="multipart",
+        )
+
+    def test_users_get_superuser_flag_and_developer_profiles(self):
+        resp = self._upload("users", (
+            "username,full_name,role,password\n"
+            "boss,Главный Админ,ADMIN,secret-pass-1\n"
+            "coder,Новый Разработчик,,\n"
+            "lead,Ведущий PM,PM,\n"
+        ))
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual(resp.json()["created"], 3)
+
+        boss = User.objects.get(username="boss")
+        self.assertTrue(boss.is_superuser)
+        self.assertTrue(boss.check_password("secret-pass-1"))
+        self.assertFalse(User.objects.get(username="lead").is_superuser)
+        coder = User.objects.get(username="coder")
+        self.assertFalse(coder.has_usable_password())
+        self.assertEqual(coder.developer_profile.full_name, "Новый Разработчик")
+        self.assertTrue(SearchDocument.objects.filter(
+            kind=SearchDocument.Kind.DEVELOPER, object_id=coder.developer_profile.id,
+        ).exists())
+
+    def test_developers_and_projects_in_batches(self):
+        rows = "\n".join(
+            f"imp_dev{n};Разработчик {n};Backend;{1000 + n};Python, Django" for n in range(12)
+        )
+        resp = self._upload("developers", "username;full_name;position;salary;competencies\n" + rows)
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertEqual(Developer.objects.filter(user__username__startswith="imp_dev").count(), 12)
+        dev = Developer.objects.get(user__username="imp_dev3")
+        self.assertEqual(dev.salary, Decimal("1003.00"))
+        self.assertEqual(
+            sorted(dev.competency_links.values_list("competency__name", flat=True)), ["django", "python"],
+        )
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self._upload("projects", (
+                "name,customer_name,total_cost,deadline,responsible,developers\n"
+                + "\n".join(f'Импорт {n},ООО Тест,{n}000.50,01.12.2026,pm,"imp_dev{n}|imp_dev{n + 1}"' for n in range(10))
+            ))
+        self.assertEqual(resp.status_code, 201, resp.content)
+        project = Project.objects.get(name="Импорт 2")
+        self.assertEqual(project.responsible, self.pm)
+        self.assertEqual(project.deadline, datetime.date(2026, 12, 1))
+        self.assertEqual(
+            sorted(project.developers.values_list("user__username", flat=True)), ["imp_dev2", "imp_dev3"],
+        )
+        # запросы на пачку, а не на строку
+        self.assertLess(len(ctx), 40)
+
+    def test_errors_roll_back_unless_partial(self):
+        text = (
+            "name,responsible,developers,completion_percent\n"
+            "Хороший,pm,dev,10\n"
+            "Чужой ответственный,dev,,\n"
+            "Нет разработчика,,ghost,\n"
+            "Процент,,,150\n"
+        )
+        resp = self._upload("projects", text)
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual([e["line"] for e in resp.json()["errors"]], [3, 4, 5])
+        self.assertFalse(Project.objects.filter(name="Хороший").exists())
+
+        resp = self._upload("projects", text, atomic="false")
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.json()["created"], 1)
+        self.assertEqual(list(Project.objects.get(name="Хороший").developers.all()), [self.dev])
+
+        resp = self._upload("users", "username\npm\nfresh\nfresh\n")
+        self.assertEqual([e["line"] for e in resp.json()["errors"]], [2, 4])
+        self.assertEqual(self._upload("users", "username\nx\n", user=self.pm).status_code, 403)
+        self.assertEqual(self._upload("users", "email\nx@y.z\n").status_code, 400)
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", encoding="utf-8", delete=False) as f:
+            f.write("username,full_name\ncmd_dev,Из командной строки\n")
+        out = io.StringIO()
+        call_command("import_csv", "developers", f.name, "--dry-run", stdout=out)
+        self.assertIn("Dry run OK", out.getvalue())
+        self.assertFalse(User.objects.filter(username="cmd_dev").exists())
+
+        call_command("import_csv", "developers", f.name, stdout=out)
+        self.assertEqual(User.objects.get(username="cmd_dev").developer_profile.full_name, "Из командной строки")
+        Path(f.name).unlink()
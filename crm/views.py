@@ -5,22 +5,45 @@ from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django.shortcuts import get_object_or_404, render
-from django.http import Http404, HttpResponseForbidden
+from django.http import Http404, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
 from django.db import transaction
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.conf import settings
 
 
+import csv
+import datetime
+import functools
+import io
 import logging
 
-from .models import Project, Developer, KanbanColumn, KanbanTask, KanbanTaskHistory, ProjectFile, ProjectFolder
+from .models import (
+    Project, Developer, KanbanColumn, KanbanTask, KanbanTaskHistory, ProjectFile, ProjectFolder,
+    SearchDocument,
+)
 from .serializers import (
     ProjectAdminSerializer, ProjectPMSerializer, ProjectDeveloperSerializer, ProjectListSerializer,
     DeveloperAdminSerializer, DeveloperPMSerializer, DeveloperDeveloperSerializer, DeveloperListSerializer,
     KanbanTaskSerializer, KanbanColumnSerializer, KanbanTaskHistorySerializer, ProjectFileSerializer, ProjectFolderTreeSerializer
 )
+from .search import search_documents
+from .staffing import rank_developers
+from .analytics import get_analytics, DEFAULT_WEEKS
+from .flow_metrics import cumulative_flow, cycle_time_stats
+from .metrics import registry, update_table_sizes
+from .access import get_access
+from .concurrency import InvalidVersion, claim_version, parse_version
+from .kanban_bulk import MAX_BULK_TASKS, bulk_write_tasks, is_conflict
+from .idempotency import idempotent, on_rollback
+from .exports import CONTENT_TYPES, EXPORTS, FORMATS, export_columns, stream_export
+from .imports import IMPORTERS, ImportFormatError, import_csv
+from .pagination import DeveloperPagination, ProjectPagination
 from .permissions import (
     IsAdminRole, IsProjectManagerRole, IsDeveloperRole,
     IsProjectResponsibleOrAdmin, IsDeveloperOwnerOrAdmin
 )
+from .workload import invalidate_workloads
 
 logger = logging.getLogger(__name__)
 
@@ -47,26 +70,42 @@ def log_task_history(*, project, task, user, action, from_column=None, to_column
     )
 
 
+def version_conflict(current):
+    """
+    409: объект уже изменил кто-то другой; current — его состояние сейчас.
+    """
+    return Response(
+        {"detail": "Объект изменён другим пользователем", "current": current},
+        status=status.HTTP_409_CONFLICT,
+    )
+
+
+def invalid_version():
+    return Response({"version": "Некорректная версия."}, status=status.HTTP_400_BAD_REQUEST)
+
+
 def ensure_kanban_columns(project):
     """
     Гарантирует, что у проекта есть все стандартные колонки канбана.
-    Безопасно вызывать много раз.
+    Безопасно вызывать много раз. Новым проектам колонки создаёт сигнал (crm.signals),
+    поэтому обычно это один SELECT без транзакции: при DB_SQLITE_MODE=wal atomic() начинается
+    с BEGIN IMMEDIATE и берёт блокировку записи — опрос доски не должен вставать в очередь к писателям.
     """
     existing_codes = set(
         KanbanColumn.objects.filter(project=project)
         .values_list("code", flat=True)
     )
+    missing = [
+        KanbanColumn(project=project, code=code, title=title, order=order)
+        for order, (code, title) in enumerate(DEFAULT_KANBAN_COLUMNS)
+        if code not in existing_codes
+    ]
+    if not missing:
+        return
 
     with transaction.atomic():
-        for order, (code, title) in enumerate(DEFAULT_KANBAN_COLUMNS):
-            if code not in existing_codes:
-                KanbanColumn.objects.create(
-                    project=project,
-                    code=code,
-                    title=title,
-                    order=order,
-                )
-
+        # параллельный запрос мог успеть создать те же колонки
+        KanbanColumn.objects.bulk_create(missing, ignore_conflicts=True)
 
 
 class ProjectViewSet(viewsets.ModelViewSet):
@@ -76,8 +115,11 @@ class ProjectViewSet(viewsets.ModelViewSet):
     - Admin: Full access to all projects
     - PM: Access to their own projects
     - Developer: Read-only access to assigned projects
+
+    ?cursor= switches the list to keyset pagination (see crm.pagination)
     """
     permission_classes = [IsAuthenticated]
+    pagination_class = ProjectPagination
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['completion_percent', 'responsible', 'deadline']
     search_fields = ['name', 'customer_name', 'active_stage']
@@ -85,32 +127,17 @@ class ProjectViewSet(viewsets.ModelViewSet):
     ordering = ['-created_at']
 
     def get_queryset(self):
-        """Filter queryset based on user role"""
+        """Filter queryset based on user role (see ProjectQuerySet.visible_to)"""
         try:
-            user = self.request.user
-
-            # Admin sees all projects
-            if user.is_superuser or user.is_admin_role():
-                return Project.objects.select_related('responsible').prefetch_related('developers').all()
-
-            # PM sees only their projects
-            if user.is_pm():
-                return Project.objects.filter(
-                    responsible=user
-                ).select_related('responsible').prefetch_related('developers')
-
-            # Developer sees only assigned projects
-            if user.is_dev():
-                try:
-                    developer = user.developer_profile
-                    return Project.objects.filter(
-                        developers=developer
-                    ).select_related('responsible').prefetch_related('developers')
-                except Exception as e:
-                    logger.error(f"Error getting developer profile: {str(e)}")
-                    return Project.objects.none()
+            # на чтение prefetch только для связей, которые сериализатор выведет (?fields=/?expand=);
+            # update сбрасывает кэш prefetch перед ответом, а developers/ отдаёт свой сериализатор
+            lookups = ['developers']
+            if self.action in ('list', 'retrieve'):
+                lookups = self.get_serializer().get_prefetch_lookups()
 
-            return Project.objects.none()
+            return Project.objects.visible_to(
+                self.request.user
+            ).select_related('responsible').prefetch_related(*lookups)
 
         except Exception as e:
             logger.error(f"Error in ProjectViewSet.get_queryset: {str(e)}")
@@ -166,9 +193,29 @@ class ProjectViewSet(viewsets.ModelViewSet):
             )
 
     def update(self, request, *args, **kwargs):
-        """Update project with error handling"""
+        """
+        Update project with error handling.
+        Optimistic locking: version from the body (or the one just read) must still be current, else 409.
+        """
         try:
-            return super().update(request, *args, **kwargs)
+            partial = kwargs.pop('partial', False)
+            instance = self.get_object()
+            try:
+                expected = parse_version(request.data.get('version'), instance.version)
+            except InvalidVersion:
+                return invalid_version()
+
+            serializer = self.get_serializer(instance, data=request.data, partial=partial)
+            serializer.is_valid(raise_exception=True)
+            with transaction.atomic():
+                if not claim_version(instance, expected):
+                    current = self.get_queryset().get(pk=instance.pk)
+                    return version_conflict(self.get_serializer(current).data)
+                self.perform_update(serializer)
+
+            if getattr(instance, '_prefetched_objects_cache', None):
+                instance._prefetched_objects_cache = {}
+            return Response(serializer.data)
         except Exception as e:
             logger.error(f"Error updating project: {str(e)}")
             return Response(
@@ -210,8 +257,11 @@ class DeveloperViewSet(viewsets.ModelViewSet):
     - Admin: Full access to all developers
     - PM: View access to all developers (excluding sensitive data)
     - Developer: Access only to their own profile
+
+    ?cursor= switches the list to keyset pagination (see crm.pagination)
     """
     permission_classes = [IsAuthenticated]
+    pagination_class = DeveloperPagination
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['cooperation_format', 'position']
     search_fields = ['full_name', 'position', 'competencies']
@@ -223,13 +273,18 @@ class DeveloperViewSet(viewsets.ModelViewSet):
         try:
             user = self.request.user
 
+            # на чтение prefetch только для полей, которые сериализатор выведет (?fields=/?expand=)
+            lookups = ['projects']
+            if self.action in ('list', 'retrieve'):
+                lookups = self.get_serializer().get_prefetch_lookups()
+
             # Admin sees all developers
             if user.is_superuser or user.is_admin_role():
-                return Developer.objects.select_related('user').prefetch_related('projects').all()
+                return Developer.objects.select_related('user').prefetch_related(*lookups).all()
 
             # PM sees all developers
             if user.is_pm():
-                return Developer.objects.select_related('user').prefetch_related('projects').all()
+                return Developer.objects.select_related('user').prefetch_related(*lookups).all()
 
             # Developer sees only their own profile
             if user.is_dev():
@@ -349,11 +404,7 @@ def project_kanban(request, project_id: int, token):
         if project.responsible_id != user.id:
             raise Http404()
     elif user.is_dev():
-        try:
-            developer = user.developer_profile
-            if not project.developers.filter(id=developer.id).exists():
-                raise Http404()
-        except Exception:
+        if not get_access(request).can_view_project(project):
             raise Http404()
     else:
         raise Http404()
@@ -384,7 +435,7 @@ def project_files(request, project_uuid):
     project = get_object_or_404(Project, files_token=project_uuid)
 
 
-    if user.is_pm() and project.responsible != user:
+    if user.is_pm() and project.responsible_id != user.id:
         raise Http404()
 
     return render(
@@ -399,6 +450,7 @@ def project_files(request, project_uuid):
 
 
 @api_view(["POST"])
+@idempotent
 def upload_project_files(request, project_uuid):
     project = get_object_or_404(Project, files_token=project_uuid)
     user = request.user
@@ -435,6 +487,8 @@ def upload_project_files(request, project_uuid):
             file=f,
             uploaded_by=user
         )
+        # файл уже в storage: при откате запроса с Idempotency-Key удаляем и его
+        on_rollback(functools.partial(pf.file.storage.delete, pf.file.name))
         created.append({
             "uuid": str(pf.uuid),
             "name": pf.filename()
@@ -501,7 +555,7 @@ def project_files_tree(request, project_uuid):
     project = get_object_or_404(Project, files_token=project_uuid)
 
     # Проверка доступа
-    if user.is_pm() and project.responsible != user:
+    if user.is_pm() and project.responsible_id != user.id:
         return Response({"detail": "Forbidden"}, status=403)
 
     # 🔹 ФАЙЛЫ В КОРНЕ
@@ -536,7 +590,7 @@ def delete_project_file(request, project_uuid, file_uuid):
 
     project = get_object_or_404(Project, files_token=project_uuid)
 
-    if user.is_pm() and project.responsible != user:
+    if user.is_pm() and project.responsible_id != user.id:
         return Response(status=403)
 
     file = get_object_or_404(
@@ -562,7 +616,7 @@ def delete_project_folder(request, project_uuid, folder_uuid):
 
     project = get_object_or_404(Project, files_token=project_uuid)
 
-    if user.is_pm() and project.responsible != user:
+    if user.is_pm() and project.responsible_id != user.id:
         return Response(status=403)
 
     folder = get_object_or_404(
@@ -591,7 +645,7 @@ def move_project_file(request, project_uuid, file_uuid):
 
     project = get_object_or_404(Project, files_token=project_uuid)
 
-    if user.is_pm() and project.responsible != user:
+    if user.is_pm() and project.responsible_id != user.id:
         return Response(status=403)
 
     file = get_object_or_404(ProjectFile, uuid=file_uuid, project=project)
@@ -622,15 +676,7 @@ def kanban_state(request, project_id):
     if not user.is_authenticated:
         return Response(status=403)
 
-    if not (
-        user.is_superuser
-        or user.is_admin_role()
-        or (user.is_pm() and project.responsible_id == user.id)
-        or (
-            user.is_dev()
-            and project.developers.filter(id=user.developer_profile.id).exists()
-        )
-    ):
+    if not get_access(request).can_view_project(project):
         return Response(status=403)
 
     ensure_kanban_columns(project)
@@ -644,6 +690,7 @@ def kanban_state(request, project_id):
     })
 
 @api_view(["POST"])
+@idempotent
 def kanban_task_create(request):
     project_id = request.data.get("project")
     title = request.data.get("title")
@@ -665,15 +712,7 @@ def kanban_task_create(request):
     if not user.is_authenticated:
         return Response(status=status.HTTP_403_FORBIDDEN)
 
-    if not (
-        user.is_superuser
-        or user.is_admin_role()
-        or (user.is_pm() and project.responsible_id == user.id)
-        or (
-            user.is_dev()
-            and project.developers.filter(id=user.developer_profile.id).exists()
-        )
-    ):
+    if not get_access(request).can_view_project(project):
         return Response(status=status.HTTP_403_FORBIDDEN)
 
 
@@ -727,7 +766,55 @@ def kanban_task_create(request):
 
 
 @api_view(["POST"])
+def kanban_task_bulk(request):
+    """
+    Массовое создание/изменение задач: {"project": id, "atomic": true, "tasks": [{...}, ...]}.
+    Элемент без id создаёт задачу (как kanban_task_create), с id — меняет (как kanban_task_update);
+    необязательный version у изменения — как в kanban_task_update. Если при atomic все ошибки —
+    конфликты версий, ответ 409.
+    """
+    project_id = request.data.get("project")
+    items = request.data.get("tasks")
+    atomic = request.data.get("atomic", True) not in (False, "false", "0", 0)
+
+    if not project_id or not isinstance(items, list) or not items:
+        return Response(
+            {"detail": "project и непустой список tasks обязательны"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if len(items) > MAX_BULK_TASKS:
+        return Response(
+            {"detail": f"Не больше {MAX_BULK_TASKS} задач за запрос"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    project = get_object_or_404(Project.objects.select_related("responsible"), id=project_id)
+
+    user = request.user
+    if not user.is_authenticated:
+        return Response(status=status.HTTP_403_FORBIDDEN)
+
+    if not get_access(request).can_view_project(project):
+        return Response(status=status.HTTP_403_FORBIDDEN)
+
+    ensure_kanban_columns(project)
+
+    payload, has_errors = bulk_write_tasks(project, user, items, atomic=atomic)
+    if has_errors and atomic:
+        if all(is_conflict(error) for error in payload["errors"]):
+            return Response(payload, status=status.HTTP_409_CONFLICT)
+        return Response(payload, status=status.HTTP_400_BAD_REQUEST)
+    return Response(payload, status=status.HTTP_201_CREATED if payload["created"] else status.HTTP_200_OK)
+
+
+@api_view(["POST"])
+@idempotent
 def kanban_reorder(request):
+    """
+    {"project": id, "updates": [{"id", "status", "order", "version"?}, ...]}.
+    Пишутся только задачи, у которых сменились колонка или порядок, — условным UPDATE по version.
+    Если хоть одну задачу уже изменили, ничего не сохраняется: 409 с текущей доской.
+    """
     project_id = request.data.get("project")
     updates = request.data.get("updates", [])
 
@@ -740,74 +827,106 @@ def kanban_reorder(request):
     if not user.is_authenticated:
         return Response(status=status.HTTP_403_FORBIDDEN)
 
-    if not (
-        user.is_superuser
-        or user.is_admin_role()
-        or (user.is_pm() and project.responsible_id == user.id)
-        or (
-            user.is_dev()
-            and project.developers.filter(
-                id=user.developer_profile.id
-            ).exists()
-        )
-    ):
+    if not get_access(request).can_view_project(project):
         return Response(status=status.HTTP_403_FORBIDDEN)
 
-    for item in updates:
-        task_id = item.get("id")
-        status_code = item.get("status")
-        order = item.get("order", 0)
+    if not isinstance(updates, list):
+        return Response({"updates": "Ожидается список."}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not task_id or not status_code:
+    parsed = []
+    for item in updates:
+        if not isinstance(item, dict) or not item.get("id") or not item.get("status"):
             continue
-
         try:
-            task = KanbanTask.objects.get(id=task_id, project=project)
-            column = KanbanColumn.objects.get(project=project, code=status_code)
-        except (KanbanTask.DoesNotExist, KanbanColumn.DoesNotExist):
+            task_id = int(item["id"])
+            order = int(item.get("order", 0))
+        except (TypeError, ValueError):
+            return Response({"updates": "id и order должны быть числами."}, status=status.HTTP_400_BAD_REQUEST)
+        if order < 0:
+            return Response({"updates": "order не может быть отрицательным."}, status=status.HTTP_400_BAD_REQUEST)
+        parsed.append((task_id, item["status"], order, item.get("version")))
+
+    columns = {column.code: column for column in KanbanColumn.objects.filter(project=project)}
+    tasks = KanbanTask.objects.filter(project=project).select_related("column").in_bulk(
+        [task_id for task_id, *_ in parsed]
+    )
+
+    plan = []
+    for task_id, status_code, order, version in parsed:
+        task = tasks.get(task_id)
+        column = columns.get(status_code)
+        if task is None or column is None:
             continue
+        try:
+            expected = parse_version(version, task.version)
+        except InvalidVersion:
+            return invalid_version()
+        plan.append((task, column, order, expected))
 
-        # сохраняем старое состояние
-        old_status = task.column.code if task.column_id else None
-        old_order = task.order
-
-        # сохраняем новое состояние
-        task.column = column
-        task.order = order
-        task.save(update_fields=["column", "order"])
-
-        new_status = column.code
-        new_order = order
-
-        # лог перемещения между колонками
-        if old_status != new_status:
-            log_task_history(
-                project=project,
-                task=task,
-                user=user,
-                action=KanbanTaskHistory.ACTION_MOVE,
-                from_column=old_status,
-                to_column=new_status,
-                new_data={"title": task.title},
-            )
+    conflicts = []
+    moved = False
+    with transaction.atomic():
+        for task, column, order, expected in plan:
+            # сохраняем старое состояние
+            old_status = task.column.code if task.column_id else None
+            old_order = task.order
+            new_status = column.code
+
+            if old_status == new_status and old_order == order:
+                continue
+
+            # сохраняем новое состояние: один UPDATE ... WHERE version = expected (без post_save)
+            if not claim_version(task, expected, column=column, order=order):
+                conflicts.append(task.id)
+                continue
+
+            # лог перемещения между колонками
+            if old_status != new_status:
+                moved = True
+                log_task_history(
+                    project=project,
+                    task=task,
+                    user=user,
+                    action=KanbanTaskHistory.ACTION_MOVE,
+                    from_column=old_status,
+                    to_column=new_status,
+                    new_data={"title": task.title},
+                )
 
-        # лог изменения порядка
-        elif old_order != new_order:
-            log_task_history(
-                project=project,
-                task=task,
-                user=user,
-                action=KanbanTaskHistory.ACTION_REORDER,
-                from_column=new_status,
-                to_column=new_status,
-                old_data={"order": old_order},
-                new_data={"order": new_order},
-            )
+            # лог изменения порядка
+            else:
+                log_task_history(
+                    project=project,
+                    task=task,
+                    user=user,
+                    action=KanbanTaskHistory.ACTION_REORDER,
+                    from_column=new_status,
+                    to_column=new_status,
+                    old_data={"order": old_order},
+                    new_data={"order": order},
+                )
 
-    return Response({"detail": "ok"})
+        if conflicts:
+            transaction.set_rollback(True)
 
+    if conflicts:
+        return Response(
+            {
+                "detail": "Задачи изменены другим пользователем",
+                "conflicts": conflicts,
+                "current": {
+                    "columns": KanbanColumnSerializer(columns.values(), many=True).data,
+                    "tasks": KanbanTaskSerializer(KanbanTask.objects.filter(project=project), many=True).data,
+                },
+            },
+            status=status.HTTP_409_CONFLICT,
+        )
 
+    # update() не шлёт post_save — кэш загрузки сбрасываем сами (см. crm.signals)
+    if moved:
+        invalidate_workloads()
 
+    return Response({"detail": "ok", "versions": {task.id: task.version for task, *_ in plan}})
 
 
 @api_view(["PATCH"])
@@ -821,17 +940,14 @@ def kanban_task_update(request, task_id):
     if not user.is_authenticated:
         return Response(status=403)
 
-    if not (
-        user.is_superuser
-        or user.is_admin_role()
-        or (user.is_pm() and project.responsible_id == user.id)
-        or (
-            user.is_dev()
-            and project.developers.filter(id=user.developer_profile.id).exists()
-        )
-    ):
+    if not get_access(request).can_view_project(project):
         return Response(status=403)
 
+    try:
+        expected = parse_version(request.data.get("version"), task.version)
+    except InvalidVersion:
+        return invalid_version()
+
     # сохраняем старое состояние
     old_data = {
         "title": task.title,
@@ -842,7 +958,11 @@ def kanban_task_update(request, task_id):
 
     serializer = KanbanTaskSerializer(task, data=request.data, partial=True)
     serializer.is_valid(raise_exception=True)
-    serializer.save()
+    with transaction.atomic():
+        # UPDATE ... WHERE version = expected: чужая правка после чтения — 409, а не перезапись
+        if not claim_version(task, expected):
+            return version_conflict(KanbanTaskSerializer(get_object_or_404(KanbanTask, id=task.id)).data)
+        serializer.save()
 
     # собираем новое состояние
     new_data = {
@@ -893,11 +1013,7 @@ def kanban_task_delete(request, task_id):
     if not user.is_authenticated:
         return Response(status=status.HTTP_403_FORBIDDEN)
 
-    if not (
-        user.is_superuser
-        or user.is_admin_role()
-        or (user.is_pm() and project.responsible_id == user.id)
-    ):
+    if not get_access(request).can_manage_project(project):
         return Response(status=status.HTTP_403_FORBIDDEN)
 
     log_task_history(
@@ -923,12 +1039,7 @@ def kanban_task_history(request, task_id: int):
         return Response(status=status.HTTP_403_FORBIDDEN)
 
     # те же правила доступа, что в kanban_state
-    if not (
-        user.is_superuser
-        or user.is_admin_role()
-        or (user.is_pm() and project.responsible_id == user.id)
-        or (user.is_dev() and project.developers.filter(id=user.developer_profile.id).exists())
-    ):
+    if not get_access(request).can_view_project(project):
         return Response(status=status.HTTP_403_FORBIDDEN)
 
     qs = KanbanTaskHistory.objects.filter(task=task).order_by("-created_at")[:200]
@@ -943,18 +1054,46 @@ def kanban_project_activity(request, project_id: int):
     if not user.is_authenticated:
         return Response(status=status.HTTP_403_FORBIDDEN)
 
-    if not (
-        user.is_superuser
-        or user.is_admin_role()
-        or (user.is_pm() and project.responsible_id == user.id)
-        or (user.is_dev() and project.developers.filter(id=user.developer_profile.id).exists())
-    ):
+    if not get_access(request).can_view_project(project):
         return Response(status=status.HTTP_403_FORBIDDEN)
 
     qs = KanbanTaskHistory.objects.filter(project=project).order_by("-created_at")[:300]
     return Response(KanbanTaskHistorySerializer(qs, many=True).data)
 
 
+@api_view(["GET"])
+def kanban_project_flow(request, project_id: int):
+    """
+    Cumulative flow и lead/cycle time по доске.
+
+    GET /api/kanban/project/<id>/flow/?days=30
+    Только чтение предрасчитанных таблиц (KanbanFlowSnapshot, KanbanTaskFlow);
+    новые записи истории сворачивает команда fold_kanban_metrics (cron).
+    """
+    project = get_object_or_404(Project, id=project_id)
+
+    user = request.user
+    if not user.is_authenticated:
+        return Response(status=status.HTTP_403_FORBIDDEN)
+
+    if not get_access(request).can_view_project(project):
+        return Response(status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        days = max(1, min(int(request.query_params.get("days", 30)), 365))
+    except ValueError:
+        return Response({"detail": "days должен быть числом"}, status=status.HTTP_400_BAD_REQUEST)
+
+    end = timezone.localdate()
+    start = end - datetime.timedelta(days=days - 1)
+    return Response({
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "cumulative_flow": cumulative_flow(project, start, end),
+        "cycle_time": cycle_time_stats(project, start, end),
+    })
+
+
 @api_view(["GET"])
 def kanban_assignees(request, project_id: int):
     project = get_object_or_404(Project, id=project_id)
@@ -964,12 +1103,7 @@ def kanban_assignees(request, project_id: int):
         return Response(status=status.HTTP_403_FORBIDDEN)
 
     # те же правила доступа, что и в kanban_state
-    if not (
-        user.is_superuser
-        or user.is_admin_role()
-        or (user.is_pm() and project.responsible_id == user.id)
-        or (user.is_dev() and project.developers.filter(id=user.developer_profile.id).exists())
-    ):
+    if not get_access(request).can_view_project(project):
         return Response(status=status.HTTP_403_FORBIDDEN)
 
     items = []
@@ -991,3 +1125,151 @@ def kanban_assignees(request, project_id: int):
         items.append({"value": f"dev:{dev.id}", "label": f"Разработчик: {dev.full_name}"})
 
     return Response(items)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def export_data(request, kind, fmt):
+    """
+    Потоковая выгрузка: /api/export/<projects|developers|tasks>.<csv|xlsx>[?project=<id> для задач].
+    Формат задаётся расширением в пути, а не ?format= — тот DRF использует для выбора рендерера.
+    """
+    if kind not in EXPORTS or fmt not in FORMATS:
+        raise Http404
+
+    if not export_columns(kind, request.user):
+        return Response(status=status.HTTP_403_FORBIDDEN)
+
+    project_id = request.query_params.get("project")
+    if project_id is not None and not project_id.isdigit():
+        return Response({"detail": "project должен быть числом"}, status=status.HTTP_400_BAD_REQUEST)
+
+    response = StreamingHttpResponse(
+        stream_export(kind, fmt, request.user, int(project_id) if project_id else None),
+        content_type=CONTENT_TYPES[fmt],
+    )
+    filename = f"{kind}-{timezone.localdate():%Y-%m-%d}.{fmt}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated, IsAdminRole])
+def import_data(request, kind):
+    """
+    Импорт CSV (multipart, поле file): /api/import/<users|developers|projects>/.
+    Параметры формы: atomic (по умолчанию true), dry_run.
+    """
+    if kind not in IMPORTERS:
+        raise Http404
+
+    upload = request.FILES.get("file")
+    if upload is None:
+        return Response({"detail": "No file"}, status=status.HTTP_400_BAD_REQUEST)
+
+    atomic = request.data.get("atomic", "true") not in ("false", "0")
+    dry_run = request.data.get("dry_run", "false") in ("true", "1")
+    stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    try:
+        report = import_csv(kind, stream, atomic=atomic, dry_run=dry_run)
+    except (ImportFormatError, UnicodeDecodeError, csv.Error) as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.error(f"Error in import_data: {str(e)}")
+        return Response({"detail": "Import failed"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    if report["error_count"] and atomic:
+        return Response(report, status=status.HTTP_400_BAD_REQUEST)
+    if report["committed"] and report["created"]:
+        return Response(report, status=status.HTTP_201_CREATED)
+    return Response(report)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def global_search(request):
+    """
+    Полнотекстовый поиск по проектам, разработчикам и задачам канбана.
+
+    GET /api/search/?q=<текст>&kind=project,developer,task&limit=20
+    Результаты отфильтрованы по роли пользователя и отсортированы по релевантности.
+    """
+    query = request.query_params.get("q", "").strip()
+    if not query:
+        return Response({"detail": "q обязателен"}, status=status.HTTP_400_BAD_REQUEST)
+
+    kinds = [k for k in request.query_params.get("kind", "").split(",") if k]
+    unknown = set(kinds) - set(SearchDocument.Kind.values)
+    if unknown:
+        return Response(
+            {"detail": f"Unknown kind: {', '.join(sorted(unknown))}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        limit = int(request.query_params.get("limit", 20))
+    except ValueError:
+        return Response({"detail": "limit должен быть числом"}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = search_documents(request.user, query, kinds=kinds, limit=limit)
+    return Response({"query": query, "results": results})
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsProjectManagerRole])
+def staffing_match(request):
+    """
+    Подбор разработчиков под набор навыков с учётом текущей загрузки.
+
+    GET /api/staffing/match/?skills=python,django&limit=20&require_all=1
+    Доступно Admin и PM.
+    """
+    skills = [s for s in request.query_params.get("skills", "").split(",") if s.strip()]
+    if not skills:
+        return Response({"detail": "skills обязателен"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = int(request.query_params.get("limit", 20))
+    except ValueError:
+        return Response({"detail": "limit должен быть числом"}, status=status.HTTP_400_BAD_REQUEST)
+
+    require_all = request.query_params.get("require_all", "").lower() in ("1", "true", "yes")
+
+    results = rank_developers(skills, limit=limit, require_all=require_all)
+    return Response({"skills": skills, "results": results})
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def portfolio_analytics(request):
+    """
+    Сводка по проектам, посчитанная в SQL (для Dashboard).
+
+    GET /api/analytics/?weeks=12
+    Учитывает только проекты, видимые пользователю; DEV не видит финансы.
+    """
+    try:
+        weeks = int(request.query_params.get("weeks", DEFAULT_WEEKS))
+    except ValueError:
+        return Response({"detail": "weeks должен быть числом"}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(get_analytics(request.user, weeks=weeks))
+
+
+def metrics(request):
+    """
+    Метрики в текстовом формате Prometheus.
+
+    GET /metrics
+    С CRM_METRICS_TOKEN требуется "Authorization: Bearer <token>",
+    иначе доступ только с адресов CRM_METRICS_ALLOWED_IPS.
+    """
+    token = settings.CRM_METRICS_TOKEN
+    if token:
+        if not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return HttpResponseForbidden("Forbidden")
+    elif request.META.get("REMOTE_ADDR") not in settings.CRM_METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden("Forbidden")
+
+    update_table_sizes()
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
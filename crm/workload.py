@@ -0,0 +1,102 @@
+"""
+Расчёт фактической загрузки разработчиков.
+
+Developer.workload — ручное текстовое поле; реальная загрузка складывается
+из назначенных задач канбана (KanbanTask.assignee_developer) и проектов.
+Все показатели считаются одним агрегирующим запросом и кэшируются;
+кэш сбрасывается сигналами при изменении задач и назначений (crm.signals).
+"""
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Developer, KanbanColumn, Project
+
+CACHE_KEY = "crm:developer-workload:{date}"
+
+# окно «ближайших» дедлайнов, дней
+UPCOMING_DAYS = 7
+
+EMPTY_WORKLOAD = {
+    "active_projects": 0,
+    "open_tasks": 0,
+    "overdue_tasks": 0,
+    "due_soon": 0,
+    "deadline_density": 0.0,
+}
+
+
+def _cache_key(today):
+    return CACHE_KEY.format(date=today.isoformat())
+
+
+def compute_workloads(today=None):
+    """
+    {developer_id: {...}} для всех разработчиков — один запрос с GROUP BY.
+    """
+    today = today or timezone.localdate()
+    horizon = today + datetime.timedelta(days=UPCOMING_DAYS)
+
+    open_q = ~Q(kanbantask__column__code=KanbanColumn.DONE)
+    projects_count = Coalesce(
+        Subquery(
+            Project.developers.through.objects.filter(developer_id=OuterRef("pk"))
+            .values("developer_id")
+            .annotate(c=Count("*"))
+            .values("c")[:1],
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+    rows = (
+        Developer.objects.order_by()
+        .annotate(
+            active_projects=projects_count,
+            open_tasks=Count("kanbantask", filter=open_q),
+            overdue_tasks=Count("kanbantask", filter=open_q & Q(kanbantask__deadline__lt=today)),
+            due_soon=Count(
+                "kanbantask",
+                filter=open_q & Q(kanbantask__deadline__gte=today, kanbantask__deadline__lt=horizon),
+            ),
+        )
+        .values_list("id", "active_projects", "open_tasks", "overdue_tasks", "due_soon")
+    )
+
+    result = {}
+    for dev_id, active_projects, open_tasks, overdue, due_soon in rows:
+        result[dev_id] = {
+            "active_projects": active_projects,
+            "open_tasks": open_tasks,
+            "overdue_tasks": overdue,
+            "due_soon": due_soon,
+            # задач с дедлайном в день в ближайшем окне
+            "deadline_density": round(due_soon / UPCOMING_DAYS, 2),
+        }
+    return result
+
+
+def get_workloads():
+    """
+    Закэшированная карта загрузки (ключ зависит от даты — «просрочено» меняется в полночь).
+    """
+    today = timezone.localdate()
+    key = _cache_key(today)
+    data = cache.get(key)
+    if data is None:
+        data = compute_workloads(today)
+        cache.set(key, data, getattr(settings, "CRM_WORKLOAD_CACHE_TTL", 300))
+    return data
+
+
+def get_workload(developer_id, workloads=None):
+    workloads = get_workloads() if workloads is None else workloads
+    return workloads.get(developer_id, EMPTY_WORKLOAD)
+
+
+def invalidate_workloads():
+    cache.delete(_cache_key(timezone.localdate()))
@@ -0,0 +1,174 @@
+"""
+Нагрузочный тест параллельных писателей канбана на SQLite.
+
+Каждый писатель — отдельный поток со своим соединением, который в течение `duration` секунд
+шлёт POST /api/kanban/reorder/ по своей доске (как PM, перетаскивающий карточки);
+параллельно читатели опрашивают GET /api/kanban/<id>/, как открытые вкладки канбана.
+Считаются успешные запросы, задержки и ошибки "database is locked".
+Один и тот же файл БД прогоняется в прежней конфигурации (legacy) и в режимах
+crm_system.db.sqlite_options, поэтому видно, сколько писателей выдерживает каждый режим.
+"""
+import random
+import statistics
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection, connections
+from rest_framework.test import APIClient
+
+from crm_system.db import sqlite_options
+
+from .models import KanbanColumn, KanbanTask, Project
+from .views import DEFAULT_KANBAN_COLUMNS, ensure_kanban_columns
+
+DEFAULT_WRITERS = (1, 2, 4, 8, 16)
+DEFAULT_MODES = ("legacy", "rollback", "wal")
+REORDER_URL = "/api/kanban/reorder/"
+STATE_URL = "/api/kanban/{project_id}/"
+
+
+def seed_boards(count, tasks_per_board, seed=42):
+    rnd = random.Random(seed)
+    User = get_user_model()
+    admin = User.objects.create_user("bench_writer", password="bench", role=User.Roles.ADMIN)
+    boards = []
+    for n in range(count):
+        project = Project.objects.create(name=f"Write bench {n}", responsible=admin)
+        ensure_kanban_columns(project)
+        columns = list(KanbanColumn.objects.filter(project=project))
+        KanbanTask.objects.bulk_create(
+            KanbanTask(project=project, column=rnd.choice(columns), title=f"Task {i}", order=i)
+            for i in range(tasks_per_board)
+        )
+        boards.append((project.pk, list(KanbanTask.objects.filter(project=project).values_list("pk", flat=True))))
+    return admin, boards
+
+
+def _worker(user, request, duration, start, result):
+    client = APIClient()
+    client.force_authenticate(user)
+    start.wait()
+    deadline = time.perf_counter() + duration
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                resp = request(client)
+            except OperationalError:
+                result["locked"] += 1
+                continue
+            if resp.status_code == 200:
+                result["ok"] += 1
+                result["latencies"].append(time.perf_counter() - started)
+            else:
+                result["failed"] += 1
+    finally:
+        connection.close()
+
+
+def _reorder(board, seed):
+    rnd = random.Random(seed)
+    project_id, task_ids = board
+    codes = [code for code, _ in DEFAULT_KANBAN_COLUMNS]
+
+    def request(client):
+        return client.post(REORDER_URL, {
+            "project": project_id,
+            "updates": [{"id": rnd.choice(task_ids), "status": rnd.choice(codes), "order": rnd.randrange(1000)}],
+        }, format="json")
+    return request
+
+
+def _poll(board):
+    # вкладка с открытой доской опрашивает её состояние
+    url = STATE_URL.format(project_id=board[0])
+    return lambda client: client.get(url)
+
+
+def _summary(results, duration):
+    latencies = sorted(lat for r in results for lat in r["latencies"])
+    ok = sum(r["ok"] for r in results)
+    return {
+        "ok": ok,
+        "locked": sum(r["locked"] for r in results),
+        "failed": sum(r["failed"] for r in results),
+        "per_s": round(ok / duration, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "p95_ms": round(latencies[max(0, int(len(latencies) * 0.95) - 1)] * 1000, 2) if latencies else None,
+    }
+
+
+def run_round(user, boards, writers, readers, duration):
+    requests = [_reorder(boards[i % len(boards)], i) for i in range(writers)]
+    requests += [_poll(boards[i % len(boards)]) for i in range(readers)]
+    results = [{"ok": 0, "locked": 0, "failed": 0, "latencies": []} for _ in requests]
+    start = threading.Barrier(len(requests) + 1)
+    threads = [
+        threading.Thread(target=_worker, args=(user, request, duration, start, result))
+        for request, result in zip(requests, results)
+    ]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    for thread in threads:
+        thread.join()
+    return {
+        "writers": writers,
+        "readers": readers,
+        "writes": _summary(results[:writers], duration),
+        "reads": _summary(results[writers:], duration),
+    }
+
+
+def use_mode(mode, busy_timeout):
+    """
+    Переключает OPTIONS алиаса default; новые соединения потоков откроются уже с ними.
+    legacy — прежние настройки проекта (без PRAGMA), для сравнения.
+    """
+    connections.close_all()
+    if mode == "legacy":
+        # режим журнала хранится в файле, поэтому сбрасываем WAL от предыдущего прогона
+        options = {"init_command": "PRAGMA journal_mode=DELETE"}
+    else:
+        options = sqlite_options(mode=mode, busy_timeout=busy_timeout)
+    # settings_dict общий для соединений всех потоков
+    connection.settings_dict["OPTIONS"] = options
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode")
+        return cursor.fetchone()[0]
+
+
+def run_write_benchmark(writers=DEFAULT_WRITERS, modes=DEFAULT_MODES, readers=4, duration=3.0,
+                        tasks_per_board=50, busy_timeout=5000, log=None):
+    """
+    Должна выполняться на файловой SQLite-БД (в памяти WAL не включается).
+    """
+    log = log or (lambda message: None)
+    user, boards = seed_boards(max(writers), tasks_per_board)
+    original = dict(connection.settings_dict["OPTIONS"])
+    report = {"params": {"readers": readers, "duration": duration, "tasks_per_board": tasks_per_board,
+                         "busy_timeout": busy_timeout}, "modes": {}}
+    try:
+        for mode in modes:
+            journal = use_mode(mode, busy_timeout)
+            rounds = []
+            for count in writers:
+                rounds.append(run_round(user, boards, count, readers, duration))
+                log(f"{mode}: {count} writer(s) done")
+            report["modes"][mode] = {"journal_mode": journal, "rounds": rounds}
+    finally:
+        connections.close_all()
+        connection.settings_dict["OPTIONS"] = original
+    return report
+
+
+def sustained_writers(rounds):
+    """
+    Наибольшее число писателей, при котором не было ни одной ошибки блокировки.
+    """
+    clean = [
+        r["writers"] for r in rounds
+        if not any(r[kind]["locked"] or r[kind]["failed"] for kind in ("writes", "reads"))
+    ]
+    return max(clean) if clean else 0
@@ -0,0 +1,116 @@
+"""
+Настройки базы данных из переменных окружения (python-decouple).
+
+DB_ENGINE=sqlite (по умолчанию) — файл db.sqlite3, для разработки и небольших установок:
+    DB_SQLITE_MODE          — wal (по умолчанию): WAL-журнал, synchronous=NORMAL и BEGIN IMMEDIATE,
+                              читатели не блокируют писателей, писатели ждут друг друга до busy_timeout;
+                              rollback — классический журнал и отложенные транзакции Django
+    DB_SQLITE_BUSY_TIMEOUT  — сколько мс ждать снятия блокировки вместо "database is locked"
+    DB_SQLITE_MMAP_SIZE     — размер memory-mapped I/O, байт (0 — выключено)
+    DB_SQLITE_CACHE_SIZE    — кэш страниц; отрицательное значение — в КиБ (как PRAGMA cache_size)
+DB_ENGINE=postgres — PostgreSQL (драйвер psycopg 3):
+    DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_SSLMODE
+    DB_CONN_MAX_AGE        — сколько секунд держать соединение открытым между запросами
+    DB_CONN_HEALTH_CHECKS  — проверять переиспользуемое соединение перед запросом
+    DB_STATEMENT_TIMEOUT   — statement_timeout в мс (0 — без ограничения)
+    DB_POOL                — пул соединений:
+        ""        — без пула, только постоянные соединения (CONN_MAX_AGE);
+        psycopg   — пул внутри процесса (psycopg_pool), CONN_MAX_AGE принудительно 0;
+        pgbouncer — внешний пул в transaction mode: серверные курсоры отключаются.
+    DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT — параметры пула psycopg
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+ENGINES = {
+    "sqlite": "django.db.backends.sqlite3",
+    "postgres": "django.db.backends.postgresql",
+}
+POOL_MODES = ("", "psycopg", "pgbouncer")
+SQLITE_MODES = ("wal", "rollback")
+
+
+def database_config(config, base_dir):
+    """
+    Возвращает словарь для DATABASES["default"].
+    config — decouple.config или decouple.Config(...) с тем же интерфейсом.
+    """
+    engine = config("DB_ENGINE", default="sqlite").strip().lower()
+    if engine in ("postgresql", "pg"):
+        engine = "postgres"
+    if engine not in ENGINES:
+        raise ImproperlyConfigured(f"DB_ENGINE must be one of {', '.join(ENGINES)}, got {engine!r}")
+
+    if engine == "sqlite":
+        return {
+            "ENGINE": ENGINES["sqlite"],
+            "NAME": config("DB_NAME", default=str(base_dir / "db.sqlite3")),
+            "OPTIONS": sqlite_options(
+                mode=config("DB_SQLITE_MODE", default="wal").strip().lower(),
+                busy_timeout=config("DB_SQLITE_BUSY_TIMEOUT", default=5000, cast=int),
+                mmap_size=config("DB_SQLITE_MMAP_SIZE", default=256 * 1024 * 1024, cast=int),
+                cache_size=config("DB_SQLITE_CACHE_SIZE", default=-32000, cast=int),
+            ),
+        }
+    return _postgres_config(config)
+
+
+def sqlite_options(mode="wal", busy_timeout=5000, mmap_size=256 * 1024 * 1024, cache_size=-32000):
+    """
+    OPTIONS для django.db.backends.sqlite3: PRAGMA выполняются при каждом открытии соединения.
+    """
+    if mode not in SQLITE_MODES:
+        raise ImproperlyConfigured(f"DB_SQLITE_MODE must be one of {', '.join(SQLITE_MODES)}, got {mode!r}")
+
+    pragmas = [
+        f"PRAGMA busy_timeout={busy_timeout}",
+        f"PRAGMA mmap_size={mmap_size}",
+        f"PRAGMA cache_size={cache_size}",
+    ]
+    if mode == "rollback":
+        # режим журнала хранится в файле БД — возвращаем его явно
+        return {"init_command": ";".join(["PRAGMA journal_mode=DELETE", "PRAGMA synchronous=FULL", *pragmas])}
+
+    return {
+        # в WAL synchronous=NORMAL не теряет целостность, только последние транзакции при сбое питания
+        "init_command": ";".join(["PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL", *pragmas]),
+        # отложенная транзакция, начавшая с чтения, не может дождаться блокировки записи
+        # и сразу падает с "database is locked"; IMMEDIATE берёт её в начале atomic()
+        "transaction_mode": "IMMEDIATE",
+    }
+
+
+def _postgres_config(config):
+    pool = config("DB_POOL", default="").strip().lower()
+    if pool not in POOL_MODES:
+        raise ImproperlyConfigured(f"DB_POOL must be one of psycopg, pgbouncer or empty, got {pool!r}")
+
+    options = {"sslmode": config("DB_SSLMODE", default="prefer")}
+    statement_timeout = config("DB_STATEMENT_TIMEOUT", default=0, cast=int)
+    if statement_timeout > 0:
+        options["options"] = f"-c statement_timeout={statement_timeout}"
+
+    database = {
+        "ENGINE": ENGINES["postgres"],
+        "NAME": config("DB_NAME", default="crm"),
+        "USER": config("DB_USER", default="crm"),
+        "PASSWORD": config("DB_PASSWORD", default=""),
+        "HOST": config("DB_HOST", default="localhost"),
+        "PORT": config("DB_PORT", default="5432"),
+        "CONN_MAX_AGE": config("DB_CONN_MAX_AGE", default=60, cast=int),
+        "CONN_HEALTH_CHECKS": config("DB_CONN_HEALTH_CHECKS", default=True, cast=bool),
+        "OPTIONS": options,
+    }
+
+    if pool == "psycopg":
+        # Django не совмещает пул с постоянными соединениями
+        database["CONN_MAX_AGE"] = 0
+        options["pool"] = {
+            "min_size": config("DB_POOL_MIN_SIZE", default=2, cast=int),
+            "max_size": config("DB_POOL_MAX_SIZE", default=10, cast=int),
+            "timeout": config("DB_POOL_TIMEOUT", default=10, cast=int),
+        }
+    elif pool == "pgbouncer":
+        # в transaction mode курсор WITH HOLD может попасть на другое серверное соединение
+        database["DISABLE_SERVER_SIDE_CURSORS"] = True
+
+    return database
@@ -11,8 +11,11 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+from corsheaders.defaults import default_headers
 from decouple import config, Csv
 
+from .db import database_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -50,6 +53,7 @@ INSTALLED_APPS = [
 
     # Third party apps
     'rest_framework',
+    'rest_framework.authtoken',
     'corsheaders',
     'django_filters',
     'drf_spectacular',
@@ -57,11 +61,19 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # brotli/gzip для ответов от CRM_COMPRESS_MIN_SIZE байт, стриминговые — по мере отдачи
+    'crm.compression.CompressionMiddleware',
+    # профилирование SQL/времени запросов, отключено без CRM_PROFILING_ENABLED
+    'crm.middleware.RequestProfilingMiddleware',
+    # счётчики и гистограммы запросов для /metrics
+    'crm.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # роль и доступные проекты пользователя — один раз на запрос (request.access)
+    'crm.access.AccessContextMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -89,13 +101,77 @@ WSGI_APPLICATION = 'crm_system.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite по умолчанию; PostgreSQL — DB_ENGINE=postgres и DB_* (см. crm_system/db.py)
 DATABASES = {
+    'default': database_config(config, BASE_DIR),
+}
+
+
+# Cache
+# По умолчанию — локальная память процесса; для нескольких воркеров можно указать
+# общий backend, например CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='crm-default'),
     }
 }
 
+# Время жизни кэша фактической загрузки разработчиков (crm.workload), сек
+CRM_WORKLOAD_CACHE_TTL = config('CRM_WORKLOAD_CACHE_TTL', default=300, cast=int)
+
+# Время жизни кэша аналитики /api/analytics/ (crm.analytics), сек
+CRM_ANALYTICS_CACHE_TTL = config('CRM_ANALYTICS_CACHE_TTL', default=60, cast=int)
+
+# Профилирование запросов (crm.middleware): Server-Timing + JSON-строка в лог crm.profiling.
+# SAMPLE_RATE — доля профилируемых запросов, DUPLICATE_THRESHOLD — с какого числа повторов
+# одного SQL-шаблона запрос считается дублирующимся (N+1)
+CRM_PROFILING_ENABLED = config('CRM_PROFILING_ENABLED', default=False, cast=bool)
+CRM_PROFILING_SAMPLE_RATE = config('CRM_PROFILING_SAMPLE_RATE', default=1.0, cast=float)
+CRM_PROFILING_DUPLICATE_THRESHOLD = config('CRM_PROFILING_DUPLICATE_THRESHOLD', default=3, cast=int)
+
+# Локальный кэш token -> user (users.authentication): размер LRU и TTL, сек
+AUTH_TOKEN_CACHE_SIZE = config('AUTH_TOKEN_CACHE_SIZE', default=1024, cast=int)
+AUTH_TOKEN_CACHE_TTL = config('AUTH_TOKEN_CACHE_TTL', default=60, cast=int)
+
+# Токены устройств (users.tokens): срок жизни, сек, и TTL кэша denylist отозванных токенов.
+# При LocMemCache отзыв виден другим воркерам не позже чем через AUTH_TOKEN_DENYLIST_TTL
+AUTH_TOKEN_LIFETIME = config('AUTH_TOKEN_LIFETIME', default=7 * 24 * 3600, cast=int)
+AUTH_TOKEN_DENYLIST_TTL = config('AUTH_TOKEN_DENYLIST_TTL', default=30, cast=int)
+# сколько секунд после ротации ещё принимается предыдущая версия токена
+AUTH_TOKEN_ROTATION_GRACE = config('AUTH_TOKEN_ROTATION_GRACE', default=30, cast=int)
+
+# JSON для DRF (crm.renderers): orjson или json; без установленного orjson всегда json
+CRM_JSON_BACKEND = config('CRM_JSON_BACKEND', default='orjson')
+
+# Сжатие ответов (crm.compression): brotli при установленном пакете brotli, иначе gzip.
+# Ответы короче CRM_COMPRESS_MIN_SIZE байт отдаются как есть
+CRM_COMPRESS_ENABLED = config('CRM_COMPRESS_ENABLED', default=True, cast=bool)
+CRM_COMPRESS_MIN_SIZE = config('CRM_COMPRESS_MIN_SIZE', default=1024, cast=int)
+
+# Выгрузки CSV/XLSX (crm.exports): сколько строк читается из БД за один запрос курсора
+CRM_EXPORT_CHUNK_SIZE = config('CRM_EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Idempotency-Key для создания задач, reorder и загрузки файлов (crm.idempotency):
+# сколько секунд хранится ответ и сколько ключей держит таблица
+CRM_IDEMPOTENCY_TTL = config('CRM_IDEMPOTENCY_TTL', default=24 * 3600, cast=int)
+CRM_IDEMPOTENCY_MAX_KEYS = config('CRM_IDEMPOTENCY_MAX_KEYS', default=100000, cast=int)
+# таймаут обработки запроса (gunicorn --timeout, proxy_read_timeout в nginx), сек;
+# пока не прошло CRM_IDEMPOTENCY_LOCK_TIMEOUT, повтор незавершённого запроса получает 409,
+# а не выполняется второй раз (медленная загрузка файлов) — держите его заметно больше
+CRM_REQUEST_TIMEOUT = config('CRM_REQUEST_TIMEOUT', default=120, cast=int)
+CRM_IDEMPOTENCY_LOCK_TIMEOUT = config('CRM_IDEMPOTENCY_LOCK_TIMEOUT', default=CRM_REQUEST_TIMEOUT * 5, cast=int)
+
+# Метрики Prometheus (crm.metrics), эндпоинт /metrics.
+# CRM_METRICS_DIR — общая директория для нескольких воркеров gunicorn (пусто — только текущий процесс).
+# Доступ: с CRM_METRICS_TOKEN нужен заголовок "Authorization: Bearer <token>",
+# без него — только с адресов CRM_METRICS_ALLOWED_IPS
+CRM_METRICS_DIR = config('CRM_METRICS_DIR', default='')
+CRM_METRICS_FLUSH_INTERVAL = config('CRM_METRICS_FLUSH_INTERVAL', default=1.0, cast=float)
+CRM_METRICS_TABLE_SIZE_TTL = config('CRM_METRICS_TABLE_SIZE_TTL', default=60, cast=int)
+CRM_METRICS_TOKEN = config('CRM_METRICS_TOKEN', default='')
+CRM_METRICS_ALLOWED_IPS = config('CRM_METRICS_ALLOWED_IPS', default='127.0.0.1,::1', cast=Csv())
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -141,6 +217,22 @@ STATICFILES_DIRS = [
 # куда Django СОБИРАЕТ статику (ТОЛЬКО prod)
 STATIC_ROOT = '/var/www/crm/staticfiles/'
 
+# COMPRESS_STATIC: collectstatic пишет хешированные имена (staticfiles.json) и рядом .gz/.br
+# (crm.storage). Без collectstatic {% static %} с манифестом не работает, поэтому по умолчанию выключено
+COMPRESS_STATIC = config('COMPRESS_STATIC', default=False, cast=bool)
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'crm.storage.CompressedManifestStaticFilesStorage' if COMPRESS_STATIC
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
+
 # settings.py
 
 # settings.py
@@ -157,6 +249,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.User'
 
+# пользователь сессии загружается вместе с developer_profile (см. crm.access)
+AUTHENTICATION_BACKENDS = ['users.backends.ModelBackendWithProfile']
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -164,7 +259,7 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -175,6 +270,15 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'crm.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'crm.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
@@ -190,6 +294,9 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# фронтенд повторяет POST с тем же Idempotency-Key (crm.idempotency)
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+
 # Spectacular settings (API documentation)
 SPECTACULAR_SETTINGS = {
     'TITLE': 'CRM API',
@@ -4,6 +4,8 @@ from django.conf import settings
 from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
+from crm.views import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
 
@@ -14,6 +16,9 @@ urlpatterns = [
     path('api/', include('crm.api_urls')),
     path('api/auth/', include('users.urls')),
 
+    # Prometheus
+    path('metrics', metrics, name='metrics'),
+
     # API docs
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
@@ -3,6 +3,24 @@ import { authAPI } from '../services/api'
 
 const AuthContext = createContext(null)
 
+// токен продлевается за REFRESH_MARGIN_MS до истечения (AUTH_TOKEN_LIFETIME на сервере)
+const REFRESH_MARGIN_MS = 5 * 60 * 1000
+// максимальная задержка setTimeout (~24.8 суток)
+const MAX_TIMEOUT_MS = 2 ** 31 - 1
+
+const saveToken = (token, expiresAt) => {
+  localStorage.setItem('authToken', token)
+  if (expiresAt) {
+    localStorage.setItem('authTokenExpiresAt', expiresAt)
+  }
+}
+
+const clearToken = () => {
+  localStorage.removeItem('authToken')
+  localStorage.removeItem('authTokenExpiresAt')
+  localStorage.removeItem('user')
+}
+
 export const useAuth = () => {
   const context = useContext(AuthContext)
   if (!context) {
@@ -15,6 +33,22 @@ export const AuthProvider = ({ children }) => {
   const [user, setUser] = useState(null)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState(null)
+  const [tokenExpiresAt, setTokenExpiresAt] = useState(() => localStorage.getItem('authTokenExpiresAt'))
+
+  const refreshToken = async () => {
+    try {
+      const response = await authAPI.refresh()
+      saveToken(response.data.token, response.data.expires_at)
+      setTokenExpiresAt(response.data.expires_at)
+    } catch (err) {
+      if (err.response?.status === 409) {
+        // токен уже продлила соседняя вкладка — новый придёт через событие storage
+        return
+      }
+      // истёкший или отозванный токен: интерсептор api.js на 401 отправит на /login
+      console.error('Token refresh error:', err)
+    }
+  }
 
   useEffect(() => {
     const token = localStorage.getItem('authToken')
@@ -25,23 +59,44 @@ export const AuthProvider = ({ children }) => {
         setUser(JSON.parse(savedUser))
       } catch (err) {
         console.error('Failed to parse user data:', err)
-        localStorage.removeItem('user')
-        localStorage.removeItem('authToken')
+        clearToken()
       }
     }
     setLoading(false)
   }, [])
 
+  // вкладки делят localStorage: продление в одной переносит таймер в остальных,
+  // чтобы они не ротировали токен повторно
+  useEffect(() => {
+    const onStorage = (event) => {
+      if (event.key === 'authTokenExpiresAt') {
+        setTokenExpiresAt(event.newValue)
+      }
+    }
+    window.addEventListener('storage', onStorage)
+    return () => window.removeEventListener('storage', onStorage)
+  }, [])
+
+  // токен продлевается только по таймеру незадолго до истечения (сразу, если срок уже близко),
+  // а не при каждом открытии — иначе каждая новая вкладка ротировала бы токен устройства
+  useEffect(() => {
+    if (!user || !tokenExpiresAt) return undefined
+    const delay = new Date(tokenExpiresAt).getTime() - Date.now() - REFRESH_MARGIN_MS
+    const timer = setTimeout(refreshToken, Math.min(Math.max(delay, 0), MAX_TIMEOUT_MS))
+    return () => clearTimeout(timer)
+  }, [user, tokenExpiresAt])
+
   const login = async (username, password) => {
     try {
       setError(null)
       setLoading(true)
 
       const response = await authAPI.login({ username, password })
-      const { token, user: userData } = response.data
+      const { token, expires_at: expiresAt, user: userData } = response.data
 
-      localStorage.setItem('authToken', token)
+      saveToken(token, expiresAt)
       localStorage.setItem('user', JSON.stringify(userData))
+      setTokenExpiresAt(expiresAt)
       setUser(userData)
 
       return { success: true }
@@ -60,8 +115,8 @@ export const AuthProvider = ({ children }) => {
     } catch (err) {
       console.error('Logout error:', err)
     } finally {
-      localStorage.removeItem('authToken')
-      localStorage.removeItem('user')
+      clearToken()
+      setTokenExpiresAt(null)
       setUser(null)
     }
   }
@@ -1,5 +1,5 @@
 import { useQuery } from '@tanstack/react-query'
-import { projectsAPI, developersAPI } from '../services/api'
+import { projectsAPI, analyticsAPI } from '../services/api'
 import { useAuth } from '../contexts/AuthContext'
 import { Link } from 'react-router-dom'
 import './Dashboard.css'
@@ -15,16 +15,16 @@ const Dashboard = () => {
     },
   })
 
-  const { data: developersData, isLoading: developersLoading } = useQuery({
-    queryKey: ['developers'],
+  // Итоги считаются на сервере по всем проектам, а не по первой странице списка
+  const { data: analytics } = useQuery({
+    queryKey: ['analytics'],
     queryFn: async () => {
-      const response = await developersAPI.list()
+      const response = await analyticsAPI.get()
       return response.data
     },
   })
 
   const projects = projectsData?.results || []
-  const developers = developersData?.results || []
 
   return (
     <div className="dashboard">
@@ -34,13 +34,13 @@ const Dashboard = () => {
       <div className="stats-grid">
         <div className="stat-card">
           <h3>Всего проектов</h3>
-          <div className="stat-number">{projects.length}</div>
+          <div className="stat-number">{analytics?.projects_total ?? '—'}</div>
           <Link to="/projects" className="stat-link">Посмотреть все проекты →</Link>
         </div>
 
         <div className="stat-card">
           <h3>Всего разработчиков</h3>
-          <div className="stat-number">{developers.length}</div>
+          <div className="stat-number">{analytics?.developers_total ?? '—'}</div>
           <Link to="/developers" className="stat-link">Посмотреть всех разработчиков →</Link>
         </div>
 
@@ -29,6 +29,7 @@ api.interceptors.response.use(
   (error) => {
     if (error.response?.status === 401) {
       localStorage.removeItem('authToken')
+      localStorage.removeItem('authTokenExpiresAt')
       localStorage.removeItem('user')
       window.location.href = '/login'
     }
@@ -41,6 +42,7 @@ export const authAPI = {
   login: (credentials) => api.post('/auth/login/', credentials),
   logout: () => api.post('/auth/logout/'),
   me: () => api.get('/auth/me/'),
+  refresh: () => api.post('/auth/token/refresh/'),
 }
 
 // Projects API
@@ -65,4 +67,9 @@ export const developersAPI = {
   getProjects: (id) => api.get(`/developers/${id}/projects/`),
 }
 
+// Analytics API
+export const analyticsAPI = {
+  get: (params) => api.get('/analytics/', { params }),
+}
+
 export default api
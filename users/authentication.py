@@ -0,0 +1,138 @@
+"""
+Аутентификация по токену с локальным кэшем token -> user.
+
+Стандартный TokenAuthentication на каждый запрос делает JOIN Token+User,
+а канбан опрашивает API каждые 3 секунды с каждой вкладки.
+CachedTokenAuthentication держит соответствие в LRU процесса с TTL:
+- logout (удаление токена), сохранение пользователя или его профиля разработчика
+  сбрасывают запись (users.signals);
+- кэш локален для воркера, поэтому в других воркерах изменения видны не позже чем через TTL.
+
+Подписанные токены устройств (users.tokens) проверяются по HMAC и сроку без БД,
+пользователь берётся из того же LRU (ключ user:<id>), отзыв — по закэшированному denylist.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from . import tokens
+
+
+class TokenCache:
+    """
+    LRU с ограничением размера и временем жизни записей.
+    """
+
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def delete_user(self, user_id):
+        with self._lock:
+            for key in [k for k, (_, (user, _)) in self._items.items() if user.pk == user_id]:
+                del self._items[key]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+token_cache = TokenCache(
+    max_size=getattr(settings, "AUTH_TOKEN_CACHE_SIZE", 1024),
+    ttl=getattr(settings, "AUTH_TOKEN_CACHE_TTL", 60),
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in замена rest_framework.authentication.TokenAuthentication.
+    """
+
+    def authenticate_credentials(self, key):
+        if tokens.looks_signed(key):
+            return self.authenticate_signed(key)
+
+        cached = token_cache.get(key)
+        if cached is None:
+            user, token = self.load_token(key)
+            token_cache.set(key, (user, token))
+        else:
+            user, token = cached
+        # каждый запрос получает свою копию: атрибуты, навешанные view, не должны утекать в кэш
+        return copy.copy(user), token
+
+    def load_token(self, key):
+        # как в TokenAuthentication, но сразу с профилем разработчика (см. crm.access)
+        model = self.get_model()
+        try:
+            token = model.objects.select_related("user__developer_profile").get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        return token.user, token
+
+    def authenticate_signed(self, key):
+        try:
+            token_id, user_id, expires, version = tokens.decode(key)
+        except tokens.InvalidToken:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        if tokens.is_revoked(token_id, version):
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+
+        cache_key = f"user:{user_id}"
+        cached = token_cache.get(cache_key)
+        if cached is None:
+            user = get_user_model().objects.select_related("developer_profile").filter(pk=user_id).first()
+            if user is None:
+                raise exceptions.AuthenticationFailed(_("Invalid token."))
+            token_cache.set(cache_key, (user, None))
+        else:
+            user = cached[0]
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+
+        # request.auth — данные токена, нужны logout/refresh
+        return copy.copy(user), SignedToken(token_id, user_id, expires, version)
+
+
+class SignedToken:
+    def __init__(self, token_id, user_id, expires, version):
+        self.token_id = token_id
+        self.user_id = user_id
+        self.expires = expires
+        self.version = version
@@ -0,0 +1,17 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+class ModelBackendWithProfile(ModelBackend):
+    """
+    ModelBackend, который загружает пользователя сессии вместе с профилем разработчика:
+    проверки доступа (crm.access) читают developer_profile на каждом запросе.
+    """
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.select_related("developer_profile").get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
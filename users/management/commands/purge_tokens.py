@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users.tokens import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Удаляет истёкшие токены устройств и устаревшие записи denylist"
+
+    def handle(self, *args, **options):
+        tokens, revoked = purge_expired()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {tokens} tokens, {revoked} denylist entries"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from users.profiles import sync_developer_profiles
+
+
+class Command(BaseCommand):
+    help = "Создаёт недостающие профили Developer пользователям DEV и обновляет устаревшие ФИО"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        result = sync_developer_profiles(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result['created']} developer profiles, updated {result['updated']}"
+        ))
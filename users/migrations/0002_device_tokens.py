@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device', models.CharField(blank=True, default='', max_length=255, verbose_name='Устройство')),
+                ('version', models.PositiveIntegerField(default=1, verbose_name='Версия')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+                ('rotated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлён')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Истекает')),
+                ('revoked_at', models.DateTimeField(blank=True, null=True, verbose_name='Отозван')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='device_tokens', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Токен устройства',
+                'verbose_name_plural': 'Токены устройств',
+                'ordering': ['-rotated_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('revoked_from', models.DateTimeField()),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('token', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revocations', to='users.devicetoken')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('token', 'version'), name='unique_revoked_token_version')],
+            },
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
@@ -33,6 +34,19 @@ class User(AbstractUser):
     is_staff = models.BooleanField(default=True)
     is_active = models.BooleanField(default=True)
 
+    # поля, от которых зависит профиль Developer (users.signals)
+    PROFILE_FIELDS = ("role", "full_name")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_profile = instance.profile_snapshot()
+        return instance
+
+    def profile_snapshot(self):
+        # через __dict__, чтобы не догружать отложенные поля
+        return tuple(self.__dict__.get(name) for name in self.PROFILE_FIELDS)
+
     def save(self, *args, **kwargs):
         """
         Пользователь с ролью ADMIN всегда является суперпользователем.
@@ -78,3 +92,54 @@ class User(AbstractUser):
     class Meta:
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
+
+
+class DeviceToken(models.Model):
+    """
+    Токен API одного устройства. Сам токен в БД не хранится: клиенту выдаётся
+    подписанная строка (users.tokens), которая проверяется без обращения к БД.
+    При ротации version увеличивается, прежняя версия попадает в RevokedToken.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="device_tokens",
+        verbose_name="Пользователь",
+    )
+    device = models.CharField(max_length=255, blank=True, default="", verbose_name="Устройство")
+    version = models.PositiveIntegerField(default=1, verbose_name="Версия")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создан")
+    rotated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлён")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Истекает")
+    revoked_at = models.DateTimeField(null=True, blank=True, verbose_name="Отозван")
+
+    class Meta:
+        ordering = ["-rotated_at"]
+        verbose_name = "Токен устройства"
+        verbose_name_plural = "Токены устройств"
+
+    def __str__(self):
+        return f"{self.user} — {self.device or 'устройство'} v{self.version}"
+
+
+class RevokedToken(models.Model):
+    """
+    Denylist отозванных версий токенов. Запись нужна только до истечения токена,
+    поэтому таблица остаётся маленькой (users.tokens.purge_expired).
+    При ротации прежняя версия действует ещё немного (revoked_from в будущем),
+    чтобы параллельные запросы клиента со старым токеном не получили 401.
+    """
+    # без каскада и ограничения FK: запись переживает удаление DeviceToken (users.signals),
+    # иначе удалённое устройство пропало бы из denylist вместе с токеном
+    token = models.ForeignKey(
+        DeviceToken, on_delete=models.DO_NOTHING, db_constraint=False, related_name="revocations",
+    )
+    version = models.PositiveIntegerField()
+    revoked_from = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["token", "version"], name="unique_revoked_token_version")
+        ]
+
@@ -0,0 +1,61 @@
+"""
+Синхронизация профилей Developer с пользователями роли DEV набором запросов, а не по одному.
+
+Для импорта и сверки: недостающие профили создаются одним bulk_create, устаревшие
+full_name обновляются одним UPDATE с подзапросом. Сигналы при этом не срабатывают,
+поэтому поисковый индекс, кэш загрузки и кэш токенов обновляются здесь.
+"""
+from django.db.models import F, OuterRef, Subquery
+
+from crm import search
+from crm.models import Developer
+from crm.workload import invalidate_workloads
+
+from .authentication import token_cache
+from .models import User
+
+
+def _sync(users, batch_size):
+    missing = list(users.filter(developer_profile__isnull=True).values_list("pk", "full_name"))
+    created = Developer.objects.bulk_create(
+        [Developer(user_id=pk, full_name=full_name) for pk, full_name in missing],
+        batch_size=batch_size,
+    )
+
+    stale = list(
+        Developer.objects.filter(user__in=users)
+        .exclude(full_name=F("user__full_name"))
+        .values_list("pk", flat=True)
+    )
+    if stale:
+        Developer.objects.filter(pk__in=stale).update(
+            full_name=Subquery(User.objects.filter(pk=OuterRef("user_id")).values("full_name")[:1])
+        )
+    return [dev.pk for dev in created], stale
+
+
+def sync_developer_profiles(user_ids=None, batch_size=1000):
+    """
+    Создаёт профили DEV-пользователям без профиля и подтягивает изменившиеся ФИО.
+    user_ids=None — все пользователи. Возвращает {"created": n, "updated": m}.
+    """
+    users = User.objects.filter(role=User.Roles.DEV)
+    if user_ids is None:
+        created, updated = _sync(users, batch_size)
+    else:
+        user_ids = list(user_ids)
+        created, updated = [], []
+        for offset in range(0, len(user_ids), batch_size):
+            c, u = _sync(users.filter(pk__in=user_ids[offset:offset + batch_size]), batch_size)
+            created += c
+            updated += u
+
+    changed = created + updated
+    if changed:
+        developers = Developer.objects.filter(pk__in=changed)
+        search.index_objects(developers, batch_size=batch_size)
+        for user_id in developers.values_list("user_id", flat=True):
+            token_cache.delete_user(user_id)
+    if created:
+        invalidate_workloads()
+    return {"created": len(created), "updated": len(updated)}
@@ -1,14 +1,31 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import User
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from . import tokens
+from .authentication import token_cache
+from .models import DeviceToken, User
 from crm.models import Developer
 
 @receiver(post_save, sender=User)
-def create_or_update_developer_profile(sender, instance, created, **kwargs):
+def create_or_update_developer_profile(sender, instance, created, update_fields=None, **kwargs):
     """
     Создаем Developer для пользователя с ролью DEV.
     Синхронизируем full_name.
+    Срабатывает только при изменении role/full_name: save(update_fields=["last_login"])
+    при входе и сохранения без изменений этих полей профиль не трогают.
+    Массовая сверка — users.profiles.sync_developer_profiles (manage.py sync_developer_profiles).
     """
+    if update_fields is not None and not set(User.PROFILE_FIELDS) & set(update_fields):
+        return
+
+    snapshot = instance.profile_snapshot()
+    loaded = getattr(instance, "_loaded_profile", None)
+    instance._loaded_profile = snapshot
+    if not created and loaded == snapshot:
+        return
+
     if instance.role == User.Roles.DEV:
         # Получаем или создаем Developer
         developer, _ = Developer.objects.get_or_create(
@@ -18,4 +35,36 @@ def create_or_update_developer_profile(sender, instance, created, **kwargs):
         # Обновляем full_name, если он изменился
         if developer.full_name != instance.full_name:
             developer.full_name = instance.full_name
-            developer.save()
+            developer.save(update_fields=['full_name'])
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_tokens(sender, instance, **kwargs):
+    """
+    Роль/активность пользователя могли измениться — сбрасываем закэшированные токены.
+    """
+    token_cache.delete_user(instance.pk)
+
+
+@receiver(post_save, sender=Developer)
+@receiver(post_delete, sender=Developer)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    # пользователь в кэше хранится вместе с developer_profile
+    if instance.user_id:
+        token_cache.delete_user(instance.user_id)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    # logout_view удаляет токен — он должен перестать работать сразу
+    token_cache.delete(instance.key)
+
+
+@receiver(post_delete, sender=DeviceToken)
+def revoke_deleted_device(sender, instance, **kwargs):
+    """
+    Подписанный токен проверяется без БД, поэтому удалённое устройство (например, в админке)
+    отзывается через denylist. Истёкшие токены (purge_expired) отзывать незачем.
+    """
+    if instance.expires_at > timezone.now():
+        tokens.deny_all(instance)
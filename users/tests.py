@@ -1,3 +1,172 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.signals import user_logged_in
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from crm.models import Developer
+
+from . import tokens
+from .authentication import token_cache
+from .models import DeviceToken, User
+from .profiles import sync_developer_profiles
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(username="pm", password="pass12345", role=User.Roles.PM)
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_repeated_requests_skip_auth_tables(self):
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 200)
+        with self.assertNumQueries(0):
+            resp = self.client.get("/api/auth/me/")
+        self.assertEqual(resp.data["username"], "pm")
+
+    def test_logout_invalidates_cached_token(self):
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 200)
+        self.assertEqual(self.client.post("/api/auth/logout/").status_code, 200)
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 401)
+
+    def test_user_save_invalidates_cached_user(self):
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 401)
+
+
+class DeviceTokenTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        cache.clear()
+        self.user = User.objects.create_user(username="dev", password="pass12345", role=User.Roles.DEV)
+
+    def login(self, device="laptop"):
+        resp = APIClient().post(
+            "/api/auth/login/", {"username": "dev", "password": "pass12345", "device": device}, format="json"
+        )
+        self.assertEqual(resp.status_code, 200)
+        return resp.data["token"]
+
+    def client_with(self, token):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token}")
+        return client
+
+    def test_signed_token_is_validated_without_db(self):
+        client = self.client_with(self.login())
+        self.assertEqual(client.get("/api/auth/me/").status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get("/api/auth/me/").status_code, 200)
+
+    def test_tampered_and_expired_tokens_are_rejected(self):
+        token = self.login()
+        token_id, user_id, expires, version, signature = token.split(".")
+        forged = ".".join([token_id, user_id, str(int(expires) + 3600), version, signature])
+        self.assertEqual(self.client_with(forged).get("/api/auth/me/").status_code, 401)
+
+        with override_settings(AUTH_TOKEN_LIFETIME=-1):
+            expired = self.login()
+        self.assertEqual(self.client_with(expired).get("/api/auth/me/").status_code, 401)
+
+    @override_settings(AUTH_TOKEN_ROTATION_GRACE=0)
+    def test_refresh_rotates_and_revokes_previous_version(self):
+        old = self.login()
+        resp = self.client_with(old).post("/api/auth/token/refresh/")
+        self.assertEqual(resp.status_code, 200)
+        new = resp.data["token"]
+
+        self.assertEqual(self.client_with(old).get("/api/auth/me/").status_code, 401)
+        self.assertEqual(self.client_with(new).get("/api/auth/me/").status_code, 200)
+        self.assertEqual(DeviceToken.objects.get().version, 2)
+
+    def test_old_version_works_during_grace_period(self):
+        old = self.login()
+        self.client_with(old).post("/api/auth/token/refresh/")
+        self.assertEqual(self.client_with(old).get("/api/auth/me/").status_code, 200)
+        # вторая вкладка со старым токеном не разлогинивается
+        self.assertEqual(self.client_with(old).post("/api/auth/token/refresh/").status_code, 409)
+
+    def test_logout_revokes_only_current_device(self):
+        laptop = self.login("laptop")
+        phone = self.login("phone")
+        self.assertEqual(len(self.client_with(phone).get("/api/auth/devices/").data), 2)
+
+        self.assertEqual(self.client_with(laptop).post("/api/auth/logout/").status_code, 200)
+        self.assertEqual(self.client_with(laptop).get("/api/auth/me/").status_code, 401)
+        devices = self.client_with(phone).get("/api/auth/devices/").data
+        self.assertEqual([d["device"] for d in devices], ["phone"])
+        self.assertTrue(devices[0]["current"])
+
+    def test_logout_of_missing_device_returns_404(self):
+        client = self.client_with(self.login())
+        self.assertEqual(client.get("/api/auth/me/").status_code, 200)
+        # строки устройства уже нет, а denylist этого воркера ещё не обновился
+        # (удаление в другом процессе, кэш denylist живёт AUTH_TOKEN_DENYLIST_TTL)
+        DeviceToken.objects.all()._raw_delete(DeviceToken.objects.db)
+        self.assertEqual(client.post("/api/auth/logout/").status_code, 404)
+
+    def test_deleting_device_revokes_its_token(self):
+        old = self.login("laptop")
+        # версия, ещё действующая после ротации, отзывается вместе с текущей
+        new = self.client_with(old).post("/api/auth/token/refresh/").data["token"]
+        phone = self.login("phone")
+        self.assertEqual(self.client_with(new).get("/api/auth/me/").status_code, 200)
+
+        # например, в админке
+        DeviceToken.objects.get(device="laptop").delete()
+        self.assertEqual(self.client_with(new).get("/api/auth/me/").status_code, 401)
+        self.assertEqual(self.client_with(old).get("/api/auth/me/").status_code, 401)
+        self.assertEqual(self.client_with(phone).get("/api/auth/me/").status_code, 200)
+
+    def test_purge_keeps_revocations_of_live_tokens(self):
+        token = self.login()
+        DeviceToken.objects.all().delete()
+        self.assertEqual(tokens.purge_expired(), (0, 0))
+        self.assertEqual(self.client_with(token).get("/api/auth/me/").status_code, 401)
+
+
+class DeveloperProfileSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="dev_sync", password="pass12345", role=User.Roles.DEV, full_name="Иван Петров",
+        )
+
+    def test_login_and_unchanged_saves_skip_profile_queries(self):
+        user = User.objects.get(pk=self.user.pk)
+        # update_last_login: save(update_fields=["last_login"]) — только UPDATE
+        with self.assertNumQueries(1):
+            user_logged_in.send(sender=User, request=None, user=user)
+        with self.assertNumQueries(1):
+            user.save()
+
+        user.full_name = "Иван Сидоров"
+        user.save()
+        self.assertEqual(Developer.objects.get(user=user).full_name, "Иван Сидоров")
+
+        pm = User.objects.create_user(username="pm_sync", password="pass12345", role=User.Roles.PM)
+        pm.role = User.Roles.DEV
+        pm.save(update_fields=["role"])
+        self.assertTrue(Developer.objects.filter(user=pm).exists())
+
+    def test_bulk_reconciliation_command(self):
+        created = User.objects.bulk_create([
+            User(username=f"bulk_dev{n}", full_name=f"Bulk {n}", role=User.Roles.DEV) for n in range(3)
+        ])
+        User.objects.filter(pk=self.user.pk).update(full_name="Переименован")
+
+        out = StringIO()
+        call_command("sync_developer_profiles", stdout=out)
+        self.assertIn("Created 3 developer profiles, updated 1", out.getvalue())
+        self.assertEqual(Developer.objects.get(user=self.user).full_name, "Переименован")
+        self.assertEqual(
+            set(Developer.objects.filter(user__in=created).values_list("full_name", flat=True)),
+            {"Bulk 0", "Bulk 1", "Bulk 2"},
+        )
+        self.assertEqual(sync_developer_profiles(), {"created": 0, "updated": 0})
@@ -0,0 +1,167 @@
+"""
+Подписанные токены устройств с истечением и ротацией.
+
+Формат: "<token_id>.<user_id>.<expires>.<version>.<signature>",
+signature = HMAC-SHA256(SECRET_KEY) по первым четырём частям.
+Проверка подписи и срока не требует БД; отозванные версии
+берутся из небольшого denylist (RevokedToken), закэшированного целиком.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .models import DeviceToken, RevokedToken
+
+SALT = "users.tokens.DeviceToken"
+DENYLIST_CACHE_KEY = "users:token-denylist"
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class AlreadyRotated(InvalidToken):
+    """Версия уже заменена (например, ротация из соседней вкладки)."""
+
+
+def _lifetime():
+    return datetime.timedelta(seconds=getattr(settings, "AUTH_TOKEN_LIFETIME", 7 * 24 * 3600))
+
+
+def _sign(payload):
+    return salted_hmac(SALT, payload, algorithm="sha256").hexdigest()
+
+
+def encode(device_token):
+    payload = ".".join(str(part) for part in (
+        device_token.pk,
+        device_token.user_id,
+        int(device_token.expires_at.timestamp()),
+        device_token.version,
+    ))
+    return f"{payload}.{_sign(payload)}"
+
+
+def decode(raw):
+    """
+    Проверяет подпись и срок. Возвращает (token_id, user_id, expires, version).
+    """
+    try:
+        payload, signature = raw.rsplit(".", 1)
+        token_id, user_id, expires, version = (int(part) for part in payload.split("."))
+    except ValueError:
+        raise InvalidToken("Malformed token")
+    if not constant_time_compare(signature, _sign(payload)):
+        raise InvalidToken("Bad signature")
+    if expires <= timezone.now().timestamp():
+        raise InvalidToken("Token expired")
+    return token_id, user_id, expires, version
+
+
+def looks_signed(raw):
+    # ключи rest_framework.authtoken — 40 hex-символов без точек
+    return raw.count(".") == 4
+
+
+# --- denylist ---
+
+def denylist():
+    """
+    {(token_id, version): момент отзыва (timestamp)} по ещё не истёкшим токенам.
+    """
+    revoked = cache.get(DENYLIST_CACHE_KEY)
+    if revoked is None:
+        revoked = {
+            (token_id, version): revoked_from.timestamp()
+            for token_id, version, revoked_from in RevokedToken.objects.filter(
+                expires_at__gt=timezone.now()
+            ).values_list("token_id", "version", "revoked_from")
+        }
+        cache.set(DENYLIST_CACHE_KEY, revoked, getattr(settings, "AUTH_TOKEN_DENYLIST_TTL", 30))
+    return revoked
+
+
+def is_revoked(token_id, version):
+    revoked_from = denylist().get((token_id, version))
+    return revoked_from is not None and revoked_from <= timezone.now().timestamp()
+
+
+def _deny(device_token, grace=0):
+    revoked_from = timezone.now() + datetime.timedelta(seconds=grace)
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(
+                token=device_token, version=device_token.version,
+                revoked_from=revoked_from, expires_at=device_token.expires_at,
+            )
+    except IntegrityError:
+        # повторный отзыв (например logout после ротации) — действует сразу
+        RevokedToken.objects.filter(
+            token=device_token, version=device_token.version, revoked_from__gt=revoked_from,
+        ).update(revoked_from=revoked_from)
+    cache.delete(DENYLIST_CACHE_KEY)
+
+
+# --- жизненный цикл ---
+
+def issue(user, device=""):
+    device_token = DeviceToken.objects.create(
+        user=user, device=(device or "")[:255], expires_at=timezone.now() + _lifetime(),
+    )
+    return device_token, encode(device_token)
+
+
+def rotate(token_id, version):
+    """
+    Выдаёт новую версию токена с новым сроком; предыдущая версия отзывается.
+    """
+    with transaction.atomic():
+        device_token = DeviceToken.objects.select_for_update().filter(
+            pk=token_id, revoked_at__isnull=True,
+        ).first()
+        if device_token is None:
+            raise InvalidToken("Token revoked")
+        if device_token.version != version:
+            raise AlreadyRotated("Token already rotated")
+        _deny(device_token, grace=getattr(settings, "AUTH_TOKEN_ROTATION_GRACE", 30))
+        device_token.version += 1
+        device_token.expires_at = timezone.now() + _lifetime()
+        device_token.save(update_fields=["version", "expires_at", "rotated_at"])
+    return device_token, encode(device_token)
+
+
+def revoke(device_token):
+    """
+    Отзывает устройство целиком: текущая версия — сразу, новые версии больше не выдаются.
+    """
+    if device_token.revoked_at is None:
+        device_token.revoked_at = timezone.now()
+        device_token.save(update_fields=["revoked_at"])
+    deny_all(device_token)
+
+
+def deny_all(device_token):
+    """
+    Все ещё действующие версии токена попадают в denylist сразу; DeviceToken не меняется
+    (вызывается и при удалении устройства).
+    """
+    _deny(device_token)
+    # версии, ещё действующие после недавней ротации, тоже отзываются сразу
+    RevokedToken.objects.filter(token=device_token, revoked_from__gt=timezone.now()).update(
+        revoked_from=timezone.now()
+    )
+    cache.delete(DENYLIST_CACHE_KEY)
+
+
+def purge_expired():
+    """
+    Удаляет истёкшие токены и записи denylist, которые больше ничего не блокируют.
+    """
+    now = timezone.now()
+    tokens, _ = DeviceToken.objects.filter(expires_at__lte=now).delete()
+    revoked, _ = RevokedToken.objects.filter(expires_at__lte=now).delete()
+    return tokens, revoked
@@ -1,8 +1,13 @@
 from django.urls import path
-from .views import login_view, logout_view, me_view
+from .views import (
+    login_view, logout_view, me_view, token_refresh_view, devices_view, device_revoke_view,
+)
 
 urlpatterns = [
     path('login/', login_view, name='login'),
     path('logout/', logout_view, name='logout'),
     path('me/', me_view, name='me'),
+    path('token/refresh/', token_refresh_view, name='token_refresh'),
+    path('devices/', devices_view, name='devices'),
+    path('devices/<int:device_id>/', device_revoke_view, name='device_revoke'),
 ]
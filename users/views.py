@@ -4,9 +4,14 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 import logging
 
 from crm.serializers import UserSerializer
+from . import tokens
+from .authentication import SignedToken
+from .models import DeviceToken
 
 logger = logging.getLogger(__name__)
 
@@ -20,8 +25,11 @@ def login_view(request):
     POST /api/auth/login/
     {
         "username": "user",
-        "password": "pass"
+        "password": "pass",
+        "device": "Chrome on Mac"   # необязательно, по умолчанию User-Agent
     }
+    Токен привязан к устройству и истекает через AUTH_TOKEN_LIFETIME,
+    продлевается через /api/auth/token/refresh/.
     """
     try:
         username = request.data.get('username')
@@ -41,11 +49,13 @@ def login_view(request):
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
-        token, _ = Token.objects.get_or_create(user=user)
+        device = request.data.get('device') or request.META.get('HTTP_USER_AGENT', '')
+        device_token, token = tokens.issue(user, device)
         serializer = UserSerializer(user)
 
         return Response({
-            "token": token.key,
+            "token": token,
+            "expires_at": device_token.expires_at,
             "user": serializer.data
         })
 
@@ -61,13 +71,21 @@ def login_view(request):
 @permission_classes([IsAuthenticated])
 def logout_view(request):
     """
-    Logout endpoint - deletes auth token
+    Logout endpoint - revokes the device token (or deletes a legacy token)
 
     POST /api/auth/logout/
     Headers: Authorization: Token <token>
     """
+    # отсутствующее/чужое устройство — 404 из get_object_or_404, а не 500 из общего обработчика
+    device_token = None
+    if isinstance(request.auth, SignedToken):
+        device_token = get_object_or_404(DeviceToken, pk=request.auth.token_id, user=request.user)
+
     try:
-        request.user.auth_token.delete()
+        if device_token is not None:
+            tokens.revoke(device_token)
+        else:
+            Token.objects.filter(user=request.user).delete()
         return Response(
             {"message": "Successfully logged out"},
             status=status.HTTP_200_OK
@@ -98,3 +116,67 @@ def me_view(request):
             {"error": "Failed to get user info", "detail": str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+def _device_data(device_token, current_id=None):
+    return {
+        "id": device_token.id,
+        "device": device_token.device,
+        "created_at": device_token.created_at,
+        "rotated_at": device_token.rotated_at,
+        "expires_at": device_token.expires_at,
+        "current": device_token.id == current_id,
+    }
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def token_refresh_view(request):
+    """
+    Rotate current device token: new version and expiry, previous version is revoked
+
+    POST /api/auth/token/refresh/
+    Headers: Authorization: Token <token>
+    """
+    if not isinstance(request.auth, SignedToken):
+        return Response(
+            {"error": "Only device tokens can be refreshed"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        device_token, token = tokens.rotate(request.auth.token_id, request.auth.version)
+    except tokens.AlreadyRotated as e:
+        return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+    except tokens.InvalidToken as e:
+        return Response({"error": str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+
+    return Response({"token": token, "expires_at": device_token.expires_at})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def devices_view(request):
+    """
+    Active device tokens of the current user
+
+    GET /api/auth/devices/
+    """
+    current_id = request.auth.token_id if isinstance(request.auth, SignedToken) else None
+    devices = DeviceToken.objects.filter(
+        user=request.user, revoked_at__isnull=True, expires_at__gt=timezone.now()
+    )
+    return Response([_device_data(d, current_id) for d in devices])
+
+
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
+def device_revoke_view(request, device_id):
+    """
+    Revoke a device token (log out that device)
+
+    DELETE /api/auth/devices/<id>/
+    """
+    device_token = get_object_or_404(DeviceToken, pk=device_id, user=request.user)
+    tokens.revoke(device_token)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+